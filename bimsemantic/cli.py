@@ -0,0 +1,485 @@
+"""
+/***************************************************************************
+                              BIM Semantic Viewer
+                              -------------------
+        begin                : 2024-10-03
+        copyright            : (C) 2025 by Florian Neukirchen
+        email                : mail@riannek.de
+ ***************************************************************************/
+
+/***************************************************************************
+ *                                                                         *
+ *   This program is free software; you can redistribute it and/or modify  *
+ *   it under the terms of the GNU General Public License as published by  *
+ *   the Free Software Foundation; either version 2 of the License, or     *
+ *   (at your option) any later version.                                   *
+ *                                                                         *
+ ***************************************************************************/
+"""
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+import csv
+from fnmatch import fnmatchcase
+import glob
+import os
+import sys
+from . import __version__
+from .util import (
+    ARROW_FORMATS,
+    IdsValidator,
+    IfcFiles,
+    IfcFileScan,
+    IntegrityValidator,
+    Validators,
+    arrow_format,
+    element_table_columns,
+    has_pyarrow,
+    write_arrow_table,
+)
+
+# Output formats of the command line interface
+OUTPUT_FORMATS = ["csv"] + list(ARROW_FORMATS)
+
+
+def expand_filenames(patterns):
+    """Expand glob patterns to a list of files, in the given order without duplicates
+
+    Patterns without a match are kept as they are, to report the missing file.
+
+    :param patterns: Filenames or glob patterns (e.g. "deliveries/**/*.ifc")
+    :type patterns: list of str
+    :rtype: list of str
+    """
+    filenames = []
+    seen = set()
+    for pattern in patterns:
+        matches = sorted(glob.glob(pattern, recursive=True))
+        if not matches:
+            matches = [pattern]
+        for filename in matches:
+            abspath = os.path.abspath(filename)
+            if abspath not in seen:
+                seen.add(abspath)
+                filenames.append(filename)
+    return filenames
+
+
+def select_columns(names, patterns):
+    """Names matching the column spec, the filename column is always included
+
+    :param names: All column names
+    :type names: list of str
+    :param patterns: Column names or patterns as for fnmatch (e.g. "Pset_*.*"),
+        None for all columns
+    :type patterns: list of str or None
+    :rtype: list of str
+    """
+    if patterns is None:
+        return list(names)
+    return [
+        name
+        for name in names
+        if name == "Filename" or any(fnmatchcase(name, p) for p in patterns)
+    ]
+
+
+def scan_table(filename):
+    """Table with one row of statistics of an IFC file, using IfcFileScan
+
+    :param filename: Path of the IFC file
+    :type filename: str
+    :return: List of tuples (name, values)
+    :rtype: list of tuple
+    """
+    scan = IfcFileScan(filename)
+    row = [
+        ("Filename", os.path.basename(scan.abspath)),
+        ("IFC Version", scan.schema),
+        ("File size MB", round(os.path.getsize(scan.abspath) / 1048576, 1)),
+        ("Project name", scan.project.get("Name")),
+        ("Project phase", scan.project.get("Phase")),
+        ("Application", scan.owner.get("ApplicationFullName")),
+        ("Entities", scan.entity_count),
+        ("IFC Elements", scan.count("IfcElement")),
+        ("Psets", scan.count("IfcPropertySet")),
+        ("Qsets", scan.count("IfcElementQuantity")),
+    ]
+    return [(name, [value]) for name, value in row]
+
+
+def init_validators(ids_filenames):
+    """Add the IDS validators to Validators, called once in each worker process
+
+    :param ids_filenames: Paths of the IDS files
+    :type ids_filenames: list of str
+    """
+    validators = Validators()
+    for ids_filename in ids_filenames:
+        validators.add_validator(IdsValidator(ids_filename))
+
+
+def element_table(filename, column_patterns=None, ifc_class="IfcElement", report_dir=None):
+    """Table of the elements of an IFC file, see element_table_columns()
+
+    If IDS validators were added with init_validators(), the file is
+    validated and the column Validation holds the number of failed and
+    passed checks of each element, as in the tree views. The reports are
+    saved as BCF to report_dir, if given.
+
+    :param filename: Path of the IFC file
+    :type filename: str
+    :param column_patterns: Column spec, see select_columns()
+    :type column_patterns: list of str, optional
+    :param ifc_class: IFC class of the entities in the rows
+    :type ifc_class: str, optional
+    :param report_dir: Directory for the BCF files of the validation
+    :type report_dir: str, optional
+    :return: Tuple of the list of tuples (name, values) and a list of
+        tuples (validator_id, passed, failed)
+    :rtype: tuple
+    """
+    validators = Validators()
+    # Validation uses the full model, parse the file only once
+    ifc_files = IfcFiles(semantic_only=not validators.validators)
+    ifc_file = ifc_files.add_file(filename)
+    columns = dict(element_table_columns(ifc_files, ifc_class))
+    table = [
+        (name, columns[name]()) for name in select_columns(columns, column_patterns)
+    ]
+    summary = []
+    if validators.validators:
+        validators.reset(ifc_files)
+        validators.validate()
+        results = validators.results_by_guid
+        validation = []
+        for guid in columns["GUID"]():
+            if guid in results:
+                passed, failed = results[guid]
+                validation.append(f"{failed} failed, {passed} passed")
+            else:
+                validation.append(None)
+        table.append(("Validation", validation))
+        for validator in validators.validators:
+            reporter = validators.reporters[validator.id][ifc_file.filename]
+            passed = sum(
+                spec["total_checks_pass"] for spec in reporter.results["specifications"]
+            )
+            failed = sum(
+                spec["total_checks_fail"] for spec in reporter.results["specifications"]
+            )
+            summary.append((validator.id, passed, failed))
+            if report_dir is not None:
+                stem = os.path.splitext(ifc_file.filename)[0]
+                ids_stem = os.path.splitext(validator.id)[0]
+                validators.save_results(
+                    validator.id,
+                    ifc_file.filename,
+                    os.path.join(report_dir, f"{stem}_{ids_stem}.bcfzip"),
+                    as_bcf=True,
+                )
+    return table, summary
+
+
+def integrity_check(filenames, report_dir=None):
+    """Check if the entities with the same GUID are the same in all files
+
+    All files are opened together in one IfcFiles and checked with
+    IntegrityValidator. The report is saved as integrity.bcfzip to
+    report_dir, if given.
+
+    :param filenames: Paths of the IFC files, of the same project
+    :type filenames: list of str
+    :param report_dir: Directory for the BCF file
+    :type report_dir: str, optional
+    :return: Tuple (passed, failed)
+    :rtype: tuple
+    :raises ValueError: The files belong to different projects
+    """
+    ifc_files = IfcFiles()
+    for filename in filenames:
+        ifc_files.add_file(filename)
+    reporter = IntegrityValidator(ifc_files).validate()
+    if report_dir is not None:
+        reporter.to_file(os.path.join(report_dir, "integrity.bcfzip"))
+    spec = reporter.results["specifications"][0]
+    return spec["total_checks_pass"], spec["total_checks_fail"]
+
+
+def process_file(filename, options):
+    """Run the job of one file, called in the worker processes
+
+    Any error is returned with the file instead of raised, so that the
+    other files of the batch are still processed.
+
+    :param filename: Path of the IFC file
+    :type filename: str
+    :param options: The parsed command line arguments
+    :type options: argparse.Namespace
+    :return: Tuple (filename, table, summary, error)
+    :rtype: tuple
+    """
+    try:
+        if options.stats:
+            return filename, scan_table(filename), [], None
+        table, summary = element_table(
+            filename, options.columns, options.ifc_class, options.report
+        )
+        return filename, table, summary, None
+    except Exception as e:
+        return filename, None, [], f"{type(e).__name__}: {e}"
+
+
+def merge_tables(tables):
+    """Merge tables with different columns, missing values are None
+
+    :param tables: List of tables as lists of tuples (name, values)
+    :type tables: list
+    :return: The merged table
+    :rtype: list of tuple
+    """
+    tables = [dict(table) for table in tables]
+    names = {}
+    for table in tables:
+        for name in table:
+            names[name] = None
+    merged = []
+    for name in names:
+        values = []
+        for table in tables:
+            if name in table:
+                values.extend(table[name])
+            else:
+                values.extend([None] * len(table["Filename"]))
+        merged.append((name, values))
+    return merged
+
+
+def write_table(table, output, output_format, delimiter=","):
+    """Write a table to CSV, Parquet or Arrow IPC (Feather)
+
+    :param table: List of tuples (name, values)
+    :type table: list of tuple
+    :param output: Path of the file, None for CSV to stdout
+    :type output: str or None
+    :param output_format: csv or a key of ARROW_FORMATS
+    :type output_format: str
+    :param delimiter: CSV column separator
+    :type delimiter: str
+    """
+    if output_format == "csv":
+        if output is None:
+            f = sys.stdout
+        else:
+            f = open(output, "w", newline="", encoding="utf-8")
+        try:
+            writer = csv.writer(f, delimiter=delimiter, lineterminator="\n")
+            writer.writerow([name for name, _ in table])
+            writer.writerows(zip(*[values for _, values in table]))
+        finally:
+            if f is not sys.stdout:
+                f.close()
+    else:
+        write_arrow_table(
+            output,
+            [(name, lambda values=values: values) for name, values in table],
+            output_format,
+        )
+
+
+def run(options):
+    """Process the files with the command line arguments
+
+    :param options: The parsed command line arguments
+    :type options: argparse.Namespace
+    :return: Exit code, 1 if any file failed
+    :rtype: int
+    """
+    filenames = expand_filenames(options.files)
+    jobs = options.jobs or os.cpu_count() or 1
+    jobs = max(1, min(jobs, len(filenames)))
+    ids_filenames = options.ids or []
+    if options.stats:
+        ids_filenames = []
+
+    def output_path(filename):
+        stem = os.path.splitext(os.path.basename(filename))[0]
+        return os.path.join(options.output, stem + suffix)
+
+    suffix = ARROW_FORMATS.get(options.format, ".csv")
+    if options.split:
+        os.makedirs(options.output, exist_ok=True)
+    if options.report:
+        os.makedirs(options.report, exist_ok=True)
+
+    if jobs > 1:
+        executor = ProcessPoolExecutor(
+            max_workers=jobs, initializer=init_validators, initargs=(ids_filenames,)
+        )
+        results = executor.map(
+            process_file, filenames, [options] * len(filenames), chunksize=1
+        )
+    else:
+        executor = None
+        init_validators(ids_filenames)
+        results = (process_file(filename, options) for filename in filenames)
+
+    exit_code = 0
+    tables = []
+    processed = []
+    try:
+        for i, (filename, table, summary, error) in enumerate(results):
+            if error is not None:
+                print(
+                    f"[{i + 1}/{len(filenames)}] {filename} failed: {error}",
+                    file=sys.stderr,
+                )
+                exit_code = 1
+                continue
+            processed.append(filename)
+            rows = len(table[0][1])
+            print(f"[{i + 1}/{len(filenames)}] {filename}: {rows} rows", file=sys.stderr)
+            for validator_id, passed, failed in summary:
+                print(
+                    f"    {validator_id}: {passed} passed, {failed} failed",
+                    file=sys.stderr,
+                )
+            if options.split:
+                write_table(
+                    table, output_path(filename), options.format, options.delimiter
+                )
+            else:
+                tables.append(table)
+    finally:
+        if executor is not None:
+            executor.shutdown(cancel_futures=True)
+
+    if tables:
+        write_table(merge_tables(tables), options.output, options.format, options.delimiter)
+
+    if options.integrity and len(processed) > 1:
+        try:
+            passed, failed = integrity_check(processed, options.report)
+        except Exception as e:
+            print(f"Integrity check failed: {type(e).__name__}: {e}", file=sys.stderr)
+            exit_code = 1
+        else:
+            print(f"integrity: {passed} passed, {failed} failed", file=sys.stderr)
+    return exit_code
+
+
+def main(argv=None):
+    """Entry point of the command line interface"""
+    description = """Extract the elements and properties of IFC files without GUI.
+        Writes a table with one row for each element of each file, with
+        its attributes and all properties and quantities (named
+        "pset.property"). The files can be validated with IDS files, the
+        number of failed and passed checks is added as column Validation.
+        The files are processed in parallel. With --integrity, elements
+        contained in several files are checked to be the same.
+        """
+
+    parser = argparse.ArgumentParser(prog="bimsemantic", description=description)
+    parser.add_argument(
+        "--version",
+        action="version",
+        version="{prog}s {version}".format(prog="%(prog)", version=__version__),
+    )
+    parser.add_argument(
+        "files",
+        nargs="+",
+        help='IFC files or glob patterns, e.g. "deliveries/**/*.ifc"',
+    )
+    parser.add_argument(
+        "-c",
+        "--columns",
+        help='Comma separated columns or patterns, e.g. "GUID,Name,Pset_*.*" '
+        "(default: all columns). Filename is always included.",
+        type=lambda text: [name.strip() for name in text.split(",") if name.strip()],
+        default=None,
+    )
+    parser.add_argument(
+        "--class",
+        dest="ifc_class",
+        help="IFC class of the rows, including subclasses (default: IfcElement)",
+        default="IfcElement",
+    )
+    parser.add_argument(
+        "-i",
+        "--ids",
+        help="IDS file to validate the IFC files, can be used several times",
+        action="append",
+    )
+    parser.add_argument(
+        "-r",
+        "--report",
+        help="Directory to save the validation reports as BCF",
+        default=None,
+    )
+    parser.add_argument(
+        "--integrity",
+        help="Check that the entities with the same GUID are the same in all files "
+        "(the files must belong to the same project)",
+        action="store_true",
+    )
+    parser.add_argument(
+        "-f",
+        "--format",
+        help="Output format (default: by the suffix of the output file, else csv)",
+        choices=OUTPUT_FORMATS,
+        default=None,
+    )
+    parser.add_argument(
+        "-o",
+        "--output",
+        help="Output file, or directory with --split (default: CSV to stdout)",
+        default=None,
+    )
+    parser.add_argument(
+        "--split",
+        help="Write one output file for each IFC file into the output directory",
+        action="store_true",
+    )
+    parser.add_argument(
+        "-d",
+        "--delimiter",
+        help="CSV column separator (default: ,)",
+        default=",",
+    )
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        help="Number of files processed in parallel (default: number of CPUs)",
+        type=int,
+        default=None,
+    )
+    parser.add_argument(
+        "--stats",
+        help="Only write statistics of the files, without parsing them (fast)",
+        action="store_true",
+    )
+
+    options = parser.parse_args(argv)
+    if options.format is None:
+        options.format = "csv"
+        if options.output is not None and not options.split:
+            options.format = arrow_format(options.output) or "csv"
+    if options.integrity and options.stats:
+        parser.error("--integrity can not be used with --stats")
+    if options.split and options.output is None:
+        parser.error("--split requires the output directory (-o)")
+    if options.format != "csv":
+        if not has_pyarrow():
+            parser.error(f"pyarrow is required for the output format {options.format}")
+        if options.output is None:
+            parser.error(f"The output format {options.format} requires an output file (-o)")
+    for ids_filename in options.ids or []:
+        try:
+            IdsValidator(ids_filename)
+        except (FileNotFoundError, ValueError) as e:
+            parser.error(str(e))
+
+    return run(options)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -651,11 +651,8 @@ Bitte zwei ganzzahlige Werte, durch Komma getrennt</translation>
         <source>Flat</source>
         <translation>Flach</translation>
     </message>
-</context>
-<context>
-    <name>IfcTreeItem</name>
     <message>
-        <location filename="../ui/ifctrees.py" line="95"/>
+        <location filename="../ui/ifctabs.py" line="64"/>
         <source>Unnamed</source>
         <translation>Ohne Namen</translation>
     </message>
@@ -740,6 +737,11 @@ Bitte zwei ganzzahlige Werte, durch Komma getrennt</translation>
         <source>Export to CSV</source>
         <translation>Exportiere zu CSV</translation>
     </message>
+    <message>
+        <location filename="../ui/mainwindow.py" line="872"/>
+        <source>Stop the running export</source>
+        <translation>Laufenden Export abbrechen</translation>
+    </message>
     <message>
         <location filename="../ui/mainwindow.py" line="398"/>
         <source>CSV Files (*.csv)</source>
@@ -1,5 +1,6 @@
 from .mixin import *
 from .searchbar import *
+from .proxymodel import *
 from .detailview import *
 from .idseditor import *
 from .validationdock import *
@@ -12,3 +13,4 @@ from .psetdock import *
 from .multithreading import *
 from .mainwindow import *
 from .treebase import *
+from .searchindex import *
@@ -288,6 +288,10 @@ class IfcDetailsTreeModel(DetailsBaseclass):
         if ifc_object.is_a("IfcElementType"):
             # get_type() on a element type item would return the item itself
             linked_object_type = None
+        elif self.filenames:
+            # The entity is taken from the first file, see ElementRecord
+            ifc_file = self._mainwindow.ifcfiles[self.filenames[0]]
+            linked_object_type = ifc_file.get_type(ifc_object)
         else:
             linked_object_type = ifcopenshell.util.element.get_type(ifc_object)
 
@@ -650,6 +654,11 @@ class OverviewTreeModel(DetailsBaseclass):
             root_item.appendChild(ifcfile_item)
             self.rows_spanned.append(ifcfile_item.row())
 
+            if not ifcfile.is_loaded:
+                # Do not block the GUI by parsing a file that is still loading
+                self.scan_items(ifcfile, ifcfile_item)
+                continue
+
             self.new_item(self.tr("IFC Version"), ifcfile.model.schema, ifcfile_item)
             self.new_item(self.tr("File size"), f"{ifcfile.megabytes} MB", ifcfile_item)
             self.new_item(self.tr("Project name"), ifcfile.project.Name, ifcfile_item)
@@ -734,6 +743,45 @@ class OverviewTreeModel(DetailsBaseclass):
             self.new_item(self.tr("Pset count"), ifcfile.pset_count(), ifcfile_item)
             self.new_item(self.tr("Qset count"), ifcfile.qset_count(), ifcfile_item)
 
+    def scan_items(self, ifcfile, ifcfile_item):
+        """Add the items of a file that is not parsed yet, using IfcFileScan
+
+        :param ifcfile: The IFC file
+        :type ifcfile: IfcFile
+        :param ifcfile_item: The tree item of the file
+        :type ifcfile_item: TreeItem
+        """
+        try:
+            scan = ifcfile.scan
+        except (OSError, ValueError):
+            scan = None
+        self.new_item(self.tr("IFC Version"), ifcfile.schema, ifcfile_item)
+        self.new_item(self.tr("File size"), f"{ifcfile.megabytes} MB", ifcfile_item)
+        if scan is not None:
+            self.new_item(
+                self.tr("Project name"), scan.project.get("Name"), ifcfile_item
+            )
+            for key, label in (
+                ("LongName", self.tr("Long name")),
+                ("Phase", self.tr("Project phase")),
+            ):
+                if scan.project.get(key):
+                    self.new_item(label, scan.project[key], ifcfile_item)
+            self.new_item(
+                self.tr("Project owner"), scan.owner.get("GivenName"), ifcfile_item
+            )
+            self.new_item(
+                self.tr("Application"),
+                scan.owner.get("ApplicationFullName"),
+                ifcfile_item,
+            )
+            self.new_item(self.tr("Entities"), scan.entity_count, ifcfile_item)
+        self.new_item(
+            self.tr("IFC Elements"), ifcfile.count_ifc_elements(), ifcfile_item
+        )
+        self.new_item(self.tr("Pset count"), ifcfile.pset_count(), ifcfile_item)
+        self.new_item(self.tr("Qset count"), ifcfile.qset_count(), ifcfile_item)
+
 
 class ValidationResultTreeModel(DetailsBaseclass):
     """Tree model for the validation results
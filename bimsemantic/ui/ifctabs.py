@@ -16,13 +16,14 @@
  *                                                                         *
  ***************************************************************************/
 """
+import csv
+from functools import partial
+import io
 from PySide6.QtCore import (
     Qt,
-    QSortFilterProxyModel,
     QTimer,
     QItemSelection,
     QItemSelectionModel,
-    QModelIndex,
 )
 from PySide6.QtWidgets import (
     QTreeView,
@@ -43,8 +44,11 @@ from bimsemantic.ui import (
     FlatTreeModel,
     IfcTreeItem,
     SearchBar,
+    TreeProxyModel,
     IfcCustomTreeModel,
+    FILENAME_COLUMN,
 )
+from bimsemantic.util import ElementRecords, property_column_name
 
 
 class IfcTabs(QWidget):
@@ -59,6 +63,8 @@ class IfcTabs(QWidget):
         super(IfcTabs, self).__init__(parent)
         self.ifcfiles = parent.ifcfiles
         self.remaining_models = None
+        # Records of the IFC entities, shared by the tree models of all tabs
+        self.element_records = ElementRecords(self.tr("Unnamed"))
 
         self.mainwindow = parent
         self.timer = QTimer()
@@ -106,6 +112,28 @@ class IfcTabs(QWidget):
         for tab in self.customtabs:
             tab.treemodel.add_file(ifc_file)
 
+    def build_jobs(self):
+        """Get the jobs to build the tree models of all tabs in a worker
+
+        :return: List of tuples (tab name, build_tree, merge_tree), see WorkerBuildTrees
+        """
+        jobs = []
+        for i in range(self.tabs.count()):
+            treemodel = self.tabs.widget(i).treemodel
+            jobs.append(
+                (self.tabs.tabText(i), treemodel.build_tree, treemodel.merge_tree)
+            )
+        return jobs
+
+    def filenames_changed(self, guids):
+        """Update the Filename column of the items of GUIDs in all tree views
+
+        :param guids: The GUIDs of the records that got a new filename
+        :type guids: set of str
+        """
+        for i in range(self.tabs.count()):
+            self.tabs.widget(i).treemodel.filenames_changed(guids)
+
     def update_columns(self):
         """Update the columns in all tree views
 
@@ -277,10 +305,10 @@ class IfcTreeTab(QWidget):
         self.ifc_files = ifc_files
         self.layout = QVBoxLayout(self)
 
-        # Use a Proxy model to enable sorting
-        self.proxymodel = QSortFilterProxyModel(self)
-        self.proxymodel.setRecursiveFilteringEnabled(True)
+        # Use a Proxy model to enable sorting and filtering
+        self.proxymodel = TreeProxyModel(self, self.mainwindow.threadpool)
         self.proxymodel.setSourceModel(self.treemodel)
+        self.proxymodel.filterApplied.connect(self.on_filter_applied)
 
         self.tree = QTreeView()
         self.tree.setModel(self.proxymodel)
@@ -351,7 +379,7 @@ class IfcTreeTab(QWidget):
 
         # SOM list
         if self.mainwindow.somdock and self.mainwindow.somdock.isVisible():
-            self.mainwindow.somdock.autosearch(item.ifc)
+            self.mainwindow.somdock.autosearch(item)
 
         items = [item for item in items if isinstance(item, IfcTreeItem)]
 
@@ -379,6 +407,11 @@ class IfcTreeTab(QWidget):
         """Clear the selection in the QTreeView"""
         self.tree.selectionModel().clearSelection()
 
+    def on_filter_applied(self):
+        """Repeat the search to make sure we only have valid search results"""
+        if self.is_active_tab():
+            self.tabswidget.searchbar.search()
+
     def select_item_by_guid(self, guid, add=False):
         """Select an item by its GUID
 
@@ -448,63 +481,112 @@ class IfcTreeTab(QWidget):
     def rows_to_csv(self, sep=";", all_rows=False, add_header=False, add_level=False):
         """Generator, yields the selected rows as CSV string
 
-        The columns are separated by the given separator.
-        Using a generator allows to write the rows to a file line by line.
+        The columns are separated by the given separator, the rows are
+        written with a csv.writer. Using a generator allows to write the
+        rows to a file line by line, large exports to a file use the
+        WorkerExportCsv instead.
 
         :param sep: CSV column separator
         :param all_rows: If True, all rows are returned, otherwise only the selected rows
         :param add_header: If True, the header row is added
         :param add_level: If True, the level of the items is added as first column
         """
-        if all_rows:
-            indexes = self.get_all_row_indexes()
-        else:
-            indexes = self.tree.selectionModel().selectedRows()
-            # Sort the indexes by the visual order in the tree view
-            indexes.sort(key=lambda index: self.tree.visualRect(index).top())
+        items, levels = self.rows_to_export(all_rows)
+        columns = self.visible_columns()
+        if not add_level:
+            levels = None
+
+        buffer = io.StringIO()
+        writer = csv.writer(buffer, delimiter=sep, lineterminator="\n")
+
+        def line(row):
+            buffer.seek(0)
+            buffer.truncate()
+            writer.writerow(row)
+            return buffer.getvalue()
 
         if add_header:
-            headerrow = [
-                self.treemodel.headerData(i)
-                for i in range(self.treemodel.columnCount())
-                if not self.tree.isColumnHidden(i)
-            ]
-            if add_level:
-                headerrow.insert(0, "Level")
-            yield sep.join(headerrow) + "\n"
+            yield line(self.header_row(columns, add_level))
 
-        for index in indexes:
-            source_index = self.proxymodel.mapToSource(index)
-            item = source_index.internalPointer()
-            row = [
-                str(item.data(i))
-                for i in range(self.treemodel.columnCount())
-                if not self.tree.isColumnHidden(i)
-            ]
-
-            # Empty cells are returned as str "None"
-            for i in range(len(row)):
-                if row[i] == "None":
-                    row[i] = ""
-
-            if add_level:
-                row.insert(0, str(item.level()))
-            yield sep.join(row) + "\n"
-
-    def get_all_row_indexes(self, parent_index=QModelIndex()):
-        """Recursively get all row indexes of the tree view
-
-        These indexes are required to serialize the complete tree view.
-        :param parent_index: The parent index, default is the root of the tree view.
-        :return: List of QModelIndex instances
+        for rows in self.treemodel.iter_rows(items, columns, levels):
+            for row in rows:
+                yield line(row)
+
+    def rows_to_export(self, all_rows=False):
+        """Get the items of the rows to copy or export, with their levels
+
+        All rows are the rows that pass the filter, in the order of the tree
+        view (see TreeProxyModel.visible_items()). Selected rows are sorted
+        by their position in the tree view.
+
+        :param all_rows: If True, all rows are returned, otherwise only the selected rows
+        :type all_rows: bool
+        :return: Tuple of the list of items and the list of their levels
+        :rtype: tuple
+        """
+        if all_rows:
+            self.treemodel.fetch_all()
+            return self.proxymodel.visible_items()
+
+        indexes = self.tree.selectionModel().selectedRows()
+        # Sort the indexes by the visual order in the tree view
+        indexes.sort(key=lambda index: self.tree.visualRect(index).top())
+        items = [
+            self.proxymodel.mapToSource(index).internalPointer() for index in indexes
+        ]
+        return items, [item.level() for item in items]
+
+    def visible_columns(self):
+        """List of the column numbers that are not hidden in the tree view"""
+        return [
+            i
+            for i in range(self.treemodel.columnCount())
+            if not self.tree.isColumnHidden(i)
+        ]
+
+    def header_row(self, columns, add_level=False):
+        """Get the column names of the columns for a CSV header
+
+        :param columns: The column numbers
+        :type columns: list of int
+        :param add_level: If True, "Level" is added as first column
+        :type add_level: bool
+        :rtype: list of str
+        """
+        headerrow = [self.treemodel.headerData(i) for i in columns]
+        if add_level:
+            headerrow.insert(0, "Level")
+        return headerrow
+
+    def table_columns(self, all_rows=True):
+        """Get the columns of the rows to export to a table, see write_arrow_table()
+
+        The first column is the level of the items, followed by the
+        visible columns. The filename column is always included. Property
+        set columns are named "pset.property". The rows are taken at once
+        (see rows_to_export()), the values are read later, column by
+        column, e.g. in a WorkerExportTable.
+
+        :param all_rows: If True, all rows are exported, otherwise only the selected rows
+        :type all_rows: bool
+        :return: List of tuples (name, read)
+        :rtype: list of tuple
         """
-        indexes = []
-        for row in range(self.proxymodel.rowCount(parent_index)):
-            index = self.proxymodel.index(row, 0, parent_index)
-            indexes.append(index)
-            if self.proxymodel.hasChildren(index):
-                indexes.extend(self.get_all_row_indexes(index))
-        return indexes
+        items, levels = self.rows_to_export(all_rows)
+        columns = self.visible_columns()
+        if FILENAME_COLUMN not in columns:
+            columns.append(FILENAME_COLUMN)
+
+        table_columns = [("Level", lambda: levels)]
+        for column in columns:
+            if column < len(self.treemodel.first_cols):
+                name = self.treemodel.headerData(column)
+            else:
+                name = property_column_name(*self.treemodel.columntree.col(column))
+            table_columns.append(
+                (name, partial(self.treemodel.column_reader(column), items))
+            )
+        return table_columns
 
     def show_context_menu(self, position):
         index = self.tree.indexAt(position)
@@ -16,6 +16,7 @@
  *                                                                         *
  ***************************************************************************/
 """
+from operator import attrgetter
 from PySide6.QtCore import Qt, QModelIndex
 from bimsemantic.ui import (
     TreeItem,
@@ -26,6 +27,48 @@ from bimsemantic.ui import (
 from bimsemantic.util import Validators
 import ifcopenshell.util.element
 
+# The Location tree is filled lazily if the first files have more IfcElements
+LAZY_LOCATION_TREE_ELEMENTS = 100000
+
+# Info column with the filenames, always part of an export to a table
+FILENAME_COLUMN = 8
+
+# Info columns read from the ElementRecord, see IfcTreeItem.data()
+RECORD_COLUMNS = {
+    1: "_record.id",
+    3: "_record.guid",
+    6: "_record.linked_type_name",
+    8: "filenames_str",
+    9: "_record.container_name",
+}
+
+# Info columns read from an attribute of the IFC entity, see IfcTreeItem.data()
+ATTRIBUTE_COLUMNS = {2: "Name", 4: "Tag", 5: "ObjectType", 7: "Description"}
+
+
+def _attribute_reader(attribute):
+    """Function reading an attribute of the IFC entity of IfcTreeItems
+
+    The attribute is read by its position, which is looked up once per
+    IFC class and file. None if the entity does not have the attribute.
+    """
+    positions = {}
+
+    def read(item):
+        record = item._record
+        key = (record.ifc_file, record.ifc_class)
+        if key in positions:
+            position = positions[key]
+        else:
+            names = record.ifc.get_attribute_names()
+            position = names.index(attribute) if attribute in names else None
+            positions[key] = position
+        if position is None:
+            return None
+        return record.ifc.get_argument(position)
+
+    return read
+
 
 class ColheaderTreeItem(TreeItem):
     """TreeItem for the column headers
@@ -38,10 +81,16 @@ class ColheaderTreeItem(TreeItem):
     :type parent: TreeItem (or derived class), optional
     """
 
+    __slots__ = ("_columntree",)
+
     def __init__(self, data, parent=None):
         self._columntree = data
         self._parent = parent
         self._children = []
+        self._children_by_guid = None
+        self._children_by_label = None
+        self._row = 0
+        self._leaves_count = None
         self._id = None
 
     def data(self, column):
@@ -65,46 +114,38 @@ class ColheaderTreeItem(TreeItem):
 class IfcTreeItem(TreeItem):
     """TreeItem for the Ifc objects
 
-    :param data: IFC entity (e.g. IfcElement) from IfcOpenShell
-    :type data: IfcOpenShell entity
+    The data of the IFC entity is held by an ElementRecord that is shared
+    with the items of the same GUID in the other tree views.
+
+    :param record: Record of the IFC entity, see ElementRecords
+    :type record: ElementRecord
     :param parent: Parent tree item, defaults to None
     :type parent: TreeItem (or derived class), optional
     :param columntree: ColumnsTreeModel instance
     :type columntree: ColumnsTreeModel
-    :param filename: Filename of the IFC file, defaults to None
-    :type filename: str, optional
     """
 
-    def __init__(self, data, parent=None, columntree=None, filename=None):
-        self._ifc_item = data
+    __slots__ = ("_record", "_columntree", "_validators")
+
+    def __init__(self, record, parent=None, columntree=None):
+        self._record = record
         self._parent = parent
-        self._id = self._ifc_item.id()
-        self._guid = self._ifc_item.GlobalId
+        self._id = record.id
         self._children = []
-        self._filenames = []
+        self._children_by_guid = None
+        self._children_by_label = None
+        self._row = 0
+        self._leaves_count = None
         self._columntree = columntree
         self._validators = Validators()
-        if self._ifc_item.is_a("IfcElementType"):
-            linked_object_type = None
-        else:
-            linked_object_type = ifcopenshell.util.element.get_type(self._ifc_item)
-        if linked_object_type:
-            self._linked_type_name = linked_object_type.Name
-            if self._linked_type_name is None:
-                self._linked_type_name = self.tr("Unnamed")
-        else:
-            self._linked_type_name = None
-
-        if filename:
-            self._filenames.append(filename)
 
     def data(self, column):
         """Get the data for the column using IfcOpenShell
 
         The info colums are always part of the view, but may be hidden.
         Pset columns are handled dynamically based on the state of the
-        ColumnsTreeModel. The data is read directly from the IfcOpenShell
-        entity stored in the item.
+        ColumnsTreeModel. The data is read from the ElementRecord and directly
+        from the IfcOpenShell entity stored in the record.
 
         :param column: Column index
         :type column: int
@@ -119,41 +160,35 @@ class IfcTreeItem(TreeItem):
             if count_children > 0:
                 count_leaves = self.leaves_count()
                 if count_leaves != count_children:
-                    return f"{self._ifc_item.is_a()} ({count_children}/{count_leaves})"
+                    return f"{self._record.ifc_class} ({count_children}/{count_leaves})"
                 else:
-                    return f"{self._ifc_item.is_a()} ({count_children})"
-            return self._ifc_item.is_a()
+                    return f"{self._record.ifc_class} ({count_children})"
+            return self._record.ifc_class
         if column == 1:
-            return self._ifc_item.id()
+            return self._record.id
         if column == 2:
-            return self._ifc_item.Name
+            return self._record.ifc.Name
         if column == 3:
-            return self._ifc_item.GlobalId
+            return self._record.guid
         if column == 4:
             try:
-                tag = self._ifc_item.Tag
+                tag = self._record.ifc.Tag
             except AttributeError:
                 tag = None
             return tag
         if column == 5:
             try:
-                return self._ifc_item.ObjectType
+                return self._record.ifc.ObjectType
             except AttributeError:
                 return None
         if column == 6:
-            return self._linked_type_name
+            return self._record.linked_type_name
         if column == 7:
-            return self._ifc_item.Description
+            return self._record.ifc.Description
         if column == 8:
             return self.filenames_str
         if column == 9:
-            try:
-                container = self._ifc_item.ContainedInStructure[
-                    0
-                ].RelatingStructure.Name
-            except (IndexError, AttributeError):
-                container = None
-            return container
+            return self._record.container_name
         if column == 10:
             # Validation
             if self.guid in self._validators.results_by_guid:
@@ -162,23 +197,48 @@ class IfcTreeItem(TreeItem):
             else:
                 return None
 
-        psets = ifcopenshell.util.element.get_psets(self._ifc_item)
         pset_name, attribute = self._columntree.col(column)
-        try:
-            return psets[pset_name][attribute]
-        except KeyError:
-            return None
+        if self._record.ifc_file is None:
+            try:
+                return self.get_psets()[pset_name][attribute]
+            except KeyError:
+                return None
+        return self._record.ifc_file.property_table.get(
+            self._id, pset_name, attribute
+        )
+
+    def get_psets(self, psets_only=False, qtos_only=False):
+        """Get the property sets of the IFC entity
+
+        Uses the cache of the IfcFile, see IfcFile.get_psets().
+
+        :param psets_only: Only return property sets
+        :type psets_only: bool
+        :param qtos_only: Only return quantity sets
+        :type qtos_only: bool
+        :return: Dictionary with the property sets and their properties
+        :rtype: dict
+        """
+        if self._record.ifc_file is None:
+            return ifcopenshell.util.element.get_psets(
+                self._record.ifc, psets_only=psets_only, qtos_only=qtos_only
+            )
+        return self._record.ifc_file.get_psets(
+            self._record.ifc, psets_only=psets_only, qtos_only=qtos_only
+        )
 
     def add_filename(self, filename):
         """Add a filename to the list of filenames
 
         Used if the object is already present when adding a new IFC file.
-        The filename is used to populate the filenames column.
+        The filename is used to populate the filenames column. The list is
+        part of the shared ElementRecord, i.e. the items of the GUID in all
+        tree views are updated at once. Filenames are only added once.
 
         :param filename: Filename of the IFC file
         :type filename: str
         """
-        self._filenames.append(filename)
+        self._record.add_filename(filename)
 
     # def remove_filename(self, filename):
     #     self._filenames.remove(filename)
@@ -192,7 +252,7 @@ class IfcTreeItem(TreeItem):
         :type guid: str
         :return: IfcTreeItem instance or None
         """
-        if self._guid == guid:
+        if self._record.guid == guid:
             return self
         for child in self._children:
             result = child.find_item_by_guid(guid)
@@ -210,7 +270,7 @@ class IfcTreeItem(TreeItem):
         :return: IfcTreeItem instance or None
         """
         try:
-            item_tag = self._ifc_item.Tag
+            item_tag = self._record.ifc.Tag
         except AttributeError:  # Only IfcElement instances have a tag
             item_tag = None
 
@@ -225,12 +285,12 @@ class IfcTreeItem(TreeItem):
     @property
     def filenames(self):
         """List of IFC files containing the object (list of str)"""
-        return self._filenames
+        return self._record.filenames
 
     @property
     def filenames_str(self):
         """String representation of the list of IFC files"""
-        return ", ".join(self._filenames)
+        return ", ".join(self._record.filenames)
 
     @property
     def id(self):
@@ -240,20 +300,25 @@ class IfcTreeItem(TreeItem):
     @property
     def guid(self):
         """Global unique ID (GlobalID) of the object (str)"""
-        return self._guid
+        return self._record.guid
+
+    @property
+    def record(self):
+        """ElementRecord of the object, shared with the other tree views"""
+        return self._record
 
     @property
     def ifc(self):
         """IFC entity instance from IfcOpenShell"""
-        return self._ifc_item
+        return self._record.ifc
 
     @property
     def label(self):
         """First column without counter"""
-        return self._ifc_item.is_a()
+        return self._record.ifc_class
 
     def __repr__(self):
-        return f"IfcTreeItem: {self._ifc_item.is_a()} {self._ifc_item.id()}"
+        return f"IfcTreeItem: {self._record.ifc_class} {self._record.id}"
 
 
 class IfcTreeModelBaseClass(TreeModelBaseclass):
@@ -271,6 +336,10 @@ class IfcTreeModelBaseClass(TreeModelBaseclass):
         self.tab = parent
         self.columntree = self.tab.mainwindow.column_treemodel
         self.first_cols = self.columntree.first_cols
+        # Shared by the models of all tabs
+        self.records = self.tab.tabswidget.element_records
+        # GUID index of the items of the whole tree, filled by item_added()
+        self._items_by_guid = {}
         super(IfcTreeModelBaseClass, self).__init__(data, parent)
 
         # self.columntree.columnsChanged.connect(self.pset_columns_changed)
@@ -284,9 +353,93 @@ class IfcTreeModelBaseClass(TreeModelBaseclass):
             self.add_file(file)
 
     def add_file(self, ifc_file):
-        """To be implemented in derived classes"""
+        """Add data of an IfcFile instance to the tree view
+
+        If an element with a certain GUID is already present in the tree,
+        the existing item is used (and the filename is added to the list of filenames),
+        otherwise a new item is created.
+
+        :param ifc_file: bimsemantic IFC file instance
+        :type ifc_file: IfcFile
+        """
+        self.merge_tree(self.build_tree([ifc_file]))
+
+    def build_tree(self, ifc_files):
+        """Build a detached tree with the data of IfcFile instances
+
+        Does not change the model and can run in a worker thread,
+        the tree is added to the model with merge_tree().
+
+        :param ifc_files: bimsemantic IFC file instances
+        :type ifc_files: list of IfcFile
+        :return: Root item of the detached tree
+        :rtype: TreeItem
+        """
+        root = self.setup_detached_root_item()
+        for ifc_file in ifc_files:
+            self.build_file(ifc_file, root)
+        return root
+
+    def setup_detached_root_item(self):
+        """Setup the root item of a detached tree, see build_tree()"""
+        return TreeItem()
+
+    def build_file(self, ifc_file, root):
+        """Add the data of an IfcFile to a detached tree, to be implemented in derived classes
+
+        :param ifc_file: bimsemantic IFC file instance
+        :type ifc_file: IfcFile
+        :param root: Root item of the detached tree
+        :type root: TreeItem
+        """
         pass
 
+    def merge_tree(self, root):
+        """Merge a detached tree into the model and update the tree view
+
+        The tree view is sorted and expanded with sort_default() and
+        expand_default() after the first file. Later on, the proxy model
+        keeps the sort order and only the new items are expanded with
+        expand_items(), the state of the rest of the view is kept.
+        """
+        is_empty = not self._items_by_guid
+        inserted = super(IfcTreeModelBaseClass, self).merge_tree(root)
+        if is_empty:
+            self.sort_default()
+            self.expand_default()
+        else:
+            self.expand_items(inserted)
+        return inserted
+
+    def filenames_changed(self, guids):
+        """Emit dataChanged for the Filename column of the items of GUIDs
+
+        Called in the GUI thread after the filenames of the shared records
+        changed, see ElementRecords.add_filenames(). All items are checked,
+        since a GUID can be in several places of a tree.
+
+        :param guids: The GUIDs of the records that got a new filename
+        :type guids: set of str
+        """
+        if not guids:
+            return
+        stack = [self._rootItem]
+        while stack:
+            parent = stack.pop()
+            rows = [
+                row for row, child in enumerate(parent.children) if child.guid in guids
+            ]
+            if rows:
+                self._emit_rows_changed(parent, rows, FILENAME_COLUMN, FILENAME_COLUMN)
+            stack.extend(parent.children)
+
+    def item_added(self, item):
+        """Add an item moved into the model and its children to the GUID index"""
+        if item.guid is not None and item.guid not in self._items_by_guid:
+            self._items_by_guid[item.guid] = item
+        for child in item.children:
+            self.item_added(child)
+
     def setup_root_item(self):
         """ "Setup the root item of the tree, containing the column headers"""
         self._rootItem = ColheaderTreeItem(self.columntree, parent=None)
@@ -295,6 +448,50 @@ class IfcTreeModelBaseClass(TreeModelBaseclass):
         """Get the number of columns"""
         return self.columntree.count()
 
+    def column_reader(self, column):
+        """Get a function that reads the values of a column for a list of items
+
+        For IfcTreeItems, the values are read without the checks of
+        IfcTreeItem.data() for every value: info columns directly from the
+        ElementRecord or by the position of the attribute of the entity,
+        property set columns from a dictionary of the whole column per
+        IfcFile (see PropertyTable.items()). Other items and columns use
+        data(), see TreeModelBaseclass.column_reader().
+
+        :param column: The column number
+        :type column: int
+        :return: Function taking a list of items, returns the list of values
+        :rtype: callable
+        """
+        if column in RECORD_COLUMNS:
+            value = attrgetter(RECORD_COLUMNS[column])
+        elif column in ATTRIBUTE_COLUMNS:
+            value = _attribute_reader(ATTRIBUTE_COLUMNS[column])
+        elif len(self.first_cols) <= column < self.columntree.count():
+            pset_name, attribute = self.columntree.col(column)
+            tables = {}
+
+            def value(item):
+                ifc_file = item._record.ifc_file
+                if ifc_file is None:
+                    return item.data(column)
+                table = tables.get(ifc_file)
+                if table is None:
+                    table = dict(ifc_file.property_table.items(pset_name, attribute))
+                    tables[ifc_file] = table
+                return table.get(item._id)
+
+        else:
+            return super(IfcTreeModelBaseClass, self).column_reader(column)
+
+        def read(items):
+            return [
+                value(item) if isinstance(item, IfcTreeItem) else item.data(column)
+                for item in items
+            ]
+
+        return read
+
     def pset_columns_changed(self):
         """Update the tree view when the pset columns have changed in the ColumnsTreeModel"""
         self.beginResetModel()
@@ -302,6 +499,13 @@ class IfcTreeModelBaseClass(TreeModelBaseclass):
         self.endResetModel()
         self.expand_default()
 
+    def sort_default(self):
+        """Called after adding data to sort the tree view
+
+        If not overwritten in derived classes, the tree view is not sorted
+        """
+        pass
+
     def expand_default(self):
         """Called when the tree view is updated to expand the tree
 
@@ -309,32 +513,280 @@ class IfcTreeModelBaseClass(TreeModelBaseclass):
         """
         self.tab.tree.expandAll()
 
+    def expand_items(self, items):
+        """Called after adding data to expand the new items in the tree view
+
+        If not overwritten in derived classes, expand all levels of the items
+
+        :param items: Items that were inserted into the model
+        :type items: list of TreeItem
+        """
+        for item in items:
+            proxy_index = self.tab.proxymodel.mapFromSource(self.item_index(item))
+            if proxy_index.isValid():
+                self.tab.tree.expandRecursively(proxy_index)
+
     def hide_info_column(self, col_index, ishidden):
         """Toggle visibility of the info columns"""
         self.tab.tree.setColumnHidden(col_index, ishidden)
 
     def get_child_by_guid(self, parent, guid):
         """Get the child item with a given GUID if already present, otherwise None"""
-        for child in parent.children:
-            if child.guid == guid:
-                return child
-        return None
+        return parent.child_by_guid(guid)
+
+    def add_ifc_item(self, ifc_object, parent, ifc_file):
+        """Get or create the IfcTreeItem of an IFC entity as child of parent
+
+        If the parent already has a child with the GUID of the entity,
+        the filename is added to the existing item. Otherwise a new item
+        is appended to the parent.
+
+        :param ifc_object: IFC entity (e.g. IfcElement) from IfcOpenShell
+        :type ifc_object: IfcOpenShell entity
+        :param parent: Parent tree item
+        :type parent: TreeItem (or derived class)
+        :param ifc_file: IfcFile containing the entity
+        :type ifc_file: IfcFile
+        :return: The existing or new item
+        :rtype: IfcTreeItem
+        """
+        item = self.get_child_by_guid(parent, ifc_object.GlobalId)
+        if item:
+            # Deferred in a worker, the record may belong to items in the views
+            self.records.add_filename(item.guid, ifc_file.filename)
+            return item
+        record = self.records.get_record(ifc_object, ifc_file)
+        item = IfcTreeItem(record, parent, self.columntree)
+        parent.appendChild(item)
+        return item
 
     def find_index_by_guid(self, guid):
-        """Search the tree for an item by its GUID and return the QModelIndex"""
-        item = self._rootItem.find_item_by_guid(guid)
+        """Get the QModelIndex of an item by its GUID using the GUID index"""
+        item = self._items_by_guid.get(guid)
         if item:
             return self.createIndex(item.row(), 0, item)
         return QModelIndex()
 
     def find_index_by_tag(self, tag):
         """Search the tree for an item by its tag and return the QModelIndex"""
+        self.fetch_all()
         item = self._rootItem.find_item_by_tag(tag)
         if item:
             return self.createIndex(item.row(), 0, item)
         return QModelIndex()
 
 
+def get_location_children(ifc_object, ifc_file=None):
+    """Get the children of an IFC entity in the Location tree
+
+    The elements contained in a spatial element are returned apart from
+    the other children (decomposition, openings, fillings), since only
+    their decomposition is added to the tree. If the IfcFile is given,
+    the contained elements are taken from its containment map.
+
+    :param ifc_object: IFC entity from IfcOpenShell
+    :type ifc_object: IfcOpenShell entity
+    :param ifc_file: IfcFile containing the entity, defaults to None
+    :type ifc_file: IfcFile, optional
+    :return: Tuple of lists (elements, children)
+    :rtype: tuple
+    """
+    children = []
+    elements = []
+
+    # There are many kinds of relationships in IFC
+    if ifc_file:
+        elements = list(ifc_file.get_contained_elements(ifc_object))
+    else:
+        try:
+            contains = ifc_object.ContainsElements  # Returns a tuple (set in IFC)
+            for c in contains:
+                elements.extend(c.RelatedElements)
+        except AttributeError:
+            elements = []
+
+    try:
+        decomposed = ifc_object.IsDecomposedBy
+        for d in decomposed:
+            children.extend(d.RelatedObjects)
+    except AttributeError:
+        pass
+
+    try:
+        openings = ifc_object.HasOpenings
+        for o in openings:
+            children.append(o.RelatedOpeningElement)
+    except AttributeError:
+        pass
+
+    try:
+        fillings = ifc_object.HasFillings
+        for f in fillings:
+            children.append(f.RelatedBuildingElement)
+    except AttributeError:
+        pass
+
+    try:
+        connected = ifc_object.ConnectedTo
+        for c in connected:
+            children.extend(c.RelatedElements)
+    except AttributeError:
+        pass
+
+    return elements, children
+
+
+def get_decomposition(ifc_object):
+    """Get the IFC entities decomposing an element (IsDecomposedBy)
+
+    :param ifc_object: IFC entity from IfcOpenShell
+    :type ifc_object: IfcOpenShell entity
+    :return: List of IFC entities
+    :rtype: list
+    """
+    related = []
+    try:
+        dec = ifc_object.IsDecomposedBy
+        for d in dec:
+            related.extend(d.RelatedObjects)
+    except AttributeError:
+        pass
+    return related
+
+
+class LocationIndex:
+    """Index of the items of the Location tree, without creating tree items
+
+    Used by the LocationTreeModel in lazy mode to add the children of an
+    item on demand and to get the counters of the first column.
+
+    The children are stored by the key of the parent: a tuple (GUID, kind),
+    or None for the root. The kind is "structure" for items with all kinds
+    of children (see get_location_children()), "element" for elements
+    contained in a spatial element (only the decomposition is added) and
+    "part" for the parts of these elements, without children. For each
+    child GUID the kind and the list of sources (entity, IfcFile) is kept.
+    """
+
+    def __init__(self):
+        self._children = {}
+        self._parents = {}
+        self._leaves_counts = {}
+
+    def add_file(self, ifc_file):
+        """Add the Location tree of an IfcFile to the index
+
+        :param ifc_file: bimsemantic IFC file instance
+        :type ifc_file: IfcFile
+        """
+        project = ifc_file.model.by_type("IfcProject")[0]
+        self._add_child(None, project, "project", ifc_file)
+
+        visited = set()
+        stack = [(project, "project")]
+        while stack:
+            ifc_object, kind = stack.pop()
+            key = (ifc_object.GlobalId, kind)
+            if key in visited:
+                continue
+            visited.add(key)
+
+            if kind == "project":
+                children = [
+                    (site, "structure") for site in ifc_file.model.by_type("IfcSite")
+                ]
+            elif kind == "structure":
+                elements, others = get_location_children(ifc_object, ifc_file)
+                children = [(element, "element") for element in elements]
+                children.extend((child, "structure") for child in others)
+            elif kind == "element":
+                children = [(part, "part") for part in get_decomposition(ifc_object)]
+            else:
+                children = []
+
+            for child, child_kind in children:
+                child_kind = self._add_child(key, child, child_kind, ifc_file)
+                stack.append((child, child_kind))
+        self._leaves_counts = {}
+
+    def _add_child(self, key, ifc_object, kind, ifc_file):
+        """Add a child to the parent with the key and return the kind of the child"""
+        children = self._children.setdefault(key, {})
+        guid = ifc_object.GlobalId
+        child = children.get(guid)
+        if child is None:
+            children[guid] = [kind, [(ifc_object, ifc_file)]]
+            self._parents.setdefault(guid, key)
+            return kind
+        if child[1][-1][1] is not ifc_file:
+            child[1].append((ifc_object, ifc_file))
+        if kind == "structure":
+            # Same as reusing the item in LocationTreeModel.add_items()
+            child[0] = kind
+        return child[0]
+
+    def update(self, other):
+        """Add the items of another LocationIndex (e.g. of another file)
+
+        :param other: The other index
+        :type other: LocationIndex
+        """
+        for key, other_children in other._children.items():
+            children = self._children.setdefault(key, {})
+            for guid, (kind, sources) in other_children.items():
+                child = children.get(guid)
+                if child is None:
+                    children[guid] = [kind, list(sources)]
+                    continue
+                child[1].extend(sources)
+                if kind == "structure":
+                    child[0] = kind
+        for guid, key in other._parents.items():
+            self._parents.setdefault(guid, key)
+        self._leaves_counts = {}
+
+    def children(self, key):
+        """Get the children of the parent with the key
+
+        :param key: Tuple (GUID, kind) or None for the root
+        :return: Dictionary {GUID: [kind, list of tuples (entity, IfcFile)]}
+        :rtype: dict
+        """
+        return self._children.get(key, {})
+
+    def parent_key(self, guid):
+        """Get the key of the (first) parent of an item, see children()"""
+        return self._parents.get(guid)
+
+    def child_count(self, key):
+        """Get the number of children of the parent with the key"""
+        return len(self._children.get(key, ()))
+
+    def leaves_count(self, key):
+        """Get the number of leaves below the parent with the key, see TreeItem.leaves_count()"""
+        count = self._leaves_counts.get(key)
+        if count is None:
+            count = 0
+            for guid, (kind, _) in self.children(key).items():
+                count += self.leaves_count((guid, kind))
+            count = max(count, 1)
+            self._leaves_counts[key] = count
+        return count
+
+    def label(self, label, key):
+        """Add the counters to the label of an item, as IfcTreeItem.data() does"""
+        count_children = self.child_count(key)
+        if count_children == 0:
+            return label
+        count_leaves = self.leaves_count(key)
+        if count_leaves != count_children:
+            return f"{label} ({count_children}/{count_leaves})"
+        return f"{label} ({count_children})"
+
+    def __repr__(self):
+        return f"LocationIndex ({len(self._children)} parents)"
+
+
 class LocationTreeModel(IfcTreeModelBaseClass):
     """Model for the Location tree view
 
@@ -342,124 +794,213 @@ class LocationTreeModel(IfcTreeModelBaseClass):
     i.e. IfcProject, IfcSite, IfcBuilding, IfcBuildingStorey, IfcSpace, etc.
     The data of several IFC files can be added to the tree with add_file().
 
+    If the first files added have more than LAZY_LOCATION_TREE_ELEMENTS
+    IfcElements, the model is lazy: build_tree() only builds a LocationIndex
+    and the children of an item are added when the tree view asks for them
+    with canFetchMore() and fetchMore(). The counters in the first column
+    are taken from the index.
+
     :param data: Instance if IfcFiles
     :param parent: Parent widget should be the IfcTreeTab instance
     """
 
-    def add_file(self, ifc_file):
-        """Add data of an IfcFile instance to the tree view
+    def __init__(self, data, parent):
+        # Set with the first files in build_tree()
+        self.lazy = None
+        self._location_index = LocationIndex()
+        # Keys of the items in the LocationIndex (only in lazy mode)
+        self._item_keys = {}
+        self._unfetched = set()
+        super(LocationTreeModel, self).__init__(data, parent)
+
+    def build_tree(self, ifc_files):
+        """Build a detached tree, or a LocationIndex in lazy mode
+
+        :param ifc_files: bimsemantic IFC file instances
+        :type ifc_files: list of IfcFile
+        :return: Root item of the detached tree or LocationIndex
+        :rtype: TreeItem or LocationIndex
+        """
+        if self.lazy is None:
+            count = sum(len(f.model.by_type("IfcElement")) for f in ifc_files)
+            self.lazy = count > LAZY_LOCATION_TREE_ELEMENTS
+        if not self.lazy:
+            return super(LocationTreeModel, self).build_tree(ifc_files)
+        index = LocationIndex()
+        for ifc_file in ifc_files:
+            index.add_file(ifc_file)
+        return index
+
+    def build_file(self, ifc_file, root):
+        """Add the data of an IfcFile to a detached tree, see build_tree()
 
-        If an element with a certain GUID is already present in the tree,
-        the existing item is used (and the filename is added to the list of filenames),
-        otherwise a new item is created.
         :param ifc_file: bimsemantic IFC file instance
         :type ifc_file: IfcFile
+        :param root: Root item of the detached tree
+        :type root: TreeItem
         """
-        self.beginResetModel()
-
-        filename = ifc_file.filename
         project = ifc_file.model.by_type("IfcProject")[0]
 
-        # Check if the project is already in the tree
-        project_item = self.get_child_by_guid(self._rootItem, project.GlobalId)
-        if project_item:
-            project_item.add_filename(filename)
-        else:
-            project_item = IfcTreeItem(
-                project, self._rootItem, self.columntree, filename
-            )
-            self._rootItem.appendChild(project_item)
+        # The project item is reused if the project is already in the tree
+        project_item = self.add_ifc_item(project, root, ifc_file)
 
         for site in ifc_file.model.by_type("IfcSite"):
-            self.add_items(site, project_item, filename)
-
-        self.endResetModel()
+            self.add_items(site, project_item, ifc_file)
 
-        self.tab.proxymodel.sort(0, Qt.SortOrder.AscendingOrder)
-        self.expand_default()
-
-    def add_items(self, ifc_object, parent, filename):
-        """Helper method for add_file to add items to the tree recursively"""
-        # Check if the object is already in the tree
-        item = self.get_child_by_guid(parent, ifc_object.GlobalId)
-        if item:
-            item.add_filename(filename)
-        else:
-            item = IfcTreeItem(ifc_object, parent, self.columntree, filename)
-            parent.appendChild(item)
+    def _merge_children(self, parent, detached_parent, inserted):
+        """In lazy mode, merge the LocationIndex and update the fetched items"""
+        if not isinstance(detached_parent, LocationIndex):
+            return super(LocationTreeModel, self)._merge_children(
+                parent, detached_parent, inserted
+            )
+        self._location_index.update(detached_parent)
+        return self._update_children(parent, inserted)
 
-        children = []
-        elements = []
+    def _update_children(self, item, inserted):
+        """Add missing children of a fetched item from the LocationIndex
 
-        # There are many kinds of relationships in IFC
-        try:
-            contains = ifc_object.ContainsElements  # Returns a tuple (set in IFC)
-            for c in contains:
-                elements.extend(c.RelatedElements)
-        except AttributeError:
-            elements = []
+        The filenames of existing children are updated and the fetched
+        children are updated recursively.
+        """
+        new_items = []
+        changed_rows = []
+        key = self._item_keys.get(item)
+        for guid, (kind, sources) in self._location_index.children(key).items():
+            child = item.child_by_guid(guid)
+            if child is None:
+                new_items.append(self._create_item(guid, kind, sources))
+                continue
+            for _, ifc_file in sources:
+                child.add_filename(ifc_file.filename)
+            self._item_keys[child] = (guid, kind)
+            changed_rows.append(child.row())
+            if child not in self._unfetched:
+                self._update_children(child, inserted)
+
+        if changed_rows:
+            self._emit_rows_changed(item, changed_rows, 0, self.columnCount() - 1)
+        if new_items:
+            self.insert_items(item, new_items)
+            inserted.extend(new_items)
+        return bool(new_items or changed_rows)
+
+    def _create_item(self, guid, kind, sources):
+        """Create an IfcTreeItem for a child in the LocationIndex"""
+        for ifc_object, ifc_file in sources:
+            record = self.records.get_record(ifc_object, ifc_file)
+        item = IfcTreeItem(record, None, self.columntree)
+        self._item_keys[item] = (guid, kind)
+        if self._location_index.child_count((guid, kind)) > 0:
+            self._unfetched.add(item)
+        return item
+
+    def fetch_item(self, item):
+        """Add the children of an item that were not added yet (lazy mode)"""
+        self._unfetched.discard(item)
+        new_items = []
+        key = self._item_keys.get(item)
+        for guid, (kind, sources) in self._location_index.children(key).items():
+            if item.child_by_guid(guid) is None:
+                new_items.append(self._create_item(guid, kind, sources))
+        if new_items:
+            self.insert_items(item, new_items)
+
+    def fetch_all(self):
+        """Add all items that were not added yet (lazy mode)"""
+        while self._unfetched:
+            self.fetch_item(self._unfetched.pop())
+
+    def fetch_ancestors(self, guid):
+        """Add the ancestors of an item with the GUID that is not added yet (lazy mode)"""
+        path = []
+        key = self._location_index.parent_key(guid)
+        while key is not None:
+            path.append(key[0])
+            if key[0] in self._items_by_guid:
+                break
+            key = self._location_index.parent_key(key[0])
+        for parent_guid in reversed(path):
+            item = self._items_by_guid.get(parent_guid)
+            if item in self._unfetched:
+                self.fetch_item(item)
+
+    def canFetchMore(self, parent):
+        """Check if the children of an item must be added (lazy mode)"""
+        return parent.isValid() and parent.internalPointer() in self._unfetched
+
+    def fetchMore(self, parent):
+        """Add the children of an item (lazy mode), called by the tree view"""
+        if parent.isValid():
+            self.fetch_item(parent.internalPointer())
+
+    def hasChildren(self, parent=QModelIndex()):
+        """Items that were not fetched yet also have children (lazy mode)"""
+        if parent.isValid() and parent.internalPointer() in self._unfetched:
+            return True
+        return super(LocationTreeModel, self).hasChildren(parent)
+
+    def data(self, index, role=Qt.DisplayRole):
+        """Get the data for a given index
+
+        In lazy mode, the counters of the first column are taken from
+        the LocationIndex, since not all children may be added.
+        """
+        if self.lazy and index.isValid() and index.column() == 0:
+            item = index.internalPointer()
+            key = self._item_keys.get(item)
+            if key is not None and role == Qt.DisplayRole:
+                return self._location_index.label(item.label, key)
+        return super(LocationTreeModel, self).data(index, role)
 
-        try:
-            decomposed = ifc_object.IsDecomposedBy
-            for d in decomposed:
-                children.extend(d.RelatedObjects)
-        except AttributeError:
-            pass
+    def find_index_by_guid(self, guid):
+        """Get the QModelIndex of an item by its GUID, adding it if needed"""
+        if self.lazy and guid not in self._items_by_guid:
+            self.fetch_ancestors(guid)
+        return super(LocationTreeModel, self).find_index_by_guid(guid)
 
-        try:
-            openings = ifc_object.HasOpenings
-            for o in openings:
-                children.append(o.RelatedOpeningElement)
-        except AttributeError:
-            pass
+    def sort_default(self):
+        """Sort the tree view by the first column after adding data"""
+        self.tab.proxymodel.sort(0, Qt.SortOrder.AscendingOrder)
 
-        try:
-            fillings = ifc_object.HasFillings
-            for f in fillings:
-                children.append(f.RelatedBuildingElement)
-        except AttributeError:
-            pass
+    def add_items(self, ifc_object, parent, ifc_file):
+        """Helper method for add_file to add items to the tree recursively"""
+        # The item is reused if the object is already in the tree
+        item = self.add_ifc_item(ifc_object, parent, ifc_file)
 
-        try:
-            connected = ifc_object.ConnectedTo
-            for c in connected:
-                children.extend(c.RelatedElements)
-        except AttributeError:
-            pass
+        elements, children = get_location_children(ifc_object, ifc_file)
 
         for element in elements:
-            element_item = self.get_child_by_guid(item, element.GlobalId)
-            if element_item:
-                element_item.add_filename(filename)
-            else:
-                element_item = IfcTreeItem(element, item, self.columntree, filename)
-                item.appendChild(element_item)
+            element_item = self.add_ifc_item(element, item, ifc_file)
 
             # Elements may be composed by other elements
-            related = []
-            try:
-                dec = element.IsDecomposedBy
-                for d in dec:
-                    related.extend(d.RelatedObjects)
-            except AttributeError:
-                pass
-            for rel in related:
-                rel_item = self.get_child_by_guid(element_item, rel.GlobalId)
-                if rel_item:
-                    rel_item.add_filename(filename)
-                else:
-                    rel_item = IfcTreeItem(rel, element_item, self.columntree, filename)
-                    element_item.appendChild(rel_item)
+            for rel in get_decomposition(element):
+                self.add_ifc_item(rel, element_item, ifc_file)
 
         for child in children:
-            self.add_items(child, item, filename)
+            self.add_items(child, item, ifc_file)
 
     def expand_default(self):
         """Called when the tree view is updated to expand the tree
 
-        If not overwritten in derived classes, expand all levels
+        Expand all levels, or in lazy mode only the levels above the storeys
+        (project, site, building), since expanding adds the children.
         """
-        self.tab.tree.expandAll()
+        if self.lazy:
+            self.tab.tree.expandToDepth(2)
+        else:
+            self.tab.tree.expandAll()
+
+    def expand_items(self, items):
+        """Expand the new items, in lazy mode only above the storeys"""
+        if not self.lazy:
+            super(LocationTreeModel, self).expand_items(items)
+            return
+        for item in items:
+            if item.level() > 2:
+                continue
+            proxy_index = self.tab.proxymodel.mapFromSource(self.item_index(item))
+            if proxy_index.isValid():
+                self.tab.tree.expand(proxy_index)
 
     def __repr__(self):
         return "LocationTreeModel"
@@ -478,51 +1019,44 @@ class TypeTreeModel(IfcTreeModelBaseClass):
     :param parent: Parent widget should be the IfcTreeTab instance
     """
 
-    def add_file(self, ifc_file):
-        """Add data of an IfcFile instance to the tree view
+    def build_file(self, ifc_file, root):
+        """Add the data of an IfcFile to a detached tree, see build_tree()
 
-        If an element with a certain GUID is already present in the tree,
-        the existing item is used (and the filename is added to the list of filenames),
-        otherwise a new item is created.
         :param ifc_file: bimsemantic IFC file instance
         :type ifc_file: IfcFile
+        :param root: Root item of the detached tree
+        :type root: TreeItem
         """
-        self.beginResetModel()
-
-        filename = ifc_file.filename
-
         elements = ifc_file.model.by_type("IfcElement")
 
         for element in elements:
             ifc_class = element.is_a()
             objecttype = element.ObjectType
 
-            class_item = self.get_child_by_label(self._rootItem, ifc_class)
+            class_item = self.get_child_by_label(root, ifc_class)
             if not class_item:
-                class_item = TreeItem([ifc_class], self._rootItem)
-                self._rootItem.appendChild(class_item)
+                class_item = TreeItem([ifc_class], root)
+                root.appendChild(class_item)
 
             type_item = self.get_child_by_label(class_item, objecttype)
             if not type_item:
                 type_item = TreeItem([objecttype], class_item)
                 class_item.appendChild(type_item)
 
-            element_item = self.get_child_by_guid(type_item, element.GlobalId)
-            if element_item:
-                element_item.add_filename(filename)
-            else:
-                element_item = IfcTreeItem(
-                    element, type_item, self.columntree, filename
-                )
-                type_item.appendChild(element_item)
-
-        self.endResetModel()
-
-        self.expand_default()
+            self.add_ifc_item(element, type_item, ifc_file)
 
     def expand_default(self):
         self.tab.tree.expandToDepth(0)
 
+    def expand_items(self, items):
+        """Only expand new items of the first level, like expand_default()"""
+        for item in items:
+            if item.parent() is not self._rootItem:
+                continue
+            proxy_index = self.tab.proxymodel.mapFromSource(self.item_index(item))
+            if proxy_index.isValid():
+                self.tab.tree.expand(proxy_index)
+
     def __repr__(self):
         return "TypeTreeModel"
 
@@ -541,81 +1075,67 @@ class FlatTreeModel(IfcTreeModelBaseClass):
     def setup_root_item(self):
         """ "Setup the root item and top level nodes of the tree"""
         self._rootItem = ColheaderTreeItem(self.columntree, parent=None)
+        self.add_top_level_items(self._rootItem)
+        self.elements_item, self.types_item, self.spatialelements_item = (
+            self._rootItem.children
+        )
 
-        self.elements_item = TreeItem(["IfcElement"], self._rootItem, "IfcElement")
-        self._rootItem.appendChild(self.elements_item)
+    def setup_detached_root_item(self):
+        """Setup the root item and top level nodes of a detached tree"""
+        root = TreeItem()
+        self.add_top_level_items(root)
+        return root
 
-        self.types_item = TreeItem(["IfcElementType"], self._rootItem, "IfcElementType")
-        self._rootItem.appendChild(self.types_item)
+    def add_top_level_items(self, root):
+        """Add the top level nodes for IfcElements, IfcElementTypes and IfcSpatialElements"""
+        for label in ["IfcElement", "IfcElementType", "IfcSpatialElement"]:
+            root.appendChild(TreeItem([label], root, label))
 
-        self.spatialelements_item = TreeItem(
-            ["IfcSpatialElement"], self._rootItem, "IfcSpatialElement"
-        )
-        self._rootItem.appendChild(self.spatialelements_item)
-
-    def add_file(self, ifc_file):
-        """Add data of an IfcFile instance to the tree view
+    def build_file(self, ifc_file, root):
+        """Add the data of an IfcFile to a detached tree, see build_tree()
 
-        If an element with a certain GUID is already present in the tree,
-        the existing item is used (and the filename is added to the list of filenames),
-        otherwise a new item is created.
         :param ifc_file: bimsemantic IFC file instance
         :type ifc_file: IfcFile
+        :param root: Root item of the detached tree
+        :type root: TreeItem
         """
-        self.beginResetModel()
-
-        filename = ifc_file.filename
+        elements_item, types_item, spatialelements_item = root.children
 
         elements = ifc_file.model.by_type("IfcElement")
 
         for element in elements:
-            element_item = self.get_child_by_guid(self.elements_item, element.GlobalId)
-            if element_item:
-                element_item.add_filename(filename)
-            else:
-                element_item = IfcTreeItem(
-                    element, self.elements_item, self.columntree, filename
-                )
-                self.elements_item.appendChild(element_item)
+            self.add_ifc_item(element, elements_item, ifc_file)
 
         element_types = ifc_file.model.by_type("IfcElementType")
 
         for element_type in element_types:
-            type_item = self.get_child_by_guid(self.types_item, element_type.GlobalId)
-            if type_item:
-                type_item.add_filename(filename)
-            else:
-                type_item = IfcTreeItem(
-                    element_type, self.types_item, self.columntree, filename
-                )
-                self.types_item.appendChild(type_item)
+            self.add_ifc_item(element_type, types_item, ifc_file)
 
         if ifc_file.model.schema_version[0] == 2:
             spatialelements = ifc_file.model.by_type("IfcSpatialStructureElement")
-            self.spatialelements_item.set_data(0, "IfcSpatialStructureElement")
+            spatialelements_item.set_data(0, "IfcSpatialStructureElement")
         elif ifc_file.model.schema_version[0] >= 4:
             spatialelements = ifc_file.model.by_type("IfcSpatialElement")
         else:
             spatialelements = []
 
         for spatialelement in spatialelements:
-            spatial_item = self.get_child_by_guid(
-                self.spatialelements_item, spatialelement.GlobalId
-            )
-            if spatial_item:
-                spatial_item.add_filename(filename)
-            else:
-                spatial_item = IfcTreeItem(
-                    spatialelement, self.spatialelements_item, self.columntree, filename
-                )
-                self.spatialelements_item.appendChild(spatial_item)
+            self.add_ifc_item(spatialelement, spatialelements_item, ifc_file)
 
-        self.endResetModel()
+    def merge_item(self, item, detached_item):
+        """Also take over the label of a top level node if it was changed (IFC2X3)"""
+        if not isinstance(item, IfcTreeItem) and detached_item.label != detached_item.id:
+            item.set_data(0, detached_item.label)
+        super(FlatTreeModel, self).merge_item(item, detached_item)
 
     def expand_default(self):
         """Do not expand the treeview in this case"""
         pass
 
+    def expand_items(self, items):
+        """Do not expand the treeview in this case"""
+        pass
+
     def __repr__(self):
         return "FlatTreeModel"
 
@@ -668,15 +1188,22 @@ class IfcCustomTreeModel(IfcTreeModelBaseClass):
             # This happens because add_file() is called on init but
             # set_custom_fields() must be called first
             return
+        super(IfcCustomTreeModel, self).add_file(ifc_file)
 
-        self.beginResetModel()
+    def build_file(self, ifc_file, root):
+        """Add the data of an IfcFile to a detached tree, see build_tree()
 
+        :param ifc_file: bimsemantic IFC file instance
+        :type ifc_file: IfcFile
+        :param root: Root item of the detached tree
+        :type root: TreeItem
+        """
         filename = ifc_file.filename
 
         elements = ifc_file.model.by_type("IfcElement")
 
         for element in elements:
-            parent_item = self._rootItem
+            parent_item = root
             for customfield in self._customfields:
                 if customfield.fieldtype == CustomFieldType.IFCCLASS:
                     data = element.is_a()
@@ -686,7 +1213,7 @@ class IfcCustomTreeModel(IfcTreeModelBaseClass):
                         data = self.nan
 
                 elif customfield.fieldtype == CustomFieldType.LINKEDOBJECTTYPE:
-                    linked_type = ifcopenshell.util.element.get_type(element)
+                    linked_type = ifc_file.get_type(element)
                     if linked_type:
                         data = linked_type.Name
                         if data is None:
@@ -694,18 +1221,19 @@ class IfcCustomTreeModel(IfcTreeModelBaseClass):
                     else:
                         data = self.nan
                 elif customfield.fieldtype == CustomFieldType.PSET:
-                    psets = ifcopenshell.util.element.get_psets(element)
-                    try:
-                        data = psets[customfield.keys[0]][customfield.keys[1]]
-                    except KeyError:
-                        data = self.nan
+                    data = ifc_file.property_table.get(
+                        element.id(),
+                        customfield.keys[0],
+                        customfield.keys[1],
+                        default=self.nan,
+                    )
                 elif customfield.fieldtype == CustomFieldType.FILENAME:
                     data = filename
                 elif customfield.fieldtype == CustomFieldType.CONTAINEDIN:
-                    try:
-                        container = element.ContainedInStructure[0].RelatingStructure
+                    container = ifc_file.get_container(element)
+                    if container:
                         data = f"{container.is_a()} {container.Name}"
-                    except (IndexError, AttributeError):
+                    else:
                         data = self.nan
                 else:
                     raise ValueError("Invalid field type")
@@ -717,16 +1245,7 @@ class IfcCustomTreeModel(IfcTreeModelBaseClass):
 
                 parent_item = customfield_item
 
-            item = self.get_child_by_guid(parent_item, element.GlobalId)
-            if item:
-                item.add_filename(filename)
-            else:
-                item = IfcTreeItem(element, parent_item, self.columntree, filename)
-                parent_item.appendChild(item)
-
-        self.endResetModel()
-
-        self.expand_default()
+            self.add_ifc_item(element, parent_item, ifc_file)
 
     def __repr__(self):
         return f"CustomTreeModel {self.name}"
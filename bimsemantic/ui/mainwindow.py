@@ -41,12 +41,23 @@ from PySide6.QtWidgets import (
 
 # from ifcopenshell import entity_instance
 import bimsemantic
-from bimsemantic.util import IfcFiles, Validators
+from bimsemantic.util import (
+    IfcFiles,
+    IfcCache,
+    Validators,
+    ARROW_FORMATS,
+    arrow_format,
+    element_table_columns,
+    has_pyarrow,
+)
 from bimsemantic.ui import (
     IfcTabs,
     IfcTreeTab,
     ColumnsTreeModel,
     WorkerAddFiles,
+    WorkerBuildTrees,
+    WorkerExportCsv,
+    WorkerExportTable,
     CustomTreeDialog,
     PsetDockWidget,
     DetailsDock,
@@ -65,7 +76,9 @@ class MainWindow(QMainWindow):
         self.setWindowTitle("BIM Semantic Viewer")
         self.setGeometry(100, 100, 800, 600)
 
-        self.ifcfiles = IfcFiles()
+        # Sidecar cache of the derived data of the IFC files
+        self.ifccache = IfcCache()
+        self.ifcfiles = IfcFiles(cache=self.ifccache)
         self.validators = Validators(self.ifcfiles)
         self.idsrules = []
 
@@ -78,11 +91,15 @@ class MainWindow(QMainWindow):
         self.statusbar.addPermanentWidget(self.infolabel)
         self.statusbar.addPermanentWidget(self.progressbar)
 
-        self.column_treemodel = ColumnsTreeModel(parent=self)
-        self.tabs = IfcTabs(self)
-
+        # The proxy models of the tabs need the thread pool for filtering
         self.threadpool = QThreadPool()
         self.workers = []
+        self.export_worker = None
+        # Incremented by close_all(), results of workers of older generations are dropped
+        self.tree_generation = 0
+
+        self.column_treemodel = ColumnsTreeModel(parent=self)
+        self.tabs = IfcTabs(self)
 
         self.setup_menus()
         self.create_dock_widgets()
@@ -285,34 +302,108 @@ class MainWindow(QMainWindow):
             self.progressbar.setRange(0, 0)  # Range 0,0 means indeterminate but active
             self.ignoredfiles = []
             worker = WorkerAddFiles(self.ifcfiles, filenames)
-            worker.signals.result.connect(self.add_ifcs_to_trees)
+            generation = self.tree_generation
+            worker.signals.result.connect(
+                lambda ifcfiles: self.add_ifcs_to_trees(ifcfiles, generation)
+            )
             worker.signals.error.connect(self.on_error)
             worker.signals.finished.connect(self.on_finished)
             worker.signals.feedback.connect(
                 lambda s: self.statusbar.showMessage(self.tr("Open file %s") % s)
             )
             worker.signals.progress.connect(self.on_progress)
-            self.threadpool.start(worker)
+            self.start_worker(worker)
+
+    def start_worker(self, worker):
+        """Start a worker that is stopped by close_all() and closeEvent()
+
+        The worker is kept in self.workers until it is finished.
+
+        :param worker: The worker, with signals and stop()
+        :type worker: QRunnable
+        """
+        self.workers.append(worker)
+        worker.signals.finished.connect(lambda: self.remove_worker(worker))
+        self.threadpool.start(worker)
 
-    def add_ifcs_to_trees(self, ifcfiles):
+    def remove_worker(self, worker):
+        """Remove a finished worker from self.workers"""
+        if worker in self.workers:
+            self.workers.remove(worker)
+
+    def stop_workers(self):
+        """Stop all workers of self.workers"""
+        for worker in self.workers:
+            worker.stop()
+        self.workers = []
+
+    def add_ifcs_to_trees(self, ifcfiles, generation=None):
         """Add data of IfcFile objects to the treeviews
 
         Callback of the WorkerAddFiles worker. Adds the data of the IfcFile objects
-        to the column treeview and all IFC treeviews in self.tabs.
-        If no file was open before, the details dock is set to show an overview.
+        to the column treeview. The data of the pset and qset docks and of all
+        IFC treeviews in self.tabs is prepared by the WorkerBuildTrees worker
+        and added in merge_trees(). Files opened before close_all() are ignored.
 
         :param ifcfiles: List of IfcFile objects
+        :param generation: The tree_generation when the files were opened
+        :type generation: int, optional
         """
-        self.progressbar.setRange(0, len(ifcfiles) + 1)
+        if generation is not None and generation != self.tree_generation:
+            return
         self.statusbar.showMessage(self.tr("Add files to treeviews"))
-        self.psetdock.add_files(ifcfiles)
-        if self.qsetdock is not None:
-            self.qsetdock.add_files(ifcfiles)
-        self.progressbar.setValue(1)
-        for i, ifcfile in enumerate(ifcfiles):
+        for ifcfile in ifcfiles:
             self.column_treemodel.add_file(ifcfile)
-            self.tabs.add_file(ifcfile)
-            self.progressbar.setValue(i + 2)
+
+        jobs = [
+            (
+                self.tr("Psets"),
+                self.psetdock.treemodel.build_tree,
+                self.psetdock.add_tree,
+            )
+        ]
+        if self.qsetdock is not None:
+            jobs.append(
+                (
+                    self.tr("Qsets"),
+                    self.qsetdock.treemodel.build_tree,
+                    self.qsetdock.add_tree,
+                )
+            )
+        jobs.extend(self.tabs.build_jobs())
+
+        self.progressbar.setRange(0, 100)
+        self.progressbar.setValue(0)
+        worker = WorkerBuildTrees(
+            jobs, ifcfiles, self.tree_generation, self.tabs.element_records
+        )
+        worker.signals.result.connect(self.merge_trees)
+        worker.signals.error.connect(self.on_error)
+        worker.signals.feedback.connect(
+            lambda s: self.statusbar.showMessage(self.tr("Build tree %s") % s)
+        )
+        worker.signals.progress.connect(self.on_progress)
+        self.start_worker(worker)
+
+    def merge_trees(self, result):
+        """Add the detached trees built by the WorkerBuildTrees worker
+
+        Runs in the GUI thread. If no file was open before,
+        the details dock is set to show an overview. The trees of
+        files that were opened before close_all() are dropped.
+
+        :param result: Tuple (generation, results, filenames), results is
+            a list of tuples (merge, root), filenames a list of tuples
+            (guid, filename) of existing records
+        """
+        generation, results, filenames = result
+        if generation != self.tree_generation:
+            return
+        self.statusbar.showMessage(self.tr("Add files to treeviews"))
+        changed_guids = self.tabs.element_records.add_filenames(filenames)
+        for merge, root in results:
+            merge(root)
+        self.tabs.filenames_changed(changed_guids)
         self.detailsdock.new_files()
         self.statusbar.clearMessage()
         self.progressbar.reset()
@@ -329,13 +420,13 @@ class MainWindow(QMainWindow):
         )
 
     def on_progress(self, progress):
-        """Callback for progress bar updates of the WorkerAddFiles worker"""
+        """Callback for progress bar updates of the workers"""
         if self.progressbar.maximum() == 0:
             self.progressbar.setRange(0, 100)
         self.progressbar.setValue(progress)
 
     def on_error(self, error):
-        """Callback for error messages of the WorkerAddFiles worker"""
+        """Callback for error messages of the workers"""
         errortype = error[0]
         errorstring = error[1]
         if errortype == "File already open":
@@ -346,7 +437,6 @@ class MainWindow(QMainWindow):
 
     def on_finished(self):
         """Callback for the finished signal of the WorkerAddFiles worker"""
-        self.workers = [worker for worker in self.workers if not worker.isFinished()]
         self.statusbar.clearMessage()
         self.progressbar.setRange(0, 100)
         self.progressbar.reset()
@@ -360,14 +450,27 @@ class MainWindow(QMainWindow):
 
     def closeEvent(self, event):
         """Stop running workers if main window is closed"""
-        for worker in self.workers:
-            worker.stop()
+        self.stop_workers()
+        self.cancel_export()
         event.accept()
 
+    def set_semantic_only(self, checked):
+        """Skip geometry when opening files, for the files opened afterwards
+
+        :param checked: True to open the files without geometry
+        :type checked: bool
+        """
+        self.ifcfiles.semantic_only = checked
+
     def close_all(self):
         """Close all IFC files"""
         self.statusbar.showMessage(self.tr("Close all files"), 5000)
 
+        # Drop the results of the workers of the closed files
+        self.stop_workers()
+        self.tree_generation += 1
+        self.progressbar.reset()
+
         # Close custom tabs
         for custom_tab in self.tabs.customtabs:
             tab_index = self.tabs.tabs.indexOf(custom_tab)
@@ -377,7 +480,9 @@ class MainWindow(QMainWindow):
                 custom_tab.deleteLater()
 
         self.detailsdock.reset()
-        self.ifcfiles = IfcFiles()
+        self.ifcfiles = IfcFiles(
+            cache=self.ifccache, semantic_only=self.chk_semantic_only.isChecked()
+        )
         Validators().reset(self.ifcfiles)
         self.validationdock.update_results_column()
 
@@ -442,17 +547,130 @@ class MainWindow(QMainWindow):
             else:
                 all_rows = True
 
-            csv_lines = self.tabs.active.rows_to_csv(
-                sep=sep, all_rows=all_rows, add_header=True, add_level=add_level
+            self.start_csv_export(csv_file, sep, all_rows, add_level)
+
+    def start_csv_export(self, csv_file, sep=",", all_rows=True, add_level=False):
+        """Export the rows of the active tab to CSV with the WorkerExportCsv
+
+        The rows and columns are taken from the tab at once, the values
+        are written in the worker. The export can be cancelled with
+        cancel_export().
+
+        :param csv_file: Path of the CSV file
+        :type csv_file: str
+        :param sep: CSV column separator
+        :type sep: str
+        :param all_rows: If True, all rows that pass the filter, otherwise the selected rows
+        :type all_rows: bool
+        :param add_level: If True, the level of the items is added as first column
+        :type add_level: bool
+        """
+        tab = self.tabs.active
+        items, levels = tab.rows_to_export(all_rows)
+        columns = tab.visible_columns()
+        self.export_worker = WorkerExportCsv(
+            csv_file,
+            tab.treemodel,
+            items,
+            columns,
+            header=tab.header_row(columns, add_level),
+            levels=levels if add_level else None,
+            sep=sep,
+        )
+        self.start_export_worker(csv_file)
+
+    def export_table_dlg(self):
+        """Export the current view or all elements with their properties to Parquet or Arrow"""
+        dialog = QFileDialog(self, self.tr("Export to Table"))
+        dialog.setAcceptMode(QFileDialog.AcceptSave)
+        name_filters = {
+            self.tr("Parquet (*.parquet)"): "parquet",
+            self.tr("Arrow IPC (*.arrow)"): "arrow",
+            self.tr("Feather (*.feather)"): "feather",
+        }
+        dialog.setNameFilters(list(name_filters))
+        dialog.setOption(QFileDialog.DontUseNativeDialog, True)
+        dialog_layout = dialog.layout()
+
+        hline = QFrame()
+        hline.setFrameShape(QFrame.HLine)
+        hline.setFrameShadow(QFrame.Sunken)
+        dialog_layout.addWidget(hline, 4, 1)
+
+        label = QLabel(self.tr("Content:"))
+        content_combo = QComboBox()
+        content_combo.addItems(
+            [self.tr("Current view"), self.tr("All elements with properties")]
+        )
+        dialog_layout.addWidget(label, 5, 0)
+        dialog_layout.addWidget(content_combo, 5, 1)
+
+        # Get the number of selected rows
+        selected_rows = len(self.tabs.tree.selectionModel().selectedRows())
+
+        if selected_rows > 1:
+            only_selected = QCheckBox(
+                self.tr("Export only selected rows (%i rows)") % selected_rows
             )
-            self.progressbar.setRange(0, 0)
+            only_selected.setChecked(False)
+            content_combo.currentIndexChanged.connect(
+                lambda index: only_selected.setEnabled(index == 0)
+            )
+            dialog_layout.addWidget(only_selected, 6, 1)
+
+        if dialog.exec():
+            filename = dialog.selectedFiles()[0]
+            file_format = arrow_format(filename)
+            if file_format is None:
+                file_format = name_filters[dialog.selectedNameFilter()]
+                filename += ARROW_FORMATS[file_format]
+
+            if content_combo.currentIndex() == 0:
+                all_rows = selected_rows <= 1 or not only_selected.isChecked()
+                columns = self.tabs.active.table_columns(all_rows)
+                get_columns = lambda: columns
+            else:
+                ifc_files = list(self.ifcfiles)
+                get_columns = lambda: element_table_columns(ifc_files)
 
-            with open(csv_file, "w") as f:
-                for line in csv_lines:
-                    f.write(line)
+            self.export_worker = WorkerExportTable(filename, file_format, get_columns)
+            self.start_export_worker(filename)
 
-            self.progressbar.setRange(0, 100)
-            self.statusbar.showMessage(self.tr("Exported to %s") % csv_file, 5000)
+    def start_export_worker(self, filename):
+        """Connect and start the worker of an export in self.export_worker
+
+        :param filename: Path of the exported file, for the status bar
+        :type filename: str
+        """
+        self.export_worker.signals.result.connect(
+            lambda filename: self.statusbar.showMessage(
+                self.tr("Exported to %s") % filename, 5000
+            )
+        )
+        self.export_worker.signals.error.connect(self.on_error)
+        self.export_worker.signals.progress.connect(self.on_progress)
+        self.export_worker.signals.finished.connect(self.on_export_finished)
+        self.export_cvs_act.setEnabled(False)
+        self.export_table_act.setEnabled(False)
+        self.cancel_export_act.setEnabled(True)
+        self.progressbar.setRange(0, 100)
+        self.progressbar.setValue(0)
+        self.statusbar.showMessage(self.tr("Export to %s") % filename)
+        self.threadpool.start(self.export_worker)
+
+    def cancel_export(self):
+        """Stop the running export, an incomplete file is not kept"""
+        if self.export_worker is not None:
+            self.export_worker.stop()
+            self.statusbar.showMessage(self.tr("Export cancelled"), 5000)
+
+    def on_export_finished(self):
+        """Callback for the finished signal of the export workers"""
+        self.export_worker = None
+        self.export_cvs_act.setEnabled(True)
+        self.export_table_act.setEnabled(has_pyarrow())
+        self.cancel_export_act.setEnabled(False)
+        self.progressbar.reset()
 
     def save_validation_dlg(self):
         """Save validation results to a zipped BCF file or as JSON"""
@@ -611,6 +829,18 @@ class MainWindow(QMainWindow):
         self.file_menu.addAction(self.open_act)
         self.toolbar.addAction(self.open_act)
 
+        self.chk_semantic_only = QAction(
+            self.tr("Open without geometry"),
+            self,
+            checkable=True,
+            statusTip=self.tr(
+                "Skip geometry when opening IFC files, to save time and memory"
+            ),
+            toggled=self.set_semantic_only,
+        )
+        self.chk_semantic_only.setChecked(self.ifcfiles.semantic_only)
+        self.file_menu.addAction(self.chk_semantic_only)
+
         self.export_cvs_act = QAction(
             QIcon(":/icons/export-csv.png"),
             self.tr("&Export View to CSV..."),
@@ -624,6 +854,27 @@ class MainWindow(QMainWindow):
         self.file_menu.addAction(self.export_cvs_act)
         self.toolbar.addAction(self.export_cvs_act)
 
+        self.export_table_act = QAction(
+            self.tr("Export to &Table..."),
+            self,
+            statusTip=self.tr(
+                "Export the current view or all elements with their properties "
+                "to Parquet or Arrow (requires pyarrow)"
+            ),
+            triggered=self.export_table_dlg,
+        )
+        self.export_table_act.setEnabled(has_pyarrow())
+        self.file_menu.addAction(self.export_table_act)
+
+        self.cancel_export_act = QAction(
+            self.tr("Cancel Export"),
+            self,
+            statusTip=self.tr("Stop the running export"),
+            triggered=self.cancel_export,
+        )
+        self.cancel_export_act.setEnabled(False)
+        self.file_menu.addAction(self.cancel_export_act)
+
         self.file_menu.addSeparator()
 
         self.close_act = QAction(
@@ -16,10 +16,17 @@
  *                                                                         *
  ***************************************************************************/
 """
+from concurrent.futures import ThreadPoolExecutor
+import csv
+import os
 from PySide6.QtCore import QRunnable, Slot, Signal, QObject
+from bimsemantic.util import IfcFile, write_arrow_table
 
 # https://www.pythonguis.com/tutorials/multithreading-pyside6-applications-qthreadpool/
 
+# Size of the write buffer of exported files
+EXPORT_BUFFER_BYTES = 1048576
+
 
 class WorkerSignals(QObject):
     """Helper class to transport signals from Workers to the main thread
@@ -31,6 +38,7 @@ class WorkerSignals(QObject):
         progress (int, percentage)
         feedback (str)
         result (object with the result)
+        count (int, e.g. the number of search results so far)
     """
 
     finished = Signal()
@@ -38,6 +46,7 @@ class WorkerSignals(QObject):
     result = Signal(object)
     progress = Signal(int)
     feedback = Signal(str)
+    count = Signal(int)
 
 
 class WorkerAddFiles(QRunnable):
@@ -49,43 +58,387 @@ class WorkerAddFiles(QRunnable):
     The worker is supposed to run by QThreadpool. Opening large files takes
     a long time, multithreading keeps the GUI responsive.
 
+    The files are opened at the same time in a thread pool with up to
+    max_workers threads, but they are added to the IfcFiles object (including
+    the check of the project GUID) and reported in the order of filenames.
+
     :param ifcfiles: IfcFiles object of the main window
     :type ifcfiles: IfcFiles instance
+    :param filenames: List of paths of the IFC files
+    :type filenames: list of str
+    :param max_workers: Maximum number of files opened at the same time,
+        defaults to the number of CPUs
+    :type max_workers: int, optional
     :return: List of IfcFile instances of the opened files
     """
 
-    def __init__(self, ifcfiles, filenames):
+    def __init__(self, ifcfiles, filenames, max_workers=None):
         super(WorkerAddFiles, self).__init__()
         self.ifcfiles = ifcfiles
         self.filenames = filenames
         self._count = len(filenames)
+        if max_workers is None:
+            max_workers = os.cpu_count() or 1
+        self._max_workers = max(1, min(max_workers, self._count))
         self.signals = WorkerSignals()
         self._is_interrupted = False
 
+    def open_file(self, filename):
+        """Open a single file, called in the thread pool"""
+        if self._is_interrupted:
+            return None
+        self.signals.feedback.emit(filename)
+        return IfcFile(
+            filename,
+            self.ifcfiles.pset_cache_megabytes,
+            self.ifcfiles.cache,
+            self.ifcfiles.semantic_only,
+        )
+
     @Slot()
     def run(self):
         """Run the worker"""
         results = []
-        for i, filename in enumerate(self.filenames):
-            if self._is_interrupted:
-                break
-            self.signals.feedback.emit(filename)
-            try:
-                ifc_file = self.ifcfiles.add_file(filename)
+        with ThreadPoolExecutor(max_workers=self._max_workers) as executor:
+            futures = []
+            submitted = set()
+            for filename in self.filenames:
+                # Do not open files that are already open or selected twice
+                abspath = os.path.abspath(filename)
+                if self.ifcfiles.is_open(filename) or abspath in submitted:
+                    futures.append(None)
+                else:
+                    submitted.add(abspath)
+                    futures.append(executor.submit(self.open_file, filename))
+
+            for i, (filename, future) in enumerate(zip(self.filenames, futures)):
                 if self._is_interrupted:
                     break
-                if ifc_file:
-                    results.append(ifc_file)
-                else:
-                    self.signals.error.emit(("File already open", filename))
-            except FileNotFoundError as e:
-                self.signals.error.emit((type(e), str(e)))
-            except ValueError as e:
-                self.signals.error.emit((type(e), str(e)))
-            self.signals.progress.emit((i + 1) / self._count * 100)
+                try:
+                    ifc_file = None
+                    if future is not None:
+                        ifc_file = future.result()
+                    if self._is_interrupted:
+                        break
+                    if ifc_file:
+                        # Checks the project GUID, None if the file is a duplicate
+                        ifc_file = self.ifcfiles.add_ifcfile(ifc_file)
+                    if ifc_file:
+                        results.append(ifc_file)
+                    else:
+                        self.signals.error.emit(("File already open", filename))
+                except FileNotFoundError as e:
+                    self.signals.error.emit((type(e), str(e)))
+                except ValueError as e:
+                    self.signals.error.emit((type(e), str(e)))
+                self.signals.progress.emit((i + 1) / self._count * 100)
+
+            if self._is_interrupted:
+                for future in futures:
+                    if future is not None:
+                        future.cancel()
 
         self.signals.result.emit(results)
         self.signals.finished.emit()
 
     def stop(self):
         self._is_interrupted = True
+
+
+class WorkerBuildTrees(QRunnable):
+    """
+    Worker to build the data of the tree models for new IFC files
+
+    Each job is a tuple (name, build, merge). The worker calls build(ifc_files)
+    for every job, e.g. build_tree() of a tree model, which returns a detached
+    tree without changing the model. Progress and the name of the model are
+    reported after each job. The result is a tuple (generation, results,
+    filenames), results is a list of tuples (merge, root); merge(root) must
+    be called in the GUI thread to add the detached tree to the model, e.g.
+    with merge_tree() of the tree model. A stopped worker emits no result.
+
+    The element records are shared with the models in the views, so the
+    filenames of existing records are not changed in the worker. They are
+    collected with ElementRecords.defer_filenames() and returned as list
+    of tuples (guid, filename), to be added with
+    ElementRecords.add_filenames() in the GUI thread.
+
+    Files that were opened from the IfcCache are parsed with IfcOpenShell
+    before the first job, several files at the same time.
+
+    :param jobs: List of tuples (name, build, merge)
+    :type jobs: list
+    :param ifc_files: List of the new IfcFile instances
+    :type ifc_files: list of IfcFile
+    :param generation: ID of the build, passed on with the result to
+        drop the results of files that were closed in the meantime
+    :type generation: int, optional
+    :param records: The element records of the tree models
+    :type records: ElementRecords, optional
+    :return: Tuple (generation, results, filenames)
+    """
+
+    def __init__(self, jobs, ifc_files, generation=0, records=None):
+        super(WorkerBuildTrees, self).__init__()
+        self.jobs = jobs
+        self.ifc_files = ifc_files
+        self.generation = generation
+        self.records = records
+        self._count = len(jobs)
+        self.signals = WorkerSignals()
+        self._is_interrupted = False
+
+    def load_models(self):
+        """Parse the files that are not loaded yet, see IfcFile.model"""
+        pending = [ifc_file for ifc_file in self.ifc_files if not ifc_file.is_loaded]
+        if not pending:
+            return
+        max_workers = max(1, min(os.cpu_count() or 1, len(pending)))
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = [
+                executor.submit(lambda ifc_file: ifc_file.model, ifc_file)
+                for ifc_file in pending
+            ]
+            for future in futures:
+                try:
+                    future.result()
+                except ValueError as e:
+                    self.signals.error.emit((type(e), str(e)))
+
+    @Slot()
+    def run(self):
+        """Run the worker"""
+        results = []
+        filenames = []
+        self.load_models()
+        if self.records is not None:
+            self.records.defer_filenames()
+        try:
+            for i, (name, build, merge) in enumerate(self.jobs):
+                if self._is_interrupted:
+                    break
+                self.signals.feedback.emit(name)
+                try:
+                    results.append((merge, build(self.ifc_files)))
+                except Exception as e:
+                    self.signals.error.emit((type(e), str(e)))
+                self.signals.progress.emit((i + 1) / self._count * 100)
+        finally:
+            if self.records is not None:
+                filenames = self.records.take_filenames()
+
+        if not self._is_interrupted:
+            self.signals.result.emit((self.generation, results, filenames))
+        self.signals.finished.emit()
+
+    def stop(self):
+        self._is_interrupted = True
+
+
+class WorkerSearch(QRunnable):
+    """
+    Worker to search the values of a SearchIndex
+
+    The index must have been created in the GUI thread, it is built in the
+    worker if needed. The number of hits is reported with the count signal
+    while the values are scanned. stop() cancels the search, a cancelled
+    search does not emit a result. The result is a tuple (search_id, index,
+    items), the search_id is used by the caller to ignore the results of
+    older searches.
+
+    :param search_id: ID of the search, passed on with the result
+    :type search_id: int
+    :param index: The index of the column to search in
+    :type index: SearchIndex
+    :param text: The search text
+    :type text: str
+    :param how: The search mode, see SearchIndex.search()
+    :type how: str
+    :param regular_expression: The pattern made from the text
+    :type regular_expression: QRegularExpression
+    :param case_sensitive: Case sensitive search
+    :type case_sensitive: bool
+    :return: Tuple (search_id, index, items)
+    """
+
+    def __init__(
+        self, search_id, index, text, how, regular_expression, case_sensitive
+    ):
+        super(WorkerSearch, self).__init__()
+        self.search_id = search_id
+        self.index = index
+        self.text = text
+        self.how = how
+        self.regular_expression = regular_expression
+        self.case_sensitive = case_sensitive
+        self.signals = WorkerSignals()
+        self._is_interrupted = False
+
+    @Slot()
+    def run(self):
+        """Run the worker"""
+        try:
+            items = self.index.search(
+                self.text,
+                self.how,
+                self.regular_expression,
+                self.case_sensitive,
+                progress=self.signals.count.emit,
+                is_cancelled=self.is_interrupted,
+            )
+        except Exception as e:
+            self.signals.error.emit((type(e), str(e)))
+            items = None
+        if items is not None and not self._is_interrupted:
+            self.signals.result.emit((self.search_id, self.index, items))
+        self.signals.finished.emit()
+
+    def is_interrupted(self):
+        """True if the search was cancelled with stop()"""
+        return self._is_interrupted
+
+    def stop(self):
+        self._is_interrupted = True
+
+
+class WorkerExportCsv(QRunnable):
+    """
+    Worker to write rows of a tree model to a CSV file
+
+    The items, levels and columns are a snapshot taken in the GUI thread,
+    e.g. with TreeProxyModel.visible_items(). The values are read with
+    iter_rows() of the tree model in chunks and written with a csv.writer
+    to a buffered file, i.e. values containing the separator, quotes or
+    line breaks are quoted. None is written as empty cell. Progress is
+    reported after each chunk. stop() cancels the export and removes the
+    incomplete file.
+
+    :param filename: Path of the CSV file
+    :type filename: str
+    :param treemodel: The tree model of the items
+    :type treemodel: TreeModelBaseclass
+    :param items: The items in the order of the rows
+    :type items: list of TreeItem
+    :param columns: The column numbers to export
+    :type columns: list of int
+    :param header: Header row, defaults to None (no header)
+    :type header: list of str, optional
+    :param levels: Levels of the items, written as first column if given
+    :type levels: list of int, optional
+    :param sep: CSV column separator, defaults to ","
+    :type sep: str, optional
+    :return: The filename, not emitted if cancelled or on error
+    """
+
+    def __init__(
+        self, filename, treemodel, items, columns, header=None, levels=None, sep=","
+    ):
+        super(WorkerExportCsv, self).__init__()
+        self.filename = filename
+        self.treemodel = treemodel
+        self.items = items
+        self.columns = columns
+        self.header = header
+        self.levels = levels
+        self.sep = sep
+        self._count = max(len(items), 1)
+        self.signals = WorkerSignals()
+        self._is_interrupted = False
+
+    @Slot()
+    def run(self):
+        """Run the worker"""
+        written = 0
+        is_opened = False
+        try:
+            with open(
+                self.filename,
+                "w",
+                newline="",
+                encoding="utf-8",
+                buffering=EXPORT_BUFFER_BYTES,
+            ) as f:
+                is_opened = True
+                writer = csv.writer(f, delimiter=self.sep, lineterminator="\n")
+                if self.header is not None:
+                    writer.writerow(self.header)
+                for rows in self.treemodel.iter_rows(
+                    self.items, self.columns, self.levels
+                ):
+                    if self._is_interrupted:
+                        break
+                    writer.writerows(rows)
+                    written += len(rows)
+                    self.signals.progress.emit(written / self._count * 100)
+        except (OSError, csv.Error) as e:
+            self.signals.error.emit((type(e), str(e)))
+            self._is_interrupted = True
+
+        if self._is_interrupted:
+            if is_opened:
+                try:
+                    os.remove(self.filename)
+                except OSError:
+                    pass
+        else:
+            self.signals.result.emit(self.filename)
+        self.signals.finished.emit()
+
+    def stop(self):
+        self._is_interrupted = True
+
+
+class WorkerExportTable(QRunnable):
+    """
+    Worker to write a table to a Parquet or Arrow IPC (Feather) file
+
+    The columns are returned by get_columns(), which is called in the
+    worker, e.g. to read the property tables of the files with
+    element_table_columns(). The table is written with
+    write_arrow_table(), progress is reported after each column.
+    stop() cancels the export, the file is then not written.
+
+    :param filename: Path of the file
+    :type filename: str
+    :param file_format: A key of ARROW_FORMATS
+    :type file_format: str
+    :param get_columns: Function returning the list of tuples (name, read),
+        see write_arrow_table()
+    :type get_columns: callable
+    :return: The filename, not emitted if cancelled or on error
+    """
+
+    def __init__(self, filename, file_format, get_columns):
+        super(WorkerExportTable, self).__init__()
+        self.filename = filename
+        self.file_format = file_format
+        self.get_columns = get_columns
+        self.signals = WorkerSignals()
+        self._is_interrupted = False
+
+    @Slot()
+    def run(self):
+        """Run the worker"""
+        try:
+            columns = self.get_columns()
+            count = max(len(columns), 1)
+            is_written = write_arrow_table(
+                self.filename,
+                columns,
+                self.file_format,
+                progress=lambda done: self.signals.progress.emit(done / count * 100),
+                is_cancelled=self.is_interrupted,
+            )
+        except Exception as e:
+            self.signals.error.emit((type(e), str(e)))
+            is_written = False
+        if is_written and not self._is_interrupted:
+            self.signals.result.emit(self.filename)
+        self.signals.finished.emit()
+
+    def is_interrupted(self):
+        """True if the export was cancelled with stop()"""
+        return self._is_interrupted
+
+    def stop(self):
+        self._is_interrupted = True
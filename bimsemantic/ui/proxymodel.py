@@ -0,0 +1,244 @@
+"""
+/***************************************************************************
+                              BIM Semantic Viewer
+                              -------------------
+        begin                : 2024-10-03
+        copyright            : (C) 2025 by Florian Neukirchen
+        email                : mail@riannek.de
+ ***************************************************************************/
+
+/***************************************************************************
+ *                                                                         *
+ *   This program is free software; you can redistribute it and/or modify  *
+ *   it under the terms of the GNU General Public License as published by  *
+ *   the Free Software Foundation; either version 2 of the License, or     *
+ *   (at your option) any later version.                                   *
+ *                                                                         *
+ ***************************************************************************/
+"""
+from PySide6.QtCore import Qt, QAbstractItemModel, QSortFilterProxyModel, QTimer, Signal
+from .multithreading import WorkerSearch
+
+# Delay before a filter is searched again after the source model changed
+FILTER_DELAY_MS = 300
+
+
+class TreeProxyModel(QSortFilterProxyModel):
+    """Proxy model for sorting and filtering the tree views of a TreeModelBaseclass
+
+    Used instead of a QSortFilterProxyModel with recursive filtering and a
+    filter regular expression, which calls data() of every row and checks
+    the subtrees again for every parent.
+
+    A filter is set with set_filter(). The SearchIndex of the column is
+    searched in a WorkerSearch, and the matching items and their ancestors
+    are collected in one pass upwards from the matches. filterAcceptsRow()
+    only looks up this set of accepted items. The signal filterApplied is
+    emitted when the rows of a new filter are shown. If the source model
+    changes while a filter is set, the filter is searched again after
+    FILTER_DELAY_MS.
+
+    Sorting is passed on to TreeModelBaseclass.sort(), which sorts the
+    items of the source model with cached keys, the proxy model itself
+    keeps the order of the source model. After rows are inserted or the
+    data changed, the source model is sorted again as soon as control
+    returns to the event loop, so that the changes of e.g. merging a
+    file are sorted at once.
+
+    :param parent: The parent widget, e.g. the IfcTreeTab
+    :param threadpool: The thread pool to run the filter searches
+    :type threadpool: QThreadPool
+    """
+
+    filterApplied = Signal()
+
+    def __init__(self, parent, threadpool):
+        super(TreeProxyModel, self).__init__(parent)
+        self.threadpool = threadpool
+        self._accepted = None
+        self._filter = None
+        self._filter_id = 0
+        self._filter_worker = None
+        self._sort_column = -1
+        self._sort_order = Qt.AscendingOrder
+
+        self.resort_timer = QTimer(self)
+        self.resort_timer.setSingleShot(True)
+        self.resort_timer.setInterval(0)
+        self.resort_timer.timeout.connect(self.resort)
+
+        self.refilter_timer = QTimer(self)
+        self.refilter_timer.setSingleShot(True)
+        self.refilter_timer.setInterval(FILTER_DELAY_MS)
+        self.refilter_timer.timeout.connect(self.run_filter)
+
+    def setSourceModel(self, source_model):
+        """Set the source model and watch it for changes to update the filter"""
+        super(TreeProxyModel, self).setSourceModel(source_model)
+        for signal in (
+            source_model.rowsInserted,
+            source_model.rowsRemoved,
+            source_model.modelReset,
+            source_model.dataChanged,
+        ):
+            signal.connect(self.source_changed)
+        source_model.layoutChanged.connect(self.source_layout_changed)
+
+    def set_filter(self, column, text, how, regular_expression, case_sensitive):
+        """Filter the rows by the values of a column
+
+        The arguments are the same as for SearchIndex.search(). Until the
+        search is done, the rows of the previous filter are shown.
+
+        :param column: The column to filter on
+        :type column: int
+        :param text: The filter text
+        :type text: str
+        :param how: The search mode, see SearchIndex.search()
+        :type how: str
+        :param regular_expression: The pattern made from the text
+        :type regular_expression: QRegularExpression
+        :param case_sensitive: Case sensitive filter
+        :type case_sensitive: bool
+        """
+        self._filter = (column, text, how, regular_expression, case_sensitive)
+        self.run_filter()
+
+    def clear_filter(self):
+        """Remove the filter and show all rows"""
+        self.refilter_timer.stop()
+        self.stop_filter()
+        self._filter = None
+        if self._accepted is not None:
+            self._accepted = None
+            self.invalidate()
+        self.filterApplied.emit()
+
+    @property
+    def is_filtered(self):
+        """True if a filter is set"""
+        return self._filter is not None
+
+    def run_filter(self):
+        """Start the search of the filter in a worker"""
+        self.refilter_timer.stop()
+        self.stop_filter()
+        if self._filter is None:
+            return
+        column, text, how, regular_expression, case_sensitive = self._filter
+        source_model = self.sourceModel()
+        # Items of lazy models must be added before filtering
+        source_model.fetch_all()
+        self._filter_id += 1
+        self._filter_worker = WorkerSearch(
+            self._filter_id,
+            source_model.search_index(column),
+            text,
+            how,
+            regular_expression,
+            case_sensitive,
+        )
+        self._filter_worker.signals.result.connect(self.on_filter_result)
+        self.threadpool.start(self._filter_worker)
+
+    def stop_filter(self):
+        """Cancel the running filter search"""
+        if self._filter_worker is not None:
+            self._filter_worker.stop()
+            self._filter_worker = None
+
+    def on_filter_result(self, result):
+        """Show the rows of the matching items and their ancestors
+
+        Callback of WorkerSearch. The search is repeated if the source
+        model changed in the meantime.
+
+        :param result: Tuple (search_id, index, items)
+        """
+        filter_id, search_index, items = result
+        if filter_id != self._filter_id or self._filter is None:
+            return
+        self._filter_worker = None
+        if search_index is not self.sourceModel().search_index(search_index.column):
+            self.run_filter()
+            return
+
+        accepted = set()
+        for item in items:
+            # Stop at the first ancestor that was already added
+            while item is not None and item not in accepted:
+                accepted.add(item)
+                item = item.parent()
+        self._accepted = accepted
+        self.invalidate()
+        self.filterApplied.emit()
+
+    def source_changed(self, *args):
+        """Search the filter and sort again after a change of the source model"""
+        if self._filter is not None:
+            self.refilter_timer.start()
+        if self._sort_column >= 0:
+            self.resort_timer.start()
+
+    def source_layout_changed(
+        self, parents=None, hint=QAbstractItemModel.NoLayoutChangeHint
+    ):
+        """Sort again if the layout of the source model changed, but not by sorting"""
+        if hint != QAbstractItemModel.VerticalSortHint:
+            self.source_changed()
+
+    def sort(self, column, order=Qt.AscendingOrder):
+        """Sort the source model by a column, called by the tree view
+
+        :param column: The column to sort by, -1 to keep the current order
+        :type column: int
+        :param order: The sort order
+        :type order: Qt.SortOrder
+        """
+        self._sort_column = column
+        self._sort_order = order
+        self.resort()
+
+    def resort(self):
+        """Sort the source model again with the last sort column and order"""
+        self.resort_timer.stop()
+        if self._sort_column >= 0:
+            self.sourceModel().sort(self._sort_column, self._sort_order)
+
+    def visible_items(self):
+        """Get the items of all rows that pass the filter, in the order of the view
+
+        Walks the items of the source model, which has the order of the
+        view, instead of creating the indexes of all rows of the proxy
+        model. Items of lazy models must be added before, see fetch_all()
+        of the source model.
+
+        :return: Tuple of the list of items and the list of their levels
+        :rtype: tuple
+        """
+        accepted = self._accepted
+        items = []
+        levels = []
+        stack = [
+            (child, 0)
+            for child in reversed(self.sourceModel().root_item.children)
+            if accepted is None or child in accepted
+        ]
+        while stack:
+            item, level = stack.pop()
+            items.append(item)
+            levels.append(level)
+            for child in reversed(item.children):
+                if accepted is None or child in accepted:
+                    stack.append((child, level + 1))
+        return items, levels
+
+    def filterAcceptsRow(self, source_row, source_parent):
+        """Accept the rows of the items in the set of accepted items"""
+        if self._accepted is None:
+            return True
+        if source_parent.isValid():
+            parent_item = source_parent.internalPointer()
+        else:
+            parent_item = self.sourceModel().root_item
+        return parent_item.child(source_row) in self._accepted
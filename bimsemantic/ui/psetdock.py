@@ -18,7 +18,6 @@
 """
 from PySide6.QtCore import Qt, QSortFilterProxyModel, QModelIndex
 from bimsemantic.ui import TreeItem, TreeModelBaseclass
-import ifcopenshell.util.element
 from PySide6.QtWidgets import QDockWidget, QTreeView
 from bimsemantic.ui import CopyMixin, ContextMixin
 import statistics
@@ -75,12 +74,29 @@ class PsetDockWidget(CopyMixin, ContextMixin, QDockWidget):
 
         :param ifc_files: A list of IfcFile objects
         """
-        for file in ifc_files:
-            self.treemodel.add_file(file)
+        self.add_tree(self.treemodel.build_tree(ifc_files))
+
+    def add_tree(self, root):
+        """Add a detached tree built by build_tree() of the tree model
+
+        :param root: The root item of the detached tree
+        :type root: TreeItem
+        """
+        is_empty = self.treemodel.root_item.child_count() == 0
+        inserted = self.treemodel.merge_tree(root)
         if self.is_qset:
             self.treemodel.calculate_statistics()
-        self.proxymodel.sort(0, Qt.SortOrder.AscendingOrder)
-        self.tree.expandAll()
+        if is_empty:
+            self.proxymodel.sort(0, Qt.SortOrder.AscendingOrder)
+            self.tree.expandAll()
+            return
+        # The proxy model keeps the sort order, only expand the new items
+        for item in inserted:
+            proxy_index = self.proxymodel.mapFromSource(
+                self.treemodel.item_index(item)
+            )
+            if proxy_index.isValid():
+                self.tree.expandRecursively(proxy_index)
 
     def get_pset_tuple(self, index):
         """Get the property set tuple from the index
@@ -148,52 +164,79 @@ class PsetTreeModel(TreeModelBaseclass):
         :param ifc_file: The IfcFile object
         :type ifc_file: IfcFile
         """
+        self.merge_tree(self.build_tree([ifc_file]))
 
-        self.beginResetModel()
-        elements = ifc_file.model.by_type("IfcElement")
-        self.add_elements(elements)
-        if ifc_file.model.schema_version[0] == 2:
-            spatial_elements = ifc_file.model.by_type("IfcSpatialStructureElement")
-        else:
-            spatial_elements = ifc_file.model.by_type("IfcSpatialElement")
-        self.add_elements(spatial_elements, count_col=2)
-        elementtypes = ifc_file.model.by_type("IfcElementType")
-        self.add_elements(elementtypes, count_col=3)
-        self.endResetModel()
-
-    def add_elements(self, elements, count_col=1):
-        """Add elements or element types to the model
+    def build_tree(self, ifc_files):
+        """Build a detached tree for a list of files, see merge_tree()
 
+        :param ifc_files: A list of IfcFile objects
+        :return: The root item of the detached tree
+        :rtype: TreeItem
+        """
+        root = TreeItem()
+        for ifc_file in ifc_files:
+            elements = ifc_file.model.by_type("IfcElement")
+            self.add_elements(ifc_file, elements, root)
+            if ifc_file.model.schema_version[0] == 2:
+                spatial_elements = ifc_file.model.by_type("IfcSpatialStructureElement")
+            else:
+                spatial_elements = ifc_file.model.by_type("IfcSpatialElement")
+            self.add_elements(ifc_file, spatial_elements, root, count_col=2)
+            elementtypes = ifc_file.model.by_type("IfcElementType")
+            self.add_elements(ifc_file, elementtypes, root, count_col=3)
+        return root
+
+    def merge_item(self, item, detached_item):
+        """Add the counts of a property value of a detached tree"""
+        for column in range(1, self.column_count):
+            count = item.data(column)
+            if isinstance(count, int):
+                item.set_data(column, count + detached_item.data(column))
+
+    def add_elements(self, ifc_file, elements, root, count_col=1):
+        """Add elements or element types to a tree
+
+        :param ifc_file: The IfcFile object containing the elements
+        :type ifc_file: IfcFile
         :param elements: A list of IfcElement or IfcElementType objects
         :type elements: list
+        :param root: The root item of the tree
+        :type root: TreeItem
         :param count_col: The column index for the count of elements / element types
         :type count_col: int
         """
-        for element in elements:
-            psets = ifcopenshell.util.element.get_psets(element, psets_only=True)
-            if not psets:
+        ids = {element.id() for element in elements}
+        table = ifc_file.property_table
+
+        # Read the values column by column from the property table
+        for pset_name, prop_name in table.keys(psets_only=True):
+            values = [
+                value
+                for entity_id, value in table.items(
+                    pset_name, prop_name, psets_only=True
+                )
+                if entity_id in ids
+            ]
+            if not values:
                 continue
-            for pset_name, pset in psets.items():
-                pset_item = self.get_child_by_label(self._rootItem, pset_name)
-                if not pset_item:
-                    pset_item = TreeItem([pset_name, ""], self._rootItem)
-                    self._rootItem.appendChild(pset_item)
-                for prop_name, prop_value in pset.items():
-                    if not prop_value:
-                        prop_value = self.nan
-                    if prop_name == "id":
-                        continue
-                    prop_item = self.get_child_by_label(pset_item, prop_name)
-                    if not prop_item:
-                        prop_item = TreeItem([prop_name, ""], pset_item)
-                        pset_item.appendChild(prop_item)
-                    value_item = self.get_child_by_label(prop_item, prop_value)
-                    if not value_item:
-                        value_item = TreeItem([prop_value, 0, 0, 0], prop_item)
-                        value_item.set_data(count_col, 1)
-                        prop_item.appendChild(value_item)
-                    else:
-                        value_item.set_data(count_col, value_item.data(count_col) + 1)
+            pset_item = self.get_child_by_label(root, pset_name)
+            if not pset_item:
+                pset_item = TreeItem([pset_name, ""], root)
+                root.appendChild(pset_item)
+            prop_item = self.get_child_by_label(pset_item, prop_name)
+            if not prop_item:
+                prop_item = TreeItem([prop_name, ""], pset_item)
+                pset_item.appendChild(prop_item)
+            for prop_value in values:
+                if not prop_value:
+                    prop_value = self.nan
+                value_item = self.get_child_by_label(prop_item, prop_value)
+                if not value_item:
+                    value_item = TreeItem([prop_value, 0, 0, 0], prop_item)
+                    value_item.set_data(count_col, 1)
+                    prop_item.appendChild(value_item)
+                else:
+                    value_item.set_data(count_col, value_item.data(count_col) + 1)
 
 
 class QsetTreeModel(TreeModelBaseclass):
@@ -242,62 +285,88 @@ class QsetTreeModel(TreeModelBaseclass):
         :param ifc_file: The IfcFile object
         :type ifc_file: IfcFile
         """
-        if ifc_file.model.schema_version[0] < 4:
-            # No quantity sets in IFC2x3
+        self.merge_tree(self.build_tree([ifc_file]))
+
+    def build_tree(self, ifc_files):
+        """Build a detached tree for a list of files, see merge_tree()
+
+        :param ifc_files: A list of IfcFile objects
+        :return: The root item of the detached tree
+        :rtype: TreeItem
+        """
+        root = TreeItem()
+        for ifc_file in ifc_files:
+            if ifc_file.model.schema_version[0] < 4:
+                # No quantity sets in IFC2x3
+                continue
+            elements = ifc_file.model.by_type("IfcElement")
+            self.add_elements(ifc_file, elements, root)
+            spatial_elements = ifc_file.model.by_type("IfcSpatialElement")
+            self.add_elements(ifc_file, spatial_elements, root, count_col=2)
+        return root
+
+    def merge_item(self, item, detached_item):
+        """Add the counts and values of a quantity of a detached tree
+
+        The statistics must be updated with calculate_statistics().
+        """
+        if item.parent() is self._rootItem:
+            # Quantity set
             return
-        self.beginResetModel()
-        elements = ifc_file.model.by_type("IfcElement")
-        self.add_elements(elements)
-        spatial_elements = ifc_file.model.by_type("IfcSpatialElement")
-        self.add_elements(spatial_elements, count_col=2)
-        self.endResetModel()
+        item.set_data(1, item.data(1) + detached_item.data(1))
+        item.set_data(2, item.data(2) + detached_item.data(2))
+        values = item.data(8)
+        values.extend(detached_item.data(8))
+        item.set_data(8, values)
 
-    def add_elements(self, elements, count_col=1):
-        """Add elements to the model
+    def add_elements(self, ifc_file, elements, root, count_col=1):
+        """Add elements to a tree
 
         Complex quantity types are ignored.
 
+        :param ifc_file: The IfcFile object containing the elements
+        :type ifc_file: IfcFile
         :param elements: A list of IfcElement objects
         :type elements: list
-        :param count_col: Ignored, but needed for compatibility with PsetTreeModel
+        :param root: The root item of the tree
+        :type root: TreeItem
+        :param count_col: The column index for the count of elements / spatial elements
         """
-        for element in elements:
-            qsets = ifcopenshell.util.element.get_psets(element, qtos_only=True)
-            if not qsets:
+        ids = {element.id() for element in elements}
+        table = ifc_file.property_table
+
+        # Read the values column by column from the property table
+        for qset_name, qto_name in table.keys(qtos_only=True):
+            # Ignore complex quantity types for now:
+            # The value could be a dict like
+            # {'value': 4.05, 'unit': 'm3'} or
+            # {'GrossArea': 13.5, 'NetArea': 12.7} or
+            # {'id': 14643, 'type': 'IfcPhysicalComplexQuantity', 'Discrimination': 'Layer', 'properties': {'Width': 0.08}}
+            # or a list with several values or even a table
+            qto_values = [
+                qto_value
+                for entity_id, qto_value in table.items(
+                    qset_name, qto_name, qtos_only=True
+                )
+                if entity_id in ids and isinstance(qto_value, (int, float))
+            ]
+            if not qto_values:
                 continue
-            for qset_name, qset in qsets.items():
-                qset_item = self.get_child_by_label(self._rootItem, qset_name)
-                if not qset_item:
-                    qset_item = TreeItem([qset_name], self._rootItem)
-                    self._rootItem.appendChild(qset_item)
-                for qto_name, qto_value in qset.items():
-                    if qto_value is None:
-                        continue
-                    if qto_name == "id":
-                        continue
-                    # Ignore complex quantity types for now:
-                    # The value could be a dict like
-                    # {'value': 4.05, 'unit': 'm3'} or
-                    # {'GrossArea': 13.5, 'NetArea': 12.7} or
-                    # {'id': 14643, 'type': 'IfcPhysicalComplexQuantity', 'Discrimination': 'Layer', 'properties': {'Width': 0.08}}
-                    # or a list with several values or even a table
-                    if not isinstance(qto_value, (int, float)):
-                        continue
-                    qto_item = self.get_child_by_label(qset_item, qto_name)
-                    if not qto_item:
-                        # [name, element count, spatial element count,  min, mean, median, max, values]
-                        # values will be invisible in the tree, but is needed to
-                        # calculate mean, median, etc.
-                        qto_item = TreeItem(
-                            [qto_name, 0, 0, 0, 0, 0, 0, 0, [qto_value]], qset_item
-                        )
-                        qto_item.set_data(count_col, 1)
-                        qset_item.appendChild(qto_item)
-                    else:
-                        qto_item.set_data(count_col, qto_item.data(count_col) + 1)
-                        values = qto_item.data(8)
-                        values.append(qto_value)
-                        qto_item.set_data(8, values)
+            qset_item = self.get_child_by_label(root, qset_name)
+            if not qset_item:
+                qset_item = TreeItem([qset_name], root)
+                root.appendChild(qset_item)
+            qto_item = self.get_child_by_label(qset_item, qto_name)
+            if not qto_item:
+                # [name, element count, spatial element count,  min, mean, median, max, values]
+                # values will be invisible in the tree, but is needed to
+                # calculate mean, median, etc.
+                qto_item = TreeItem([qto_name, 0, 0, 0, 0, 0, 0, 0, []], qset_item)
+                qset_item.appendChild(qto_item)
+            qto_item.set_data(count_col, qto_item.data(count_col) + len(qto_values))
+            values = qto_item.data(8)
+            values.extend(qto_values)
+            qto_item.set_data(8, values)
 
     def calculate_statistics(self):
         """Calculate basic statistics and add them to the TreeItems"""
@@ -319,3 +388,9 @@ class QsetTreeModel(TreeModelBaseclass):
                 qto_item.set_data(5, mean_val)
                 qto_item.set_data(6, median_val)
                 qto_item.set_data(7, max_val)
+            if qset_item.child_count() > 0:
+                parent_index = self.item_index(qset_item)
+                self.dataChanged.emit(
+                    self.index(0, 3, parent_index),
+                    self.index(qset_item.child_count() - 1, 7, parent_index),
+                )
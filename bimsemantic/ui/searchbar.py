@@ -17,7 +17,7 @@
  ***************************************************************************/
 """
 from typing import Any
-from PySide6.QtCore import Qt, QRegularExpression
+from PySide6.QtCore import Qt, QRegularExpression, QTimer
 from PySide6.QtGui import QAction, QIcon
 from PySide6.QtWidgets import (
     QWidget,
@@ -29,12 +29,22 @@ from PySide6.QtWidgets import (
     QLabel,
     QMenu,
 )
+from .multithreading import WorkerSearch
+
+# Delay after the last keystroke before searching
+SEARCH_DELAY_MS = 300
 
 
 class SearchBar(QWidget):
     """Search bar widget
 
-    For searching and filtering in a IFC tree view or SOM tree view
+    For searching and filtering in a IFC tree view or SOM tree view.
+    Filters are set on the TreeProxyModel of the view.
+
+    The search starts SEARCH_DELAY_MS after the last keystroke or on enter.
+    Searches run in a WorkerSearch on the SearchIndex of the column; a new
+    search cancels the running one and the number of hits is shown while
+    the search is running.
 
     :param parent: The parent widget (IfcTabs or SomDockWidget)
     :param filtermode: If True, the search bar is used for filtering, otherwise for searching
@@ -59,6 +69,13 @@ class SearchBar(QWidget):
 
         self.searchresults = []
         self.current = 0
+        self._search_id = 0
+        self._search_worker = None
+
+        self.search_timer = QTimer(self)
+        self.search_timer.setSingleShot(True)
+        self.search_timer.setInterval(SEARCH_DELAY_MS)
+        self.search_timer.timeout.connect(self.search)
 
         self.layout = QHBoxLayout(self)
         self.layout.setContentsMargins(1, 1, 1, 1)
@@ -126,6 +143,7 @@ class SearchBar(QWidget):
         self.layout.addWidget(self.close_button)
 
         self.search_text.returnPressed.connect(self.search)
+        self.search_text.textEdited.connect(self.search_timer.start)
         self.column_combo.currentIndexChanged.connect(self.search)
         self.search_next_button.clicked.connect(self.search_next)
         self.search_prev_button.clicked.connect(self.search_prev)
@@ -134,10 +152,16 @@ class SearchBar(QWidget):
         self.hide()
 
     def search(self):
-        """Search the text/pattern in the tree view"""
+        """Search the text/pattern in the tree view
+
+        In search mode, the search is started in a worker and the results
+        are shown by on_search_result().
+        """
+        self.search_timer.stop()
+        self.stop_search()
         self.searchresults = []
-        pattern = self.search_text.text()
-        pattern = pattern.strip()
+        text = self.search_text.text().strip()
+        pattern = text
         if not pattern:
             self.search_text.setStyleSheet("")
             self.counterlabel.setText("-/-")
@@ -195,18 +219,66 @@ class SearchBar(QWidget):
         self.search_text.setStyleSheet("")
 
         if self.filtermode:
-            self._parent.proxymodel.setFilterKeyColumn(column)
-            self._parent.proxymodel.setFilterRegularExpression(regular_expression)
+            # The proxy model repeats the search when the filter is applied
+            self._parent.proxymodel.set_filter(
+                column,
+                text,
+                how,
+                regular_expression,
+                self.how_button.is_case_sensitive(),
+            )
             self.mainwindow.filterindicator.show()
             self.indicator_act.setEnabled(True)
-            # Trigger a search to make sure we only have valid search results
-            self._parent.searchbar.search()
             return
 
-        items = self._parent.treemodel.root_item.search(regular_expression, column)
+        # Items of lazy models must be added before searching
+        self._parent.treemodel.fetch_all()
+
+        self._search_id += 1
+        self._search_worker = WorkerSearch(
+            self._search_id,
+            self._parent.treemodel.search_index(column),
+            text,
+            how,
+            regular_expression,
+            self.how_button.is_case_sensitive(),
+        )
+        self._search_worker.signals.count.connect(self.on_search_count)
+        self._search_worker.signals.result.connect(self.on_search_result)
+        self._search_worker.signals.error.connect(self.mainwindow.on_error)
+        self.counterlabel.setText("-/0")
+        self.mainwindow.threadpool.start(self._search_worker)
+
+    def stop_search(self):
+        """Cancel the running search, its results are ignored"""
+        if self._search_worker is not None:
+            self._search_worker.stop()
+            self._search_worker = None
+
+    def on_search_count(self, count):
+        """Show the number of hits while the search is running"""
+        if self._search_worker is not None:
+            self.counterlabel.setText(f"-/{count}")
+
+    def on_search_result(self, result):
+        """Select the first result of a search, callback of WorkerSearch
+
+        Results of cancelled searches are ignored. If the model changed
+        during the search, the search is repeated.
+
+        :param result: Tuple (search_id, index, items)
+        """
+        search_id, search_index, items = result
+        if search_id != self._search_id:
+            return
+        self._search_worker = None
+        treemodel = self._parent.treemodel
+        if search_index is not treemodel.search_index(search_index.column):
+            self.search()
+            return
 
         for item in items:
-            source_index = self._parent.treemodel.createIndex(item.row(), 0, item)
+            source_index = treemodel.createIndex(item.row(), 0, item)
             index = self._parent.proxymodel.mapFromSource(source_index)
             if index.isValid():
                 self.searchresults.append(index)
@@ -216,15 +288,22 @@ class SearchBar(QWidget):
             self._parent.tree.clearSelection()
             return
 
-        # Sort the search results
-        self.searchresults.sort(
-            key=lambda index: self._parent.tree.visualRect(index).top()
-        )
+        # Sort the search results in the order of the (sorted) tree view
+        self.searchresults.sort(key=self.sort_key)
         self.current = 0
         self.counterlabel.setText(f"1/{len(self.searchresults)}")
         self._parent.tree.setCurrentIndex(self.searchresults[0])
         self._parent.tree.scrollTo(self.searchresults[0])
 
+    def sort_key(self, index):
+        """Key to sort search results: the rows of the index and its parents"""
+        rows = []
+        while index.isValid():
+            rows.append(index.row())
+            index = index.parent()
+        rows.reverse()
+        return rows
+
     def search_next(self):
         """Select and scroll to the next search result"""
         if len(self.searchresults) == 0:
@@ -265,7 +344,7 @@ class SearchBar(QWidget):
     def remove_filter(self):
         """Remove the filter from the proxy model"""
         self.search_text.setText("")
-        self._parent.proxymodel.setFilterRegularExpression(QRegularExpression())
+        self._parent.proxymodel.clear_filter()
         self.indicator_act.setEnabled(False)
         self.mainwindow.filterindicator.check()
 
@@ -0,0 +1,251 @@
+"""
+/***************************************************************************
+                              BIM Semantic Viewer
+                              -------------------
+        begin                : 2024-10-03
+        copyright            : (C) 2025 by Florian Neukirchen
+        email                : mail@riannek.de
+ ***************************************************************************/
+
+/***************************************************************************
+ *                                                                         *
+ *   This program is free software; you can redistribute it and/or modify  *
+ *   it under the terms of the GNU General Public License as published by  *
+ *   the Free Software Foundation; either version 2 of the License, or     *
+ *   (at your option) any later version.                                   *
+ *                                                                         *
+ ***************************************************************************/
+"""
+from array import array
+import re
+import threading
+
+# Characters with a special meaning in regular expressions, see search()
+REGEX_SPECIAL_CHARS = set("\\^$.|?*+()[]{}")
+
+# Number of values checked between the progress reports of a search
+SEARCH_CHUNK_SIZE = 10000
+
+# Bracket expressions and wildcards of the Wildcard search mode
+WILDCARD_SPLIT = re.compile(r"\[[^\]]*\]|[*?\\\[\]]")
+
+
+def _trigrams(text):
+    """Set of the trigrams of a string"""
+    return {text[i : i + 3] for i in range(len(text) - 2)}
+
+
+class SearchIndex:
+    """Index of the values of one column of a tree model, used by the SearchBar
+
+    The index is built by build() on the first search, which may run in
+    a worker thread (see WorkerSearch). It reads the values of all items
+    (without the root item) as a snapshot, converted to strings (None is
+    an empty string). Besides the values, the index holds a dictionary of
+    the values for the Exact search mode and a trigram index of the lower
+    case values, which gives the candidates for the Text, Wildcard and
+    List Contains modes. The candidates are then checked, Regex mode
+    checks all values.
+
+    The index is created by TreeModelBaseclass.search_index() and dropped
+    when the model changes, but not when the items are sorted. A search in a worker is therefore repeated if
+    the index of the model is not the same after the search.
+
+    :param root: The root item of the tree model
+    :type root: TreeItem
+    :param column: The column to index
+    :type column: int
+    """
+
+    def __init__(self, root, column):
+        self.column = column
+        self._root = root
+        self._items = []
+        self._values = []
+        self._lowered = None
+        self._exact = None
+        self._exact_lowered = None
+        self._trigrams = None
+        self._lock = threading.Lock()
+
+    def _read(self):
+        """Read the values of all items below the root in tree order"""
+        column = self.column
+        stack = list(reversed(self._root.children))
+        while stack:
+            item = stack.pop()
+            if column == 0:
+                value = item.label
+            else:
+                value = item.data(column)
+            if value is None:
+                value = ""
+            elif not isinstance(value, str):
+                value = str(value)
+            self._items.append(item)
+            self._values.append(value)
+            stack.extend(reversed(item.children))
+
+    def build(self):
+        """Read the values and build the dictionaries and the trigram index
+
+        Does nothing if the index is already built. Thread safe, a second
+        thread waits until the index is built.
+        """
+        with self._lock:
+            if self._trigrams is not None:
+                return
+            self._read()
+            lowered_values = [value.lower() for value in self._values]
+            exact = {}
+            exact_lowered = {}
+            trigrams = {}
+            for position, (value, lowered) in enumerate(
+                zip(self._values, lowered_values)
+            ):
+                exact.setdefault(value, []).append(position)
+                exact_lowered.setdefault(lowered, []).append(position)
+                for trigram in _trigrams(lowered):
+                    postings = trigrams.get(trigram)
+                    if postings is None:
+                        trigrams[trigram] = array("I", (position,))
+                    else:
+                        postings.append(position)
+            self._lowered = lowered_values
+            self._exact = exact
+            self._exact_lowered = exact_lowered
+            self._trigrams = trigrams
+
+    @property
+    def is_built(self):
+        """True if build() was called"""
+        return self._trigrams is not None
+
+    def _candidates(self, literals):
+        """Positions of the values that may contain all literals (lower case)
+
+        Returns None if the literals are too short to use the trigram index.
+        """
+        trigrams = set()
+        for literal in literals:
+            trigrams.update(_trigrams(literal))
+        if not trigrams:
+            return None
+        postings = sorted(
+            (self._trigrams.get(trigram, ()) for trigram in trigrams), key=len
+        )
+        candidates = set(postings[0])
+        for posting in postings[1:]:
+            if not candidates:
+                break
+            candidates.intersection_update(posting)
+        return sorted(candidates)
+
+    def _filter(self, positions, check, progress=None, is_cancelled=None):
+        """Check the values at the positions in chunks
+
+        Returns the positions that passed the check, or None if cancelled.
+        """
+        if positions is None:
+            positions = range(len(self._values))
+        found = []
+        for start in range(0, len(positions), SEARCH_CHUNK_SIZE):
+            if is_cancelled is not None and is_cancelled():
+                return None
+            found.extend(
+                position
+                for position in positions[start : start + SEARCH_CHUNK_SIZE]
+                if check(position)
+            )
+            if progress is not None:
+                progress(len(found))
+        return found
+
+    def search(
+        self,
+        text,
+        how,
+        regular_expression,
+        case_sensitive=False,
+        progress=None,
+        is_cancelled=None,
+    ):
+        """Find the items with a value matching the search text
+
+        The regular expression must be made from the text according to
+        the search mode, as done by the SearchBar. It is used for the
+        modes that can not be answered by the index alone. Scans are done
+        in chunks of SEARCH_CHUNK_SIZE values, after each chunk progress
+        is called with the number of hits so far and the search stops
+        if is_cancelled returns True.
+
+        :param text: The search text as entered by the user
+        :type text: str
+        :param how: Search mode: Text, Exact, Wildcard, List Contains or Regex
+        :type how: str
+        :param regular_expression: The pattern made from the text
+        :type regular_expression: QRegularExpression
+        :param case_sensitive: Case sensitive search
+        :type case_sensitive: bool
+        :param progress: Callback with the number of hits so far
+        :type progress: callable, optional
+        :param is_cancelled: Callback to stop the search
+        :type is_cancelled: callable, optional
+        :return: The matching items in the order of the tree when the
+            index was built, None if cancelled
+        :rtype: list of TreeItem
+        """
+        self.build()
+        values = self._values
+
+        def matches(position):
+            return regular_expression.match(values[position]).hasMatch()
+
+        if how == "Text":
+            if case_sensitive:
+                needle = text
+            else:
+                needle, values = text.lower(), self._lowered
+            positions = self._filter(
+                self._candidates([text.lower()]),
+                lambda position: needle in values[position],
+                progress,
+                is_cancelled,
+            )
+        elif how == "Exact":
+            if case_sensitive:
+                positions = self._exact.get(text, [])
+            else:
+                positions = self._exact_lowered.get(text.lower(), [])
+        elif how == "Wildcard":
+            literals = WILDCARD_SPLIT.split(text.lower())
+            positions = self._filter(
+                self._candidates(literals), matches, progress, is_cancelled
+            )
+        elif how == "List Contains":
+            elements = [element.strip() for element in text.split(",")]
+            if any(REGEX_SPECIAL_CHARS.intersection(e) for e in elements):
+                candidates = None
+            else:
+                candidates = set()
+                for element in elements:
+                    element_candidates = self._candidates([element.lower()])
+                    if element_candidates is None:
+                        candidates = None
+                        break
+                    candidates.update(element_candidates)
+                else:
+                    candidates = sorted(candidates)
+            positions = self._filter(candidates, matches, progress, is_cancelled)
+        else:
+            positions = self._filter(None, matches, progress, is_cancelled)
+        if positions is None:
+            return None
+        return [self._items[position] for position in positions]
+
+    def __len__(self):
+        self.build()
+        return len(self._items)
+
+    def __repr__(self):
+        return f"SearchIndex (column {self.column}, {len(self._items)} items)"
@@ -16,7 +16,7 @@
  *                                                                         *
  ***************************************************************************/
 """
-from PySide6.QtCore import Qt, QSortFilterProxyModel
+from PySide6.QtCore import Qt
 from PySide6.QtGui import QAction
 from PySide6.QtWidgets import (
     QDockWidget,
@@ -25,9 +25,15 @@ from PySide6.QtWidgets import (
     QWidget,
     QVBoxLayout,
 )
-import ifcopenshell.util.element
 import json
-from bimsemantic.ui import TreeItem, TreeModelBaseclass, CopyMixin, SearchBar
+from bimsemantic.ui import (
+    TreeItem,
+    TreeModelBaseclass,
+    CopyMixin,
+    SearchBar,
+    TreeProxyModel,
+    IfcTreeItem,
+)
 
 
 class SomTreeItem(TreeItem):
@@ -151,9 +157,9 @@ class SomDockWidget(CopyMixin, QDockWidget):
 
         # Tree widget
         self.treemodel = SomTreeModel(data, self)
-        self.proxymodel = QSortFilterProxyModel(self)
+        self.proxymodel = TreeProxyModel(self, self.mainwindow.threadpool)
         self.proxymodel.setSourceModel(self.treemodel)
-        self.proxymodel.setRecursiveFilteringEnabled(True)
+        self.proxymodel.filterApplied.connect(self.on_filter_applied)
 
         self.tree = QTreeView(self)
         self.tree.setModel(self.proxymodel)
@@ -271,16 +277,22 @@ class SomDockWidget(CopyMixin, QDockWidget):
         self.tree.setColumnHidden(column, True)
         self.searchbar.columns_changed()
 
-    def autosearch(self, ifc_object):
-        """Select an element in the tree view by an IfcElement
+    def on_filter_applied(self):
+        """Repeat the search to make sure we only have valid search results"""
+        self.searchbar.search()
+
+    def autosearch(self, item):
+        """Select an element in the tree view by the item of an IfcElement
 
-        :param ifc_object: The IfcElement to select
-        :type ifc_object: IfcElement
+        :param item: The tree item of the IfcElement to select
+        :type item: IfcTreeItem
         """
         if not self._autosearch_attribute:
             return
+        if not isinstance(item, IfcTreeItem):
+            return
 
-        psets = ifcopenshell.util.element.get_psets(ifc_object, psets_only=True)
+        psets = item.get_psets(psets_only=True)
         if not psets:
             return
 
@@ -324,7 +336,7 @@ class SomDockWidget(CopyMixin, QDockWidget):
             source_index = self.mainwindow.tabs.proxymodel.mapToSource(index)
             if source_index.isValid():
                 item = source_index.internalPointer()
-                self.autosearch(item.ifc)
+                self.autosearch(item)
         else:
             self.mainwindow.stop_auto_act.setToolTip(
                 self.tr("Stop the auto search in the SOM")
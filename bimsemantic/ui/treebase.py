@@ -20,17 +20,53 @@ from PySide6.QtCore import (
     Qt,
     QAbstractItemModel,
     QModelIndex,
-    Qt,
-    QObject,
 )
+from .searchindex import SearchIndex
+
+# Signature of the overloads of layoutChanged with the hint, PySide emits
+# the overloads without arguments by default
+LAYOUT_HINT_SIGNATURE = (
+    "QList<QPersistentModelIndex>",
+    "QAbstractItemModel::LayoutChangeHint",
+)
+
+# Number of rows read at once by TreeModelBaseclass.iter_rows()
+EXPORT_CHUNK_ROWS = 10000
+
+def sort_key(value):
+    """Key to sort the values of a column with mixed types
+
+    Numbers are sorted by value before all other values, which are sorted
+    by their string. None, empty strings and NaN are null values, the key
+    is None for them (see TreeModelBaseclass.sort()).
+
+    :param value: The data of an item
+    :return: Tuple of the type rank and the value, or None
+    :rtype: tuple or None
+    """
+    if value is None or value == "":
+        return None
+    if isinstance(value, (int, float)):
+        if value != value:
+            # NaN
+            return None
+        return (0, value)
+    if not isinstance(value, str):
+        value = str(value)
+    return (1, value)
 
 
-class TreeItem(QObject):
+class TreeItem:
     """Basic item for a tree model.
 
     Can be used directly or subclassed to add more functionality.
     Data in this case is a list of strings, with one entry for each column.
 
+    A plain Python class with __slots__, since the trees of large IFC models
+    have several hundred thousand items. Texts are translated in the models.
+    The dictionaries of the children by GUID and by label are only created
+    for items with children.
+
     :param data: The data for the item
     :type data: list  (Optional only for the root item)
     :param parent: The parent tree item (None for the root item)
@@ -38,6 +74,18 @@ class TreeItem(QObject):
     :param id: An optional identifier for the item
     """
 
+    __slots__ = (
+        "_data",
+        "_parent",
+        "_id",
+        "_children",
+        "_children_by_guid",
+        "_children_by_label",
+        "_row",
+        "_leaves_count",
+        "showchildcount",
+    )
+
     def __init__(self, data=None, parent=None, id=None, showchildcount=True):
         self._data = data
         if data is None:
@@ -45,15 +93,53 @@ class TreeItem(QObject):
         self._parent = parent
         self._id = id
         self._children = []
+        self._children_by_guid = None
+        self._children_by_label = None
+        self._row = 0
+        self._leaves_count = None
         self.showchildcount = showchildcount
 
     def appendChild(self, item):
         """Add a child item to the item"""
+        item._row = len(self._children)
         self._children.append(item)
+        self._index_child(item)
+        self._invalidate_leaves_count()
 
     def removeChild(self, item):
         """Remove a child item from the item"""
         self._children.remove(item)
+        for row, child in enumerate(self._children):
+            child._row = row
+        # Another child may have the same GUID or label
+        self._rebuild_child_index()
+        self._invalidate_leaves_count()
+
+    def _index_child(self, item):
+        """Add a child item to the dictionaries by GUID and by label
+
+        If several children have the same GUID or label, the first one is kept.
+        """
+        if self._children_by_guid is None:
+            self._children_by_guid = {}
+            self._children_by_label = {}
+        guid = item.guid
+        if guid is not None and guid not in self._children_by_guid:
+            self._children_by_guid[guid] = item
+        try:
+            label = item.label
+            if label not in self._children_by_label:
+                self._children_by_label[label] = item
+        except (AttributeError, IndexError, TypeError):
+            # No label or unhashable label (e.g. list), see child_by_label()
+            pass
+
+    def _rebuild_child_index(self):
+        """Rebuild the dictionaries by GUID and by label of the children"""
+        self._children_by_guid = None
+        self._children_by_label = None
+        for child in self._children:
+            self._index_child(child)
 
     def child(self, row):
         """Get a child item by its row
@@ -67,18 +153,72 @@ class TreeItem(QObject):
             return None
         return self._children[row]
 
+    def child_by_guid(self, guid):
+        """Get the first child item with a given GUID, or None
+
+        Uses a dictionary of the children that is updated by appendChild()
+        and removeChild(), instead of iterating over the children.
+
+        :param guid: The GUID of the child item
+        :type guid: str
+        :return: The child item
+        :rtype: TreeItem or derived class
+        """
+        if self._children_by_guid is None:
+            return None
+        return self._children_by_guid.get(guid)
+
+    def child_by_label(self, label):
+        """Get the first child item with a given label, or None
+
+        Uses a dictionary of the children that is updated by appendChild()
+        and removeChild(). Only unhashable labels (such as list values of
+        properties) are searched by iterating over the children.
+
+        :param label: The label (data of the first column) of the child item
+        :return: The child item
+        :rtype: TreeItem or derived class
+        """
+        if self._children_by_label is None:
+            return None
+        try:
+            return self._children_by_label.get(label)
+        except TypeError:
+            pass
+        for child in self._children:
+            try:
+                childlabel = child.label
+            except (AttributeError, IndexError):
+                continue
+            if childlabel == label:
+                return child
+        return None
+
     def child_count(self):
         """Get the number of children"""
         return len(self._children)
 
     def leaves_count(self):
-        """Recursively get the number of leave nodes connected to/as children of this item"""
-        leaves = 0
-        for child in self._children:
-            leaves += child.leaves_count()
-        if leaves == 0:
-            return 1
-        return leaves
+        """Recursively get the number of leave nodes connected to/as children of this item
+
+        The result is cached, since it is needed for every repaint of the label.
+        The cache is cleared by appendChild() and removeChild() for the
+        parent item and all its ancestors.
+        """
+        if self._leaves_count is None:
+            leaves = 0
+            for child in self._children:
+                leaves += child.leaves_count()
+            self._leaves_count = max(leaves, 1)
+        return self._leaves_count
+
+    def _invalidate_leaves_count(self):
+        """Clear the cached count of leaves of the item and its ancestors"""
+        item = self
+        # If the count is not cached, it is also not cached for the ancestors
+        while item is not None and item._leaves_count is not None:
+            item._leaves_count = None
+            item = item._parent
 
     def level(self):
         """Get the level of the item in the tree"""
@@ -123,6 +263,9 @@ class TreeItem(QObject):
         if column < 0 or column >= len(self._data):
             return
         self._data[column] = value
+        if column == 0 and self._parent:
+            # The label has changed
+            self._parent._rebuild_child_index()
 
     @property
     def label(self):
@@ -138,9 +281,18 @@ class TreeItem(QObject):
         return self._parent
 
     def row(self):
-        """Get the row of the item in the parent's children list"""
+        """Get the row of the item in the parent's children list
+
+        The row is stored in the item by appendChild() and removeChild()
+        of the parent, since this is called very often by the model.
+        """
         if self._parent:
-            return self._parent.children.index(self)
+            siblings = self._parent._children
+            if self._row < len(siblings) and siblings[self._row] is self:
+                return self._row
+            # The list of children was changed without using appendChild()
+            self._row = siblings.index(self)
+            return self._row
         return 0
 
     def search(self, pattern, column=0):
@@ -163,6 +315,8 @@ class TreeItem(QObject):
 
         if column_data is None:
             column_data = ""
+        elif not isinstance(column_data, str):
+            column_data = str(column_data)
 
         match = pattern.match(column_data)
         if match.hasMatch():
@@ -201,6 +355,11 @@ class TreeItem(QObject):
         """The optional ID of the item"""
         return self._id
 
+    @property
+    def guid(self):
+        """TreeItem does not have a GUID, always None"""
+        return None
+
     @property
     def children(self):
         """Children of the tree item"""
@@ -230,6 +389,19 @@ class TreeModelBaseclass(QAbstractItemModel):
         self.column_count = 2
         self.nan = self.tr("<NULL>")
 
+        # Search indexes and sort keys by column, see search_index() and sort()
+        self._search_indexes = {}
+        self._sort_keys = {}
+        for signal in (
+            self.rowsInserted,
+            self.rowsRemoved,
+            self.rowsMoved,
+            self.modelReset,
+            self.dataChanged,
+        ):
+            signal.connect(self.invalidate_indexes)
+        self.layoutChanged.connect(self.on_layout_changed)
+
         self.setup_root_item()
         self.setup_model_data(data, self._rootItem)
 
@@ -243,14 +415,306 @@ class TreeModelBaseclass(QAbstractItemModel):
 
     def get_child_by_label(self, parent, label):
         """Get the child item with a given label (data of first column) if already present, otherwise None"""
-        for child in parent.children:
-            try:
-                childlabel = child.label
-            except AttributeError:
+        return parent.child_by_label(label)
+
+    def build_tree(self, data):
+        """Build a detached tree for the data, to be added with merge_tree()
+
+        Must not change the model, since it may run in a worker thread
+        (see WorkerBuildTrees). Can be overridden in derived classes.
+
+        :param data: The data for the tree, depends on the derived class
+        :return: The root item of the detached tree
+        :rtype: TreeItem
+        """
+        return TreeItem()
+
+    def merge_tree(self, root):
+        """Merge a detached tree, created by build_tree(), into the model
+
+        Children of the detached root are compared to the children of the
+        model's root item with get_merge_partner(). Items without partner
+        are moved to the model together with their children, otherwise the
+        items are merged with merge_item() and their children are merged
+        recursively. Must be called in the GUI thread.
+
+        The model is not reset: new items are inserted with one
+        beginInsertRows()/endInsertRows() per parent and dataChanged is
+        emitted for the merged items, so the views keep their state.
+        The first column is only reported as changed for items that got
+        new descendants (e.g. for counters in the label).
+
+        :param root: The root item of the detached tree
+        :type root: TreeItem
+        :return: The items that were inserted (without their children)
+        :rtype: list of TreeItem
+        """
+        inserted = []
+        self._merge_children(self._rootItem, root, inserted)
+        return inserted
+
+    def _merge_children(self, parent, detached_parent, inserted):
+        """Merge the children of a detached item into the children of parent
+
+        Returns True if items were inserted below parent.
+        """
+        new_items = []
+        merged_rows = []
+        grown_rows = []
+        for detached_item in detached_parent.children:
+            item = self.get_merge_partner(parent, detached_item)
+            if item is None:
+                new_items.append(detached_item)
+            else:
+                self.merge_item(item, detached_item)
+                merged_rows.append(item.row())
+                if self._merge_children(item, detached_item, inserted):
+                    grown_rows.append(item.row())
+
+        if merged_rows and self.columnCount() > 1:
+            self._emit_rows_changed(parent, merged_rows, 1, self.columnCount() - 1)
+        if grown_rows:
+            self._emit_rows_changed(parent, grown_rows, 0, 0)
+
+        if new_items:
+            self.insert_items(parent, new_items)
+            inserted.extend(new_items)
+
+        return bool(new_items or grown_rows)
+
+    def insert_items(self, parent, items):
+        """Append items (with their children) to an item of the model
+
+        The rows are inserted with one beginInsertRows()/endInsertRows()
+        and item_added() is called for each item.
+
+        :param parent: The item of the model to add the items to
+        :type parent: TreeItem
+        :param items: The new items
+        :type items: list of TreeItem
+        """
+        first = parent.child_count()
+        self.beginInsertRows(self.item_index(parent), first, first + len(items) - 1)
+        for item in items:
+            item._parent = parent
+            parent.appendChild(item)
+            self.item_added(item)
+        self.endInsertRows()
+
+    def _emit_rows_changed(self, parent, rows, first_column, last_column):
+        """Emit dataChanged for rows (children of parent) and a range of columns
+
+        One signal is emitted for each run of consecutive rows, since
+        a proxy model checks the sort order of every row in the range.
+        """
+        rows = sorted(rows)
+        start = 0
+        for i in range(1, len(rows) + 1):
+            if i < len(rows) and rows[i] == rows[i - 1] + 1:
                 continue
-            if childlabel == label:
-                return child
-        return None
+            first = rows[start]
+            last = rows[i - 1]
+            self.dataChanged.emit(
+                self.createIndex(first, first_column, parent.child(first)),
+                self.createIndex(last, last_column, parent.child(last)),
+            )
+            start = i
+
+    def item_index(self, item, column=0):
+        """Get the QModelIndex of an item of the model
+
+        :param item: The tree item
+        :type item: TreeItem
+        :param column: The column of the index, defaults to 0
+        :type column: int
+        :return: Index of the item, invalid index for the root item
+        :rtype: QModelIndex
+        """
+        if item is None or item is self._rootItem:
+            return QModelIndex()
+        return self.createIndex(item.row(), column, item)
+
+    def get_merge_partner(self, parent, detached_item):
+        """Get the child of parent that corresponds to a detached item, or None
+
+        Items with a GUID are matched by GUID, items with an ID by ID,
+        other items by label. Can be overridden in derived classes.
+        """
+        guid = detached_item.guid
+        if guid is not None:
+            return parent.child_by_guid(guid)
+        if detached_item.id is not None:
+            for child in parent.children:
+                if child.id == detached_item.id:
+                    return child
+            return None
+        return parent.child_by_label(detached_item.label)
+
+    def merge_item(self, item, detached_item):
+        """Merge the data of a detached item into an item of the model
+
+        Called by merge_tree(), does nothing if not overridden in derived classes.
+        """
+        pass
+
+    def item_added(self, item):
+        """Called by merge_tree() for each detached item that is moved into the model
+
+        The item is passed with its children. Does nothing if not overridden
+        in derived classes.
+        """
+        pass
+
+    def search_index(self, column):
+        """Get the SearchIndex of a column, created on first use
+
+        The index is built on the first search. The indexes are dropped
+        by invalidate_indexes() when the model changes.
+
+        :param column: The column number
+        :type column: int
+        :rtype: SearchIndex
+        """
+        index = self._search_indexes.get(column)
+        if index is None:
+            index = SearchIndex(self._rootItem, column)
+            self._search_indexes[column] = index
+        return index
+
+    def invalidate_indexes(self, *args):
+        """Drop the search indexes and sort keys, connected to the signals of model changes"""
+        self._search_indexes = {}
+        self._sort_keys = {}
+
+    def on_layout_changed(
+        self, parents=None, hint=QAbstractItemModel.NoLayoutChangeHint
+    ):
+        """Drop the search indexes and sort keys, unless the items were only sorted"""
+        if hint != QAbstractItemModel.VerticalSortHint:
+            self.invalidate_indexes()
+
+    def sort_keys(self, column):
+        """Get the sort keys of all items for a column, see sort_key()
+
+        The keys are read once and cached until the model changes.
+
+        :param column: The column number
+        :type column: int
+        :return: The keys by item
+        :rtype: dict
+        """
+        keys = self._sort_keys.get(column)
+        if keys is None:
+            keys = {}
+            stack = list(self._rootItem.children)
+            while stack:
+                item = stack.pop()
+                keys[item] = sort_key(item.data(column))
+                stack.extend(item.children)
+            self._sort_keys[column] = keys
+        return keys
+
+    def sort(self, column, order=Qt.AscendingOrder):
+        """Sort the children of all items by a column
+
+        The items are sorted with the keys of sort_keys(), i.e. each value
+        is read only once instead of for every comparison. Null values are
+        always sorted last. Ties keep their order. Each list of children
+        is replaced by a sorted copy instead of being sorted in place, so
+        that a SearchIndex read in a worker at the same time sees all
+        children, in the old or in the new order.
+        Emits layoutChanged with VerticalSortHint and updates the
+        persistent indexes (e.g. selection and expanded items).
+        Called by TreeProxyModel.sort(), does nothing if column is -1.
+
+        :param column: The column number
+        :type column: int
+        :param order: The sort order
+        :type order: Qt.SortOrder
+        """
+        if column < 0 or column >= self.columnCount():
+            return
+        keys = self.sort_keys(column)
+        reverse = order == Qt.DescendingOrder
+        null = (-1,) if reverse else (2,)
+
+        def key(item):
+            item_key = keys[item]
+            return null if item_key is None else item_key
+
+        self.layoutAboutToBeChanged[LAYOUT_HINT_SIGNATURE].emit(
+            [], QAbstractItemModel.VerticalSortHint
+        )
+        persistent_indexes = self.persistentIndexList()
+        persistent_items = [
+            (index.internalPointer(), index.column()) for index in persistent_indexes
+        ]
+        stack = [self._rootItem]
+        while stack:
+            item = stack.pop()
+            if not item.children:
+                continue
+            children = sorted(item.children, key=key, reverse=reverse)
+            item._children = children
+            for row, child in enumerate(children):
+                child._row = row
+            stack.extend(children)
+        self.changePersistentIndexList(
+            persistent_indexes,
+            [self.createIndex(item.row(), col, item) for item, col in persistent_items],
+        )
+        self.layoutChanged[LAYOUT_HINT_SIGNATURE].emit(
+            [], QAbstractItemModel.VerticalSortHint
+        )
+
+    def column_reader(self, column):
+        """Get a function that reads the values of a column for a list of items
+
+        Used by iter_rows() instead of calling data() of every item. Derived
+        classes may override it to read the values of a column in one go,
+        e.g. with lookups that are prepared once per column.
+
+        :param column: The column number
+        :type column: int
+        :return: Function taking a list of items, returns the list of values
+        :rtype: callable
+        """
+
+        def read(items):
+            return [item.data(column) for item in items]
+
+        return read
+
+    def iter_rows(self, items, columns, levels=None):
+        """Generator, yields the rows of the items in chunks, e.g. to export them
+
+        The values are read column by column with column_reader() in chunks
+        of EXPORT_CHUNK_ROWS items. Each chunk is a list of tuples with the
+        values of one item, None is kept as it is. Only reads the items, it
+        may run in a worker thread.
+
+        :param items: The items in the order of the rows
+        :type items: list of TreeItem
+        :param columns: The column numbers to read
+        :type columns: list of int
+        :param levels: Levels of the items, added as first value of each row
+        :type levels: list of int, optional
+        """
+        readers = [self.column_reader(column) for column in columns]
+        for start in range(0, len(items), EXPORT_CHUNK_ROWS):
+            chunk = items[start : start + EXPORT_CHUNK_ROWS]
+            values = [read(chunk) for read in readers]
+            if levels is not None:
+                values.insert(0, levels[start : start + EXPORT_CHUNK_ROWS])
+            yield list(zip(*values))
+
+    def fetch_all(self):
+        """Add all items of a model that adds items on demand (see fetchMore())
+
+        Called before iterating over all items of the model, e.g. for a
+        search. Does nothing if not overridden in derived classes.
+        """
+        pass
 
     def rowCount(self, parent=QModelIndex()):
         """Get the number of rows (children) for a parent item"""
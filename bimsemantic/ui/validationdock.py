@@ -34,10 +34,7 @@ class ValidationDockWidget(CopyMixin, ContextMixin, QDockWidget):
         super().__init__(self.tr("&Validation"), parent)
         self.mainwindow = parent
         self.validators = Validators()
-        integ_validator = IntegrityValidator(
-            self.mainwindow.ifcfiles,
-            self.mainwindow.tabs,
-        )
+        integ_validator = IntegrityValidator(self.mainwindow.ifcfiles)
         self.validators.add_validator(integ_validator)
 
         self.treemodel = ValidationTreeModel([integ_validator], self)
@@ -298,11 +295,12 @@ class ValidationDockWidget(CopyMixin, ContextMixin, QDockWidget):
     def update_ifc_views(self):
         """Tell all views in the ifc tabs that the column data changed"""
         # Update column 10 in the ifc tree views and eventually unhide it
+        # Emitted by the source model, to also drop its search index
         for i in range(self.mainwindow.tabs.tabs.count()):
-            proxymodel = self.mainwindow.tabs.tabs.widget(i).proxymodel
-            top_left = proxymodel.index(0, 10)
-            bottom_right = proxymodel.index(proxymodel.rowCount() - 1, 10)
-            proxymodel.dataChanged.emit(top_left, bottom_right, [Qt.DisplayRole])
+            treemodel = self.mainwindow.tabs.tabs.widget(i).treemodel
+            top_left = treemodel.index(0, 10)
+            bottom_right = treemodel.index(treemodel.rowCount() - 1, 10)
+            treemodel.dataChanged.emit(top_left, bottom_right, [Qt.DisplayRole])
             tree = self.mainwindow.tabs.tabs.widget(i).tree
             tree.setColumnHidden(10, False)
 
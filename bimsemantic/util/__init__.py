@@ -1,2 +1,6 @@
+from .propertytable import *
+from .ifccache import *
 from .ifcfile import *
+from .elementrecords import *
 from .validator import *
+from .arrowtable import *
@@ -0,0 +1,289 @@
+"""
+/***************************************************************************
+                              BIM Semantic Viewer
+                              -------------------
+        begin                : 2024-10-03
+        copyright            : (C) 2025 by Florian Neukirchen
+        email                : mail@riannek.de
+ ***************************************************************************/
+
+/***************************************************************************
+ *                                                                         *
+ *   This program is free software; you can redistribute it and/or modify  *
+ *   it under the terms of the GNU General Public License as published by  *
+ *   the Free Software Foundation; either version 2 of the License, or     *
+ *   (at your option) any later version.                                   *
+ *                                                                         *
+ ***************************************************************************/
+"""
+from functools import partial
+
+# pyarrow is optional, the export to Arrow and Parquet is not available without it
+try:
+    import pyarrow
+    import pyarrow.ipc
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+# File formats of write_arrow_table() and their file suffixes. Arrow IPC
+# and Feather (version 2) are the same format, written uncompressed
+# to allow memory mapping.
+ARROW_FORMATS = {
+    "parquet": ".parquet",
+    "arrow": ".arrow",
+    "feather": ".feather",
+}
+
+# Number of rows of the record batches (Arrow) and row groups (Parquet)
+ARROW_BATCH_ROWS = 65536
+
+# Columns of element_table_columns() with an attribute of the IFC entity
+ELEMENT_ATTRIBUTE_COLUMNS = [
+    ("Name", "Name"),
+    ("Description", "Description"),
+    ("ObjectType Attribute", "ObjectType"),
+    ("Tag", "Tag"),
+]
+
+
+def has_pyarrow():
+    """True if pyarrow is installed, required by write_arrow_table()"""
+    return pyarrow is not None
+
+
+def arrow_format(filename):
+    """Get the file format for write_arrow_table() by the suffix of a filename
+
+    :param filename: Path of the file
+    :type filename: str
+    :return: Key of ARROW_FORMATS, None for an unknown suffix
+    :rtype: str or None
+    """
+    lowered = filename.lower()
+    for file_format, suffix in ARROW_FORMATS.items():
+        if lowered.endswith(suffix):
+            return file_format
+    return None
+
+
+def _string_array(values):
+    """pyarrow string array of the values converted with str(), None is kept"""
+    return pyarrow.array(
+        [None if value is None else str(value) for value in values],
+        type=pyarrow.string(),
+    )
+
+
+def arrow_array(values):
+    """Convert a list of values to a pyarrow array with the type of the values
+
+    Columns with only booleans, integers, numbers (integers and floats)
+    or strings keep their type. None is a null value, columns with only
+    None are strings. Columns with mixed or other types (e.g. lists of
+    values) are converted to strings, as in an export to CSV.
+
+    :param values: The values of a column
+    :type values: list
+    :rtype: pyarrow.Array
+    """
+    types = set(map(type, values))
+    types.discard(type(None))
+    if types == {bool}:
+        arrow_type = pyarrow.bool_()
+    elif types == {int}:
+        arrow_type = pyarrow.int64()
+    elif types and types <= {int, float}:
+        arrow_type = pyarrow.float64()
+    elif types <= {str}:
+        arrow_type = pyarrow.string()
+    else:
+        return _string_array(values)
+    try:
+        return pyarrow.array(values, type=arrow_type)
+    except (pyarrow.ArrowInvalid, OverflowError):
+        # E.g. integers out of the range of int64
+        return _string_array(values)
+
+
+def write_arrow_table(
+    filename, columns, file_format="parquet", progress=None, is_cancelled=None
+):
+    """Write a table to a Parquet or Arrow IPC (Feather) file
+
+    The columns are read one after the other and converted with
+    arrow_array(), i.e. only the values of one column are held as
+    Python objects at the same time. After each column, progress is
+    called with the number of columns read so far and the export stops
+    if is_cancelled returns True.
+
+    :param filename: Path of the file
+    :type filename: str
+    :param columns: List of tuples (name, read), read is called without
+        arguments and returns the list of values of the column. All columns
+        must have the same number of values.
+    :type columns: list of tuple
+    :param file_format: A key of ARROW_FORMATS
+    :type file_format: str
+    :param progress: Callback with the number of columns read so far
+    :type progress: callable, optional
+    :param is_cancelled: Callback to stop the export
+    :type is_cancelled: callable, optional
+    :return: False if cancelled, otherwise True
+    :rtype: bool
+    :raises RuntimeError: pyarrow is not installed
+    :raises ValueError: Unknown file format
+    """
+    if pyarrow is None:
+        raise RuntimeError("pyarrow is required to export to Arrow and Parquet")
+    if file_format not in ARROW_FORMATS:
+        raise ValueError(f"Unknown file format {file_format}")
+
+    names = []
+    arrays = []
+    for name, read in columns:
+        if is_cancelled is not None and is_cancelled():
+            return False
+        names.append(name)
+        arrays.append(arrow_array(read()))
+        if progress is not None:
+            progress(len(names))
+    table = pyarrow.Table.from_arrays(arrays, names=names)
+
+    if file_format == "parquet":
+        pyarrow.parquet.write_table(table, filename, row_group_size=ARROW_BATCH_ROWS)
+    else:
+        with pyarrow.OSFile(filename, "wb") as sink:
+            with pyarrow.ipc.new_file(sink, table.schema) as writer:
+                writer.write_table(table, max_chunksize=ARROW_BATCH_ROWS)
+    return True
+
+
+def property_column_name(pset_name, prop_name):
+    """Name of a table column of a property, "pset.property"
+
+    IFC allows property sets and properties without a name (None),
+    these parts of the column name are empty.
+
+    :param pset_name: Name of the property set
+    :type pset_name: str or None
+    :param prop_name: Name of the property
+    :type prop_name: str or None
+    :rtype: str
+    """
+    return f"{pset_name or ''}.{prop_name or ''}"
+
+
+def _attribute_values(elements, attribute):
+    """Values of an attribute of IFC entities, None if an entity does not have it
+
+    The position of the attribute is looked up once per IFC class.
+    """
+    positions = {}
+    values = []
+    for element in elements:
+        ifc_class = element.is_a()
+        if ifc_class in positions:
+            position = positions[ifc_class]
+        else:
+            names = element.get_attribute_names()
+            position = names.index(attribute) if attribute in names else None
+            positions[ifc_class] = position
+        values.append(None if position is None else element.get_argument(position))
+    return values
+
+
+def _related_names(ifc_files, elements_by_file, get_related):
+    """Names of a related entity of the elements, e.g. the linked type"""
+    values = []
+    for ifc_file, elements in zip(ifc_files, elements_by_file):
+        for element in elements:
+            related = get_related(ifc_file, element)
+            values.append(None if related is None else related.Name)
+    return values
+
+
+def _property_values(ifc_files, elements_by_file, key):
+    """Values of a property of the elements, None if not defined"""
+    values = []
+    for ifc_file, elements in zip(ifc_files, elements_by_file):
+        column = dict(ifc_file.property_table.items(*key))
+        values.extend(column.get(element.id()) for element in elements)
+    return values
+
+
+def element_table_columns(ifc_files, ifc_class="IfcElement"):
+    """Columns of a table of the elements of IFC files with all their properties
+
+    One row for each entity of the IFC class (including subclasses) in
+    each file, i.e. an element contained in several files has several
+    rows. The columns are the filename, ID, GUID, IFC class, the
+    attributes of ELEMENT_ATTRIBUTE_COLUMNS, the names of the linked type
+    and the spatial container, followed by one column for each property
+    and quantity of all files, named "pset.property". The values are
+    read from the PropertyTable of the files.
+
+    The elements and the names of the property columns are read at once,
+    the values when the columns are read, e.g. by write_arrow_table().
+
+    :param ifc_files: The files, e.g. IfcFiles
+    :type ifc_files: iterable of IfcFile
+    :param ifc_class: IFC class of the entities in the rows
+    :type ifc_class: str, optional
+    :return: List of tuples (name, read), see write_arrow_table()
+    :rtype: list of tuple
+    """
+    ifc_files = list(ifc_files)
+    elements_by_file = [ifc_file.model.by_type(ifc_class) for ifc_file in ifc_files]
+    elements = [element for file_elements in elements_by_file for element in file_elements]
+
+    def filenames():
+        return [
+            ifc_file.filename
+            for ifc_file, file_elements in zip(ifc_files, elements_by_file)
+            for _ in file_elements
+        ]
+
+    columns = [
+        ("Filename", filenames),
+        ("ID", lambda: [element.id() for element in elements]),
+        ("GUID", lambda: [element.GlobalId for element in elements]),
+        ("IFC Class", lambda: [element.is_a() for element in elements]),
+    ]
+    for name, attribute in ELEMENT_ATTRIBUTE_COLUMNS:
+        columns.append((name, partial(_attribute_values, elements, attribute)))
+    columns.append(
+        (
+            "Linked Object Type",
+            partial(
+                _related_names,
+                ifc_files,
+                elements_by_file,
+                lambda ifc_file, element: ifc_file.get_type(element),
+            ),
+        )
+    )
+    columns.append(
+        (
+            "Contained In",
+            partial(
+                _related_names,
+                ifc_files,
+                elements_by_file,
+                lambda ifc_file, element: ifc_file.get_container(element),
+            ),
+        )
+    )
+
+    keys = {}
+    for ifc_file in ifc_files:
+        for key in ifc_file.property_table.keys():
+            keys[key] = None
+    for key in keys:
+        columns.append(
+            (
+                property_column_name(*key),
+                partial(_property_values, ifc_files, elements_by_file, key),
+            )
+        )
+    return columns
@@ -0,0 +1,216 @@
+"""
+/***************************************************************************
+                              BIM Semantic Viewer
+                              -------------------
+        begin                : 2024-10-03
+        copyright            : (C) 2025 by Florian Neukirchen
+        email                : mail@riannek.de
+ ***************************************************************************/
+
+/***************************************************************************
+ *                                                                         *
+ *   This program is free software; you can redistribute it and/or modify  *
+ *   it under the terms of the GNU General Public License as published by  *
+ *   the Free Software Foundation; either version 2 of the License, or     *
+ *   (at your option) any later version.                                   *
+ *                                                                         *
+ ***************************************************************************/
+"""
+import threading
+import ifcopenshell.util.element
+
+
+class ElementRecord:
+    """Data of an IFC entity that is shared by the items of all tree views
+
+    The entity, ID and IfcFile are taken from the first file containing
+    the GUID. filenames is the list of all files containing the GUID.
+
+    :param ifc_object: IFC entity (e.g. IfcElement) from IfcOpenShell
+    :type ifc_object: IfcOpenShell entity
+    :param ifc_file: IfcFile containing the entity, may be None
+    :type ifc_file: IfcFile
+    :param unnamed: Name of linked object types without name
+    :type unnamed: str
+    """
+
+    __slots__ = (
+        "id",
+        "guid",
+        "ifc_class",
+        "ifc",
+        "ifc_file",
+        "linked_type_name",
+        "container",
+        "filenames",
+    )
+
+    def __init__(self, ifc_object, ifc_file=None, unnamed="Unnamed"):
+        self.ifc = ifc_object
+        self.ifc_file = ifc_file
+        self.id = ifc_object.id()
+        self.guid = ifc_object.GlobalId
+        self.ifc_class = ifc_object.is_a()
+
+        if ifc_object.is_a("IfcElementType"):
+            linked_object_type = None
+        elif ifc_file:
+            linked_object_type = ifc_file.get_type(ifc_object)
+        else:
+            linked_object_type = ifcopenshell.util.element.get_type(ifc_object)
+        if linked_object_type:
+            self.linked_type_name = linked_object_type.Name
+            if self.linked_type_name is None:
+                self.linked_type_name = unnamed
+        else:
+            self.linked_type_name = None
+
+        if ifc_file:
+            self.container = ifc_file.get_container(ifc_object)
+        else:
+            try:
+                self.container = ifc_object.ContainedInStructure[0].RelatingStructure
+            except (IndexError, AttributeError):
+                self.container = None
+
+        self.filenames = []
+        if ifc_file:
+            self.filenames.append(ifc_file.filename)
+
+    def add_filename(self, filename):
+        """Add a file to the files containing the GUID, if not present yet
+
+        :param filename: Filename of the IFC file
+        :type filename: str
+        """
+        if filename not in self.filenames:
+            self.filenames.append(filename)
+
+    @property
+    def container_name(self):
+        """Name of the spatial structure element containing the entity, or None"""
+        if self.container is None:
+            return None
+        return self.container.Name
+
+    def __repr__(self):
+        return f"ElementRecord: {self.ifc_class} {self.guid}"
+
+
+class ElementRecords:
+    """Store of the ElementRecord of all IFC entities in the tree views, by GUID
+
+    The tree models share one store, their items only hold a reference to
+    the record. get_record() is thread safe, since the trees are built in
+    a worker thread. The records of the items in the views must only be
+    changed in the GUI thread: after defer_filenames(), the filenames
+    added to existing records in the calling thread are collected and
+    applied later with add_filenames().
+
+    :param unnamed: Name of linked object types without name, e.g. translated
+    :type unnamed: str, optional
+    """
+
+    def __init__(self, unnamed="Unnamed"):
+        self.unnamed = unnamed
+        self._records = {}
+        self._lock = threading.Lock()
+        # Filenames collected by defer_filenames(), per thread
+        self._local = threading.local()
+
+    def get_record(self, ifc_object, ifc_file=None):
+        """Get the record of an IFC entity, creating it if needed
+
+        If the GUID is already in the store, the filename of the IfcFile
+        is added to the existing record with add_filename().
+
+        :param ifc_object: IFC entity (e.g. IfcElement) from IfcOpenShell
+        :type ifc_object: IfcOpenShell entity
+        :param ifc_file: IfcFile containing the entity
+        :type ifc_file: IfcFile
+        :return: The record of the GUID
+        :rtype: ElementRecord
+        """
+        guid = ifc_object.GlobalId
+        with self._lock:
+            record = self._records.get(guid)
+            if record is None:
+                record = ElementRecord(ifc_object, ifc_file, self.unnamed)
+                self._records[guid] = record
+                return record
+        if ifc_file:
+            self.add_filename(guid, ifc_file.filename)
+        return record
+
+    def add_filename(self, guid, filename):
+        """Add a filename to the record of a GUID
+
+        Only collected if defer_filenames() was called in the same thread.
+
+        :param guid: The GUID of the record
+        :type guid: str
+        :param filename: Filename of the IFC file
+        :type filename: str
+        """
+        pending = getattr(self._local, "pending", None)
+        if pending is not None:
+            pending.append((guid, filename))
+            return
+        record = self._records.get(guid)
+        if record is not None:
+            record.add_filename(filename)
+
+    def defer_filenames(self):
+        """Collect the filenames added in the calling thread instead of adding them
+
+        Used by WorkerBuildTrees, the collected filenames are returned
+        by take_filenames().
+        """
+        self._local.pending = []
+
+    def take_filenames(self):
+        """Stop collecting filenames in the calling thread, see defer_filenames()
+
+        :return: List of tuples (guid, filename)
+        :rtype: list of tuple
+        """
+        pending = getattr(self._local, "pending", None)
+        self._local.pending = None
+        return pending or []
+
+    def add_filenames(self, filenames):
+        """Add the filenames collected in a worker, must be called in the GUI thread
+
+        :param filenames: List of tuples (guid, filename), see take_filenames()
+        :type filenames: list of tuple
+        :return: The GUIDs of the records that got a new filename
+        :rtype: set of str
+        """
+        changed = set()
+        for guid, filename in filenames:
+            record = self._records.get(guid)
+            if record is not None and filename not in record.filenames:
+                record.add_filename(filename)
+                changed.add(guid)
+        return changed
+
+    def get(self, guid, default=None):
+        """Get the record of a GUID or default"""
+        return self._records.get(guid, default)
+
+    def clear(self):
+        """Remove all records"""
+        with self._lock:
+            self._records.clear()
+
+    def __contains__(self, guid):
+        return guid in self._records
+
+    def __len__(self):
+        return len(self._records)
+
+    def __iter__(self):
+        return iter(list(self._records.values()))
+
+    def __repr__(self):
+        return f"ElementRecords ({len(self)} records)"
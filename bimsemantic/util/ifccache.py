@@ -0,0 +1,174 @@
+"""
+/***************************************************************************
+                              BIM Semantic Viewer
+                              -------------------
+        begin                : 2024-10-03
+        copyright            : (C) 2025 by Florian Neukirchen
+        email                : mail@riannek.de
+ ***************************************************************************/
+
+/***************************************************************************
+ *                                                                         *
+ *   This program is free software; you can redistribute it and/or modify  *
+ *   it under the terms of the GNU General Public License as published by  *
+ *   the Free Software Foundation; either version 2 of the License, or     *
+ *   (at your option) any later version.                                   *
+ *                                                                         *
+ ***************************************************************************/
+"""
+import hashlib
+import json
+import os
+import zlib
+
+# Version of the format of the cache files, older files are ignored
+CACHE_VERSION = 1
+
+# First bytes of a cache file
+CACHE_MAGIC = b"BIMSEMANTIC-CACHE\n"
+
+# Number of bytes at the start and at the end of an IFC file that are hashed
+HASH_SAMPLE_BYTES = 1048576
+
+
+def default_cache_dir():
+    """Default directory of the cache files: bimsemantic in XDG_CACHE_HOME or ~/.cache"""
+    cache_home = os.environ.get("XDG_CACHE_HOME")
+    if not cache_home:
+        cache_home = os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(cache_home, "bimsemantic")
+
+
+class IfcCache:
+    """Sidecar cache of data derived from IFC files, used by IfcFile
+
+    For each IFC file, a dictionary of the derived data is stored in a file
+    in the cache directory (zlib compressed JSON). The data is only used
+    if path, modification time, size and a hash of the file are unchanged.
+    To keep reopening fast, only the first and the last HASH_SAMPLE_BYTES
+    of the IFC file are hashed.
+
+    Errors reading or writing the cache files are ignored, the file is
+    then opened as without cache.
+
+    Example::
+
+        cache = IfcCache()
+        ifcfile = IfcFile("file.ifc", cache=cache)
+
+    :param directory: Directory of the cache files, defaults to default_cache_dir()
+    :type directory: str, optional
+    """
+
+    def __init__(self, directory=None):
+        if directory is None:
+            directory = default_cache_dir()
+        self._directory = directory
+
+    @property
+    def directory(self):
+        """The directory of the cache files"""
+        return self._directory
+
+    def cache_path(self, abspath):
+        """Path of the cache file of an IFC file
+
+        :param abspath: Absolute path of the IFC file
+        :type abspath: str
+        :rtype: str
+        """
+        name = hashlib.blake2b(abspath.encode("utf-8"), digest_size=16).hexdigest()
+        return os.path.join(self._directory, f"{name}.cache")
+
+    def file_key(self, abspath):
+        """Key of an IFC file: path, modification time, size and hash
+
+        :param abspath: Absolute path of the IFC file
+        :type abspath: str
+        :rtype: dict
+        :raises OSError: The file can not be read
+        """
+        stat = os.stat(abspath)
+        file_hash = hashlib.blake2b(digest_size=16)
+        with open(abspath, "rb") as f:
+            file_hash.update(f.read(HASH_SAMPLE_BYTES))
+            if stat.st_size > 2 * HASH_SAMPLE_BYTES:
+                f.seek(-HASH_SAMPLE_BYTES, os.SEEK_END)
+            file_hash.update(f.read(HASH_SAMPLE_BYTES))
+        return {
+            "path": abspath,
+            "mtime": stat.st_mtime_ns,
+            "size": stat.st_size,
+            "hash": file_hash.hexdigest(),
+        }
+
+    def load(self, abspath):
+        """Get the cached data of an IFC file
+
+        :param abspath: Absolute path of the IFC file
+        :type abspath: str
+        :return: The data saved with save(), None if there is no valid cache
+        :rtype: dict or None
+        """
+        try:
+            with open(self.cache_path(abspath), "rb") as f:
+                content = f.read()
+            if not content.startswith(CACHE_MAGIC):
+                return None
+            cached = json.loads(zlib.decompress(content[len(CACHE_MAGIC) :]))
+            if cached.get("version") != CACHE_VERSION:
+                return None
+            if cached.get("key") != self.file_key(abspath):
+                return None
+        except (OSError, ValueError, zlib.error):
+            return None
+        return cached.get("data")
+
+    def save(self, abspath, data):
+        """Save the data of an IFC file
+
+        The cache file is replaced atomically, to be safe if several
+        instances open the same file.
+
+        :param abspath: Absolute path of the IFC file
+        :type abspath: str
+        :param data: The data, must be serializable as JSON
+        :type data: dict
+        :return: True if the data was saved
+        :rtype: bool
+        """
+        path = self.cache_path(abspath)
+        temp_path = f"{path}.{os.getpid()}.tmp"
+        try:
+            cached = {
+                "version": CACHE_VERSION,
+                "key": self.file_key(abspath),
+                "data": data,
+            }
+            content = zlib.compress(json.dumps(cached).encode("utf-8"))
+            os.makedirs(self._directory, exist_ok=True)
+            with open(temp_path, "wb") as f:
+                f.write(CACHE_MAGIC)
+                f.write(content)
+            os.replace(temp_path, path)
+        except (OSError, TypeError, ValueError):
+            try:
+                os.remove(temp_path)
+            except OSError:
+                pass
+            return False
+        return True
+
+    def remove(self, abspath):
+        """Remove the cache file of an IFC file, if present
+
+        :param abspath: Absolute path of the IFC file
+        :type abspath: str
+        """
+        try:
+            os.remove(self.cache_path(abspath))
+        except OSError:
+            pass
+
+    def __repr__(self):
+        return f"IfcCache({self._directory})"
@@ -16,8 +16,571 @@
  *                                                                         *
  ***************************************************************************/
 """
-import ifcopenshell
+from array import array
+from bisect import bisect_left
+from collections import Counter, OrderedDict
+from itertools import accumulate, compress, islice
+import mmap
+from operator import add, lt, not_
 import os
+import re
+import sys
+import threading
+import ifcopenshell
+import ifcopenshell.ifcopenshell_wrapper
+import ifcopenshell.util.element
+from .propertytable import PropertyTable
+
+# Default memory budget of the property set cache of each file
+PSET_CACHE_MEGABYTES = 64
+
+# Size of the parts of a STEP file that are searched at once by IfcFileScan
+SCAN_CHUNK_BYTES = 64 * 1048576
+
+# Whitespace between the records, and the same with comments
+STEP_SEPARATOR = rb"\s*"
+STEP_SEPARATOR_COMMENTS = rb"(?:\s|/\*(?:[^*]|\*(?!/))*\*/)*"
+
+# Start of an entity instance in the DATA section, e.g. ";\n#12=IFCWALL("
+STEP_INSTANCE = re.compile(rb";\s*#\d+\s*=\s*([A-Za-z0-9_]+)\s*\(")
+
+# Same with comments before the ID, only used by IfcFileScan for files with comments
+STEP_INSTANCE_COMMENTS = re.compile(
+    rb";" + STEP_SEPARATOR_COMMENTS + rb"#\d+\s*=\s*([A-Za-z0-9_]+)\s*\("
+)
+
+# Escape sequences of strings in STEP files
+STEP_STRING_ESCAPE = re.compile(
+    r"''|\\\\|\\X2\\([0-9A-Fa-f]*)\\X0\\|\\X4\\([0-9A-Fa-f]*)\\X0\\"
+    r"|\\X\\([0-9A-Fa-f]{2})|\\S\\(.)|\\P[A-I]\\"
+)
+
+# Integer or real number in the parameters of a STEP record
+STEP_NUMBER = re.compile(r"[-+0-9.Ee]+")
+
+# Size of the parts of a STEP file that are split into records at once,
+# see _read_semantic_step()
+SPLIT_CHUNK_BYTES = 4 * 1048576
+
+# Start of an entity instance with its ID and class, with a group of the
+# whole start to split the DATA section into records, see _read_semantic_step()
+STEP_RECORD_START = re.compile(rb"(;\s*#(\d+)\s*=\s*([A-Za-z0-9_]+)\s*\()")
+
+# Same with comments before the ID, slower and only used for files with comments
+STEP_RECORD_START_COMMENTS = re.compile(
+    rb"(;" + STEP_SEPARATOR_COMMENTS + rb"#(\d+)\s*=\s*([A-Za-z0-9_]+)\s*\()"
+)
+
+# Reference to an entity instance
+STEP_REFERENCE = re.compile(rb"#(\d+)")
+
+# Classes (with subtypes) of geometry and presentation, only loaded by the
+# semantic mode of IfcFile if referenced by another loaded instance
+GEOMETRY_CLASSES = (
+    "IfcRepresentationItem",
+    "IfcRepresentation",
+    "IfcProductRepresentation",
+    "IfcRepresentationMap",
+    "IfcShapeAspect",
+    "IfcConnectionGeometry",
+    "IfcPresentationLayerAssignment",
+    "IfcPresentationStyle",
+    "IfcPresentationItem",
+    "IfcTextureCoordinate",
+)
+
+# Classes (with subtypes) of geometry that is never loaded by the semantic
+# mode of IfcFile, references to them are unset, e.g. Representation of products
+CUT_CLASSES = (
+    "IfcProductRepresentation",
+    "IfcRepresentationMap",
+    "IfcRepresentation",
+    "IfcConnectionGeometry",
+)
+
+
+def _sizeof(obj):
+    """Rough estimate of the memory used by nested dicts and lists in bytes"""
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        for key, value in obj.items():
+            size += sys.getsizeof(key) + _sizeof(value)
+    elif isinstance(obj, (list, tuple)):
+        for value in obj:
+            size += _sizeof(value)
+    return size
+
+
+class StepReference(int):
+    """Reference to an entity instance (#id) in the parameters of a STEP record"""
+
+    def __repr__(self):
+        return f"#{int(self)}"
+
+
+def _decode_step(raw):
+    """Decode bytes of a STEP file, which should be ASCII but is often UTF-8"""
+    try:
+        return raw.decode("utf-8")
+    except UnicodeDecodeError:
+        return raw.decode("latin-1")
+
+
+def _decode_step_string(text):
+    """Replace the escape sequences of a string of a STEP file"""
+
+    def replace(match):
+        token = match.group(0)
+        if token == "''":
+            return "'"
+        if token == "\\\\":
+            return "\\"
+        if match.group(1) is not None:
+            return bytes.fromhex(match.group(1)).decode("utf-16-be", "replace")
+        if match.group(2) is not None:
+            return bytes.fromhex(match.group(2)).decode("utf-32-be", "replace")
+        if match.group(3) is not None:
+            return chr(int(match.group(3), 16))
+        if match.group(4) is not None:
+            return chr(ord(match.group(4)) + 128)
+        # Code page directive
+        return ""
+
+    return STEP_STRING_ESCAPE.sub(replace, text)
+
+
+def _parse_step_list(text, pos=0):
+    """Parse a list of STEP parameters, e.g. "('a',#1,$,.T.,(1.,2.))"
+
+    References are returned as StepReference, $ and * as None, enumerations
+    as strings without the dots (booleans as bool), typed values such as
+    IFCLABEL('a') as their value.
+
+    :param text: The text, text[pos] must be the opening bracket
+    :type text: str
+    :param pos: Position of the opening bracket
+    :type pos: int
+    :return: The values and the position after the closing bracket
+    :rtype: tuple (list, int)
+    """
+    values = []
+    pos += 1
+    while True:
+        while text[pos].isspace():
+            pos += 1
+        char = text[pos]
+        if char == ")":
+            return values, pos + 1
+        if char == ",":
+            pos += 1
+            continue
+        if char == "(":
+            value, pos = _parse_step_list(text, pos)
+        elif char == "'":
+            end = pos + 1
+            while True:
+                end = text.index("'", end)
+                if text.startswith("'", end + 1):
+                    end += 2
+                    continue
+                break
+            value = _decode_step_string(text[pos + 1 : end])
+            pos = end + 1
+        elif char == "#":
+            match = STEP_NUMBER.match(text, pos + 1)
+            value = StepReference(match.group(0))
+            pos = match.end()
+        elif char in "$*":
+            value = None
+            pos += 1
+        elif char == ".":
+            end = text.index(".", pos + 1)
+            value = text[pos + 1 : end]
+            value = {"T": True, "F": False, "U": None}.get(value, value)
+            pos = end + 1
+        elif char.isalpha():
+            # Typed value, e.g. IFCLABEL('a')
+            pos = text.index("(", pos)
+            value, pos = _parse_step_list(text, pos)
+            value = value[0] if len(value) == 1 else value
+        else:
+            match = STEP_NUMBER.match(text, pos)
+            number = match.group(0)
+            try:
+                value = int(number)
+            except ValueError:
+                value = float(number)
+            pos = match.end()
+        values.append(value)
+
+
+def _with_subtypes(schema_name, ifc_classes):
+    """Set of the upper case names of IFC classes and all their subtypes
+
+    The subtypes are taken from the schema of ifcopenshell, classes that
+    are not in the schema are ignored.
+    """
+    try:
+        schema = ifcopenshell.ifcopenshell_wrapper.schema_by_name(schema_name)
+    except (RuntimeError, TypeError):
+        return {ifc_class.upper() for ifc_class in ifc_classes}
+    names = set()
+    declarations = []
+    for ifc_class in ifc_classes:
+        try:
+            declarations.append(schema.declaration_by_name(ifc_class))
+        except RuntimeError:
+            pass
+    while declarations:
+        declaration = declarations.pop()
+        names.add(declaration.name().upper())
+        declarations.extend(declaration.subtypes())
+    return names
+
+
+def _read_semantic_step(data):
+    """The STEP file without geometry, see IfcFile
+
+    All instances are kept, except instances of GEOMETRY_CLASSES that are
+    not referenced by other kept instances and instances of CUT_CLASSES.
+    References to instances that are not kept are read as unset by
+    ifcopenshell (or left out of lists), so that the representations of the
+    products are dropped, but e.g. their placements are kept. The IDs of
+    the instances are not changed.
+
+    The DATA section is split into records in parts of SPLIT_CHUNK_BYTES
+    with one regular expression, only the ID, the kind and the position of
+    the records and the references of the kept records are stored. The
+    referenced geometry is then added and the kept records are copied.
+
+    :param data: The content of the STEP file, e.g. memory mapped
+    :type data: bytes or mmap.mmap
+    :return: The reduced STEP file
+    :rtype: bytearray
+    :raises ValueError: Not a valid STEP file
+    """
+    data_start = data.find(b"DATA;")
+    data_end = data.rfind(b";", data_start, data.rfind(b"ENDSEC;"))
+    if data_start == -1 or data_end <= data_start:
+        raise ValueError("Not a valid IFC file.")
+    header = data[:data_start]
+    match = re.search(rb"FILE_SCHEMA\s*\(\s*\(\s*'([^']*)'", header)
+    schema_name = match.group(1).decode("ascii") if match else None
+    geometry_classes = _with_subtypes(schema_name, GEOMETRY_CLASSES)
+    cut_classes = _with_subtypes(schema_name, CUT_CLASSES)
+
+    # Kinds of the instances: 0 kept, 1 geometry, 2 geometry that is never kept
+    kinds_by_class = {}
+    ids = array("q")
+    kinds = array("b")
+    # Positions of the records, starting at the semicolon of the previous record
+    starts = array("q")
+    # IDs referenced by the kept records
+    references = set()
+
+    if data.find(b"/*", data_start, data_end) == -1:
+        record_start = STEP_RECORD_START
+    else:
+        record_start = STEP_RECORD_START_COMMENTS
+
+    # The part starts at a record, at the semicolon of DATA;
+    start = data_start + 4
+    while start < data_end:
+        match = record_start.search(data, start + SPLIT_CHUNK_BYTES, data_end)
+        end = match.start() if match else data_end
+        # Text before the first record, then four items per record:
+        # start, ID, class and parameters up to the next record
+        parts = record_start.split(data[start:end])
+        classes = parts[3::4]
+        for ifc_class in set(classes).difference(kinds_by_class):
+            name = ifc_class.decode("ascii").upper()
+            if name in cut_classes:
+                kinds_by_class[ifc_class] = 2
+            elif name in geometry_classes:
+                kinds_by_class[ifc_class] = 1
+            else:
+                kinds_by_class[ifc_class] = 0
+        part_kinds = list(map(kinds_by_class.__getitem__, classes))
+        parameters = parts[4::4]
+        ids.extend(map(int, parts[2::4]))
+        kinds.extend(part_kinds)
+        sizes = map(add, map(len, parts[1::4]), map(len, parameters))
+        starts.extend(accumulate(sizes, initial=start + len(parts[0])))
+        starts.pop()
+        kept_parameters = b" ".join(compress(parameters, map(not_, part_kinds)))
+        references.update(map(int, STEP_REFERENCE.findall(kept_parameters)))
+        start = end
+    starts.append(data_end)
+
+    # Number of the record by ID, IDs are usually in ascending order
+    if all(map(lt, ids, islice(ids, 1, None))):
+
+        def number_of(id):
+            number = bisect_left(ids, id)
+            if number < len(ids) and ids[number] == id:
+                return number
+            return -1
+
+    else:
+        numbers = dict(zip(ids, range(len(ids))))
+
+        def number_of(id):
+            return numbers.get(id, -1)
+
+    # Add the geometry referenced by kept records, e.g. placements
+    kept = bytearray(map(not_, kinds))
+    references.difference_update(compress(ids, kept))
+    while references:
+        added = []
+        for id in references:
+            number = number_of(id)
+            if number != -1 and not kept[number] and kinds[number] == 1:
+                kept[number] = 1
+                added.append(number)
+        added_parameters = b" ".join(
+            data[starts[number] : starts[number + 1]] for number in added
+        )
+        references = set(map(int, STEP_REFERENCE.findall(added_parameters)))
+
+    content = bytearray(header)
+    content += b"DATA"
+    for number in compress(range(len(ids)), kept):
+        content += data[starts[number] : starts[number + 1]]
+    content += b";\nENDSEC;\nEND-ISO-10303-21;\n"
+    return content
+
+
+class IfcFileScan:
+    """Quick summary of an IFC file, read without parsing it with ifcopenshell
+
+    The STEP file is memory mapped and searched for the starts of the
+    entity instances, in parts of SCAN_CHUNK_BYTES, to count the instances
+    by class. Only a few records (e.g. IfcProject and its IfcOwnerHistory)
+    are read completely, by following their references. Much faster and
+    with much less memory than ifcopenshell.open(), e.g. for the info in
+    the status bar or for batch jobs. The counts may be wrong for files
+    with strings containing the start of an entity instance.
+
+    Example::
+
+        scan = IfcFileScan("file.ifc")
+        scan.schema
+        scan.count("IfcElement")
+        scan.project["Name"]
+
+    :param filename: The path to the IFC file
+    :type filename: str
+    :raises FileNotFoundError: File does not exist
+    :raises ValueError: File is not a valid IFC (STEP) file
+    """
+
+    def __init__(self, filename):
+        self._abspath = os.path.abspath(filename)
+        if not os.path.exists(self._abspath):
+            raise FileNotFoundError(f"File {self._abspath} not found.")
+        self._header = {}
+        self._class_counts = {}
+        self._project = {}
+        self._owner = {}
+        self._sites = []
+        self._separator = STEP_SEPARATOR
+        with open(self._abspath, "rb") as f:
+            try:
+                data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            except ValueError:
+                # Empty file
+                raise ValueError(f"File {self._abspath} is not a valid IFC file.")
+            with data:
+                self._scan(data)
+
+    def _scan(self, data):
+        """Read the header, count the instances and read the project data"""
+        if not data[:64].lstrip().startswith(b"ISO-10303-21"):
+            raise ValueError(f"File {self._abspath} is not a valid IFC file.")
+        data_start = data.find(b"DATA;")
+        if data_start == -1:
+            raise ValueError(f"File {self._abspath} is not a valid IFC file.")
+        self._read_header(data[:data_start])
+
+        if data.find(b"/*", data_start) == -1:
+            self._separator = STEP_SEPARATOR
+            instance = STEP_INSTANCE
+        else:
+            self._separator = STEP_SEPARATOR_COMMENTS
+            instance = STEP_INSTANCE_COMMENTS
+        counts = Counter()
+        # The part starts at the semicolon of the previous record
+        start = data_start + 4
+        while start < len(data):
+            end = data.find(b";", start + SCAN_CHUNK_BYTES)
+            if end == -1:
+                end = len(data)
+            counts.update(instance.findall(data, start, end))
+            start = end
+        self._class_counts = {
+            name.decode("ascii").upper(): count for name, count in counts.items()
+        }
+
+        for values in self._find_records(data, "IFCPROJECT"):
+            self._project = {
+                "GlobalId": values[0],
+                "Name": values[2],
+                "Description": values[3],
+                "LongName": values[5],
+                "Phase": values[6],
+            }
+            self._read_owner(data, values[1])
+            break
+
+        for values in self._find_records(data, "IFCSITE"):
+            self._sites.append({"GlobalId": values[0], "Name": values[2]})
+
+    def _read_header(self, header):
+        """Read FILE_DESCRIPTION, FILE_NAME and FILE_SCHEMA of the header section"""
+        text = _decode_step(header)
+        for name in ("FILE_DESCRIPTION", "FILE_NAME", "FILE_SCHEMA"):
+            match = re.search(rf"\b{name}\s*\(", text)
+            if match is None:
+                continue
+            values, _ = _parse_step_list(text, match.end() - 1)
+            if name == "FILE_DESCRIPTION":
+                self._header["description"] = values[0]
+                self._header["implementation_level"] = values[1]
+            elif name == "FILE_NAME":
+                keys = (
+                    "name",
+                    "time_stamp",
+                    "author",
+                    "organization",
+                    "preprocessor_version",
+                    "originating_system",
+                    "authorization",
+                )
+                self._header.update(zip(keys, values))
+            else:
+                self._header["schema"] = values[0][0] if values[0] else None
+
+    def _read_owner(self, data, owner_history_id):
+        """Read the owning user and application of the IfcOwnerHistory"""
+        owner_history = self._get_record(data, owner_history_id)
+        if owner_history is None:
+            return
+        person_and_organization = self._get_record(data, owner_history[0])
+        if person_and_organization is not None:
+            person = self._get_record(data, person_and_organization[0])
+            if person is not None:
+                self._owner["FamilyName"] = person[1]
+                self._owner["GivenName"] = person[2]
+            organization = self._get_record(data, person_and_organization[1])
+            if organization is not None:
+                self._owner["Organization"] = organization[1]
+        application = self._get_record(data, owner_history[1])
+        if application is not None:
+            self._owner["ApplicationVersion"] = application[1]
+            self._owner["ApplicationFullName"] = application[2]
+
+    def _find_records(self, data, ifc_class):
+        """Generator of the parameters of the instances of a class (upper case)
+
+        Stops searching when all instances (see class_counts) were found.
+        """
+        remaining = self._class_counts.get(ifc_class, 0)
+        if remaining == 0:
+            return
+        name = ifc_class.encode("ascii")
+        pattern = re.compile(
+            rb";" + self._separator + rb"#\d+\s*=\s*" + name + rb"\s*\(", re.IGNORECASE
+        )
+        for match in pattern.finditer(data):
+            yield self._parse_record(data, match.end() - 1)
+            remaining -= 1
+            if remaining == 0:
+                return
+
+    def _get_record(self, data, id):
+        """The parameters of the instance with a reference, or None"""
+        if not isinstance(id, StepReference):
+            return None
+        number = str(int(id)).encode("ascii")
+        pattern = re.compile(
+            rb";" + self._separator + rb"#" + number + rb"\s*=\s*[A-Za-z0-9_]+\s*\("
+        )
+        match = pattern.search(data)
+        if match is None:
+            return None
+        return self._parse_record(data, match.end() - 1)
+
+    def _parse_record(self, data, pos):
+        """Parse the parameters of a record starting at the opening bracket"""
+        size = 4096
+        while True:
+            text = _decode_step(data[pos : pos + size])
+            try:
+                values, _ = _parse_step_list(text)
+                return values
+            except (IndexError, ValueError, AttributeError):
+                if pos + size >= len(data):
+                    raise ValueError(f"File {self._abspath} is not a valid IFC file.")
+                size *= 16
+
+    @property
+    def abspath(self):
+        """The absolute path of the file"""
+        return self._abspath
+
+    @property
+    def header(self):
+        """Dictionary with the entries of the header section, e.g. schema and author"""
+        return self._header
+
+    @property
+    def schema(self):
+        """The IFC schema of the file (e.g. IFC4), or None"""
+        return self._header.get("schema")
+
+    @property
+    def class_counts(self):
+        """Dictionary with the number of instances by class name (upper case)"""
+        return self._class_counts
+
+    @property
+    def entity_count(self):
+        """The number of entity instances in the file"""
+        return sum(self._class_counts.values())
+
+    @property
+    def project(self):
+        """Dictionary with GlobalId, Name, Description, LongName and Phase of the project"""
+        return self._project
+
+    @property
+    def owner(self):
+        """Dictionary with the owning user and application of the project"""
+        return self._owner
+
+    @property
+    def sites(self):
+        """List of dictionaries with GlobalId and Name of the IfcSite objects"""
+        return self._sites
+
+    def count(self, ifc_class, include_subtypes=True):
+        """The number of instances of a class, by default including subtypes
+
+        The subtypes are taken from the schema of ifcopenshell.
+
+        :param ifc_class: The IFC class, e.g. IfcElement
+        :type ifc_class: str
+        :param include_subtypes: Also count the instances of subtypes
+        :type include_subtypes: bool
+        :rtype: int
+        """
+        names = {ifc_class.upper()}
+        if include_subtypes:
+            names.update(_with_subtypes(self.schema, [ifc_class]))
+        return sum(self._class_counts.get(name, 0) for name in names)
+
+    def __repr__(self):
+        return f"IfcFileScan({os.path.basename(self._abspath)})"
 
 
 class IfcFile:
@@ -26,39 +589,204 @@ class IfcFile:
     Includes attributes such as file name and path and some methods as shortcuts
     to the ifcopenshell model.
 
+    The property sets and quantity sets of the elements are cached by
+    get_psets(), since they are needed by several views and on every repaint
+    of the pset columns. The least recently used entries are dropped when the
+    (estimated) size of the cache exceeds pset_cache_megabytes.
+    For reading single values or whole columns, property_table holds all
+    properties of the file in a PropertyTable that is built on first use.
+    Linked types of the elements are looked up with get_type(), the spatial
+    containment with get_container() and get_contained_elements(), using
+    maps that are also built on first use.
+    A quick summary of the file (IfcFileScan) is available as scan without
+    parsing the file.
+
+    With semantic_only, instances of geometry and presentation (see
+    GEOMETRY_CLASSES) are skipped while reading the file, unless they are
+    referenced by other instances (e.g. placements), and the attributes
+    referencing representations are empty. This is all that is needed for
+    the trees and saves much of the memory of the parsed file. The complete
+    file is parsed on first access to full_model, e.g. for IDS validation.
+    The IDs of the instances are the same in model and full_model.
+
+    If an IfcCache is passed, the pset and qset info, the schema, the GUID
+    of the project and the number of elements are taken from the cache if
+    the file did not change. The file is then only parsed with ifcopenshell
+    on first access to model (or project), e.g. when the trees are built.
+    Otherwise, the file is parsed at once and the data is saved to the cache.
+
     :param filename: The path to the IFC file to be opened.
     :type filename: str
+    :param pset_cache_megabytes: Memory budget of the property set cache
+    :type pset_cache_megabytes: int or float, optional
+    :param cache: Sidecar cache of the derived data
+    :type cache: IfcCache, optional
+    :param semantic_only: Skip geometry when parsing the file for model
+    :type semantic_only: bool, optional
     :raises FileNotFoundError: File does not exist
     :raises ValueError: File is not a valid IFC file
     """
 
-    def __init__(self, filename):
+    def __init__(
+        self,
+        filename,
+        pset_cache_megabytes=PSET_CACHE_MEGABYTES,
+        cache=None,
+        semantic_only=False,
+    ):
         self._abspath = os.path.abspath(filename)
         self._filename = os.path.basename(self._abspath)
         if not os.path.exists(self._abspath):
             raise FileNotFoundError(f"File {self._abspath} not found.")
         self._megabytes = round(os.path.getsize(self._abspath) / 1048576, 1)
 
-        # Open the file with ifcopenshell
+        self._semantic_only = semantic_only
+        self._model = None
+        self._project = None
+        self._model_lock = threading.Lock()
+        self._full_model = None
+        self._full_model_lock = threading.Lock()
+
+        self._scan = None
+        self._scan_lock = threading.Lock()
+
+        cached = None
+        if cache is not None:
+            cached = cache.load(self._abspath)
+        if cached is not None:
+            self._pset_info = dict(cached["pset_info"])
+            self._qset_info = dict(cached["qset_info"])
+            self._schema = cached["schema"]
+            self._project_guid = cached["project_guid"]
+            self._element_count = cached["element_count"]
+        else:
+            self._open_model()
+            self._pset_info = self._get_pset_info()
+            self._qset_info = self._get_qset_info()
+            self._schema = self._model.schema
+            self._project_guid = self._project.GlobalId
+            self._element_count = len(self._model.by_type("IfcElement"))
+            if cache is not None:
+                cache.save(self._abspath, self._cache_data())
+
+        self._pset_cache = OrderedDict()
+        self._pset_cache_bytes = 0
+        self._pset_cache_budget = pset_cache_megabytes * 1048576
+        self._pset_cache_lock = threading.Lock()
+
+        self._property_table = None
+        self._property_table_lock = threading.Lock()
+
+        self._type_map = None
+        self._type_map_lock = threading.Lock()
+
+        self._container_map = None
+        self._contained_elements = None
+        self._containment_lock = threading.Lock()
+
+    def _open_model(self):
+        """Open the file with ifcopenshell, if not opened yet"""
+        with self._model_lock:
+            if self._model is not None:
+                return
+            if self._semantic_only:
+                model = self._read_semantic_model()
+            else:
+                model = self._read_model()
+            self._project = model.by_type("IfcProject")[0]
+            self._model = model
+
+    def _read_model(self):
+        """Parse the complete file with ifcopenshell"""
         try:
-            self._model = ifcopenshell.open(self._abspath)
+            return ifcopenshell.open(self._abspath)
         except RuntimeError:
             raise ValueError(f"File {self._abspath} is not a valid IFC file.")
 
-        self._project = self._model.by_type("IfcProject")[0]
-        self._pset_info = self._get_pset_info()
-        self._qset_info = self._get_qset_info()
+    def _read_semantic_model(self):
+        """Parse the file without geometry, see _read_semantic_step()"""
+        with open(self._abspath, "rb") as f:
+            try:
+                data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            except ValueError:
+                # Empty file
+                raise ValueError(f"File {self._abspath} is not a valid IFC file.")
+            with data:
+                try:
+                    content = _read_semantic_step(data)
+                except ValueError:
+                    raise ValueError(f"File {self._abspath} is not a valid IFC file.")
+        try:
+            return ifcopenshell.file.from_string(_decode_step(content))
+        except RuntimeError:
+            raise ValueError(f"File {self._abspath} is not a valid IFC file.")
+
+    def _cache_data(self):
+        """The data saved in the IfcCache, see __init__"""
+        return {
+            # Lists of pairs, since names may be None
+            "pset_info": list(self._pset_info.items()),
+            "qset_info": list(self._qset_info.items()),
+            "schema": self._schema,
+            "project_guid": self._project_guid,
+            "element_count": self._element_count,
+        }
 
     @property
     def model(self):
-        """The ifcopenshell file object"""
+        """The ifcopenshell file object, the file is parsed on first access"""
+        if self._model is None:
+            self._open_model()
         return self._model
 
+    @property
+    def full_model(self):
+        """The ifcopenshell file object with all instances, parsed on first access
+
+        Same as model, unless the file was opened with semantic_only.
+        """
+        if not self._semantic_only:
+            return self.model
+        with self._full_model_lock:
+            if self._full_model is None:
+                self._full_model = self._read_model()
+        return self._full_model
+
+    @property
+    def semantic_only(self):
+        """True if geometry is skipped when parsing the file for model"""
+        return self._semantic_only
+
+    @property
+    def is_loaded(self):
+        """True if the file was parsed with ifcopenshell"""
+        return self._model is not None
+
     @property
     def project(self):
         """The IfcProject object"""
+        if self._model is None:
+            self._open_model()
         return self._project
 
+    @property
+    def scan(self):
+        """IfcFileScan of the file, read on first access without parsing the file"""
+        with self._scan_lock:
+            if self._scan is None:
+                self._scan = IfcFileScan(self._abspath)
+        return self._scan
+
+    @property
+    def project_guid(self):
+        """The GUID of the IfcProject object, available without parsing the file"""
+        return self._project_guid
+
+    @property
+    def schema(self):
+        """The IFC schema of the file (e.g. IFC4), available without parsing the file"""
+        return self._schema
+
     @property
     def filename(self):
         """The name of the file"""
@@ -84,9 +812,105 @@ class IfcFile:
         """The size of the file in megabytes"""
         return self._megabytes
 
+    @property
+    def property_table(self):
+        """PropertyTable with the values of all psets and qsets, built on first use"""
+        with self._property_table_lock:
+            if self._property_table is None:
+                self._property_table = PropertyTable(self.model)
+        return self._property_table
+
+    @property
+    def type_map(self):
+        """Dictionary with the IDs of the elements as keys and their linked types
+
+        Built on first use in one pass over IfcRelDefinesByType. In IFC2X3,
+        these are also the relationships of the inverse attribute ObjectTypeOf
+        of the types. As in ifcopenshell.util.element.get_type(), the first
+        relationship of an element is used.
+        """
+        with self._type_map_lock:
+            if self._type_map is None:
+                type_map = {}
+                for rel in self.model.by_type("IfcRelDefinesByType"):
+                    for related_object in rel.RelatedObjects:
+                        type_map.setdefault(related_object.id(), rel.RelatingType)
+                self._type_map = type_map
+        return self._type_map
+
+    def get_type(self, element):
+        """Returns the linked type object of an element of this file, or None
+
+        Same as ifcopenshell.util.element.get_type() (a type object returns
+        itself), but uses type_map instead of inverse attributes.
+
+        :param element: An IFC entity of this file
+        :type element: ifcopenshell entity
+        :return: The type object
+        :rtype: ifcopenshell entity or None
+        """
+        if element.is_a("IfcTypeObject"):
+            return element
+        return self.type_map.get(element.id())
+
+    def _build_containment(self):
+        """Build the containment maps on first use, see container_map"""
+        with self._containment_lock:
+            if self._container_map is None:
+                container_map = {}
+                contained_elements = {}
+                for rel in self.model.by_type("IfcRelContainedInSpatialStructure"):
+                    structure = rel.RelatingStructure
+                    elements = contained_elements.setdefault(structure.id(), [])
+                    for element in rel.RelatedElements:
+                        container_map.setdefault(element.id(), structure)
+                        elements.append(element)
+                self._contained_elements = contained_elements
+                self._container_map = container_map
+
+    @property
+    def container_map(self):
+        """Dictionary with the IDs of the elements as keys and their spatial containers
+
+        Built on first use in one pass over IfcRelContainedInSpatialStructure,
+        together with contained_elements. As with the inverse attribute
+        ContainedInStructure, the first relationship of an element is used.
+        """
+        self._build_containment()
+        return self._container_map
+
+    @property
+    def contained_elements(self):
+        """Dictionary with the IDs of spatial elements as keys and lists of contained elements"""
+        self._build_containment()
+        return self._contained_elements
+
+    def get_container(self, element):
+        """Returns the spatial structure element containing an element, or None
+
+        :param element: An IFC entity of this file
+        :type element: ifcopenshell entity
+        :return: The spatial structure element
+        :rtype: ifcopenshell entity or None
+        """
+        return self.container_map.get(element.id())
+
+    def get_contained_elements(self, structure):
+        """Returns the elements contained in a spatial structure element
+
+        Same as the RelatedElements of the inverse attribute ContainsElements,
+        the returned list must not be modified.
+
+        :param structure: An IFC entity of this file
+        :type structure: ifcopenshell entity
+        :return: List of elements
+        :rtype: list
+        """
+        return self.contained_elements.get(structure.id(), [])
+
     def count_ifc_elements(self):
         """Returns the number of IfcElement objects in the file"""
-        return len(self._model.by_type("IfcElement"))
+        return self._element_count
 
     def get_element(self, id):
         """Returns an IFC object by its ID"""
@@ -96,6 +920,66 @@ class IfcFile:
             return None
         return element
 
+    def get_psets(self, element, psets_only=False, qtos_only=False):
+        """Returns the property sets of an element of this file, using the cache
+
+        Same as ifcopenshell.util.element.get_psets(), but the result is cached
+        by entity ID. The returned dictionary is shared and must not be modified.
+
+        :param element: An IFC entity of this file
+        :type element: ifcopenshell entity
+        :param psets_only: Only return property sets
+        :type psets_only: bool
+        :param qtos_only: Only return quantity sets
+        :type qtos_only: bool
+        :return: Dictionary with the property sets and their properties
+        :rtype: dict
+        """
+        key = (element.id(), psets_only, qtos_only)
+        with self._pset_cache_lock:
+            entry = self._pset_cache.get(key)
+            if entry is not None:
+                self._pset_cache.move_to_end(key)
+                return entry[0]
+
+        psets = ifcopenshell.util.element.get_psets(
+            element, psets_only=psets_only, qtos_only=qtos_only
+        )
+        size = _sizeof(psets)
+
+        with self._pset_cache_lock:
+            if key not in self._pset_cache:
+                self._pset_cache[key] = (psets, size)
+                self._pset_cache_bytes += size
+                self._shrink_pset_cache()
+        return psets
+
+    def _shrink_pset_cache(self):
+        """Drop the least recently used entries until the cache fits into the budget
+
+        The lock must be held by the caller.
+        """
+        while self._pset_cache_bytes > self._pset_cache_budget and self._pset_cache:
+            _, (_, size) = self._pset_cache.popitem(last=False)
+            self._pset_cache_bytes -= size
+
+    def clear_pset_cache(self):
+        """Remove all entries from the property set cache"""
+        with self._pset_cache_lock:
+            self._pset_cache.clear()
+            self._pset_cache_bytes = 0
+
+    @property
+    def pset_cache_megabytes(self):
+        """The memory budget of the property set cache in megabytes"""
+        return self._pset_cache_budget / 1048576
+
+    @pset_cache_megabytes.setter
+    def pset_cache_megabytes(self, megabytes):
+        self._pset_cache_budget = megabytes * 1048576
+        with self._pset_cache_lock:
+            self._shrink_pset_cache()
+
     def _get_pset_info(self):
         pset_info = {}
         psets = self._model.by_type("IfcPropertySet")
@@ -149,6 +1033,7 @@ class IfcFiles:
 
     Used to represent all opened IFC files as IfcFile objects.
     Files are added with add_file().
+    pset_cache_megabytes and semantic_only are passed on to the IfcFile objects.
     It is possible to iterate over the IfcFile objects or to get
     a specific file by its index or filename.
 
@@ -168,8 +1053,13 @@ class IfcFiles:
 
     """
 
-    def __init__(self):
+    def __init__(
+        self, pset_cache_megabytes=PSET_CACHE_MEGABYTES, cache=None, semantic_only=False
+    ):
         self._ifcfiles = []
+        self.pset_cache_megabytes = pset_cache_megabytes
+        self.cache = cache
+        self.semantic_only = semantic_only
 
     def add_file(self, filename):
         """Adds an IFC file to the collection
@@ -186,19 +1076,45 @@ class IfcFiles:
 
         """
         # Before opening, check if the file is already open
-        abspath = os.path.abspath(filename)
-        for ifcfile in self._ifcfiles:
-            if ifcfile.abspath == abspath:
-                return None
-        ifcfile = IfcFile(filename)
+        if self.is_open(filename):
+            return None
+        ifcfile = IfcFile(
+            filename, self.pset_cache_megabytes, self.cache, self.semantic_only
+        )
+        return self.add_ifcfile(ifcfile)
+
+    def add_ifcfile(self, ifcfile):
+        """Adds an IfcFile object that was opened before to the collection
+
+        Used to open several files at the same time (see WorkerAddFiles) and
+        to add them in the given order. Returns None if a file with the same
+        path is already in the collection.
+
+        :param ifcfile: The opened IFC file
+        :type ifcfile: IfcFile
+        :raises ValueError: All files must belong to the same project
+        """
+        if self.is_open(ifcfile.abspath):
+            return None
         if len(self._ifcfiles) > 0:
-            project_guid = self[0].model.by_type("IfcProject")[0].GlobalId
-            new_project_guid = ifcfile.model.by_type("IfcProject")[0].GlobalId
-            if project_guid != new_project_guid:
+            if self[0].project_guid != ifcfile.project_guid:
                 raise ValueError("All files must belong to the same project.")
         self._ifcfiles.append(ifcfile)
         return ifcfile
 
+    def is_open(self, filename):
+        """Check if a file is already in the collection
+
+        :param filename: Path of the IFC file
+        :type filename: str
+        :rtype: bool
+        """
+        abspath = os.path.abspath(filename)
+        for ifcfile in self._ifcfiles:
+            if ifcfile.abspath == abspath:
+                return True
+        return False
+
     def __getitem__(self, index):
         if isinstance(index, int):
             return self._ifcfiles[index]
@@ -242,6 +1158,29 @@ class IfcFiles:
                     return element
             return None
 
+    def guid_index(self, ifc_class="IfcRoot"):
+        """Returns the filenames of the files containing each GUID
+
+        Built in one pass over the entities of the IFC class (including
+        subclasses) in each file, without the tree models of the GUI.
+        The filenames of a GUID are in the order of the files.
+
+        :param ifc_class: The IFC class of the entities, defaults to IfcRoot
+        :type ifc_class: str, optional
+        :return: Dict with the GUIDs as keys and lists of filenames as values
+        :rtype: dict
+        """
+        index = {}
+        for ifcfile in self._ifcfiles:
+            filename = ifcfile.filename
+            for entity in ifcfile.model.by_type(ifc_class):
+                # GlobalId is the first attribute of IfcRoot
+                filenames = index.setdefault(entity[0], [])
+                # Skip GUIDs that are not unique within the file
+                if not filenames or filenames[-1] != filename:
+                    filenames.append(filename)
+        return index
+
     def get_element(self, filename, id):
         """Returns an IFC object of a given file by its ID
 
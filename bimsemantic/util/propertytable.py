@@ -0,0 +1,201 @@
+"""
+/***************************************************************************
+                              BIM Semantic Viewer
+                              -------------------
+        begin                : 2024-10-03
+        copyright            : (C) 2025 by Florian Neukirchen
+        email                : mail@riannek.de
+ ***************************************************************************/
+
+/***************************************************************************
+ *                                                                         *
+ *   This program is free software; you can redistribute it and/or modify  *
+ *   it under the terms of the GNU General Public License as published by  *
+ *   the Free Software Foundation; either version 2 of the License, or     *
+ *   (at your option) any later version.                                   *
+ *                                                                         *
+ ***************************************************************************/
+"""
+import ifcopenshell.util.element
+
+
+class PropertyTable:
+    """Values of all property sets and quantity sets of an IFC model, by column
+
+    The table is built in one pass over IfcRelDefinesByProperties and the
+    property sets of the type objects. Each column is identified by a tuple
+    (pset_name, prop_name) and holds a dictionary with the entity IDs as keys.
+    Property sets that are used by many entities are only read once.
+
+    Values of type objects are not copied to the occurrences: get() and
+    items() return the value of the linked type if the occurrence does not
+    have its own value, as ifcopenshell.util.element.get_psets() does.
+
+    Property sets (IfcPropertySet, IfcPreDefinedPropertySet) and quantity
+    sets (IfcElementQuantity) are kept apart to support the psets_only and
+    qtos_only arguments of get_psets().
+
+    :param model: The ifcopenshell file object
+    :type model: ifcopenshell.file
+    """
+
+    def __init__(self, model):
+        self._psets = {}
+        self._qtos = {}
+        self._others = {}
+        self._types = {}
+        self._occurrences = {}
+        self._build(model)
+
+    def _build(self, model):
+        """Read all property definitions of the model"""
+        for rel in model.by_type("IfcRelDefinesByType"):
+            type_id = rel.RelatingType.id()
+            for related_object in rel.RelatedObjects:
+                occurrence_id = related_object.id()
+                if occurrence_id not in self._types:
+                    self._types[occurrence_id] = type_id
+                    self._occurrences.setdefault(type_id, []).append(occurrence_id)
+
+        for type_object in model.by_type("IfcTypeObject"):
+            for definition in type_object.HasPropertySets or []:
+                self._add_definition(definition, [type_object.id()])
+
+        for rel in model.by_type("IfcRelDefinesByProperties"):
+            # Property sets of type objects are only read from HasPropertySets
+            entity_ids = [
+                related_object.id()
+                for related_object in rel.RelatedObjects
+                if not related_object.is_a("IfcTypeObject")
+            ]
+            if not entity_ids:
+                continue
+            definition = rel.RelatingPropertyDefinition
+            if definition.is_a("IfcPropertySetDefinitionSet"):
+                definitions = definition.wrappedValue
+            else:
+                definitions = (definition,)
+            for definition in definitions:
+                self._add_definition(definition, entity_ids)
+
+    def _add_definition(self, definition, entity_ids):
+        """Add the values of a property set definition for a list of entity IDs"""
+        if definition.is_a("IfcPropertySet") or definition.is_a(
+            "IfcPreDefinedPropertySet"
+        ):
+            columns = self._psets
+        elif definition.is_a("IfcElementQuantity"):
+            columns = self._qtos
+        else:
+            columns = self._others
+
+        props = ifcopenshell.util.element.get_property_definition(definition)
+        for prop_name, value in props.items():
+            if prop_name == "id":
+                continue
+            column = columns.setdefault((definition.Name, prop_name), {})
+            for entity_id in entity_ids:
+                column[entity_id] = value
+
+    def _column_dicts(self, psets_only=False, qtos_only=False):
+        """The dictionaries of columns to use, see get_psets()"""
+        if psets_only:
+            return (self._psets,)
+        if qtos_only:
+            return (self._qtos,)
+        return (self._psets, self._qtos, self._others)
+
+    def get(
+        self,
+        entity_id,
+        pset_name,
+        prop_name,
+        default=None,
+        psets_only=False,
+        qtos_only=False,
+    ):
+        """Get the value of a property of an entity
+
+        The default is only returned if the entity (and its type) does not
+        have the property; a property without value returns None.
+
+        :param entity_id: The ID of the IFC entity
+        :type entity_id: int
+        :param pset_name: Name of the property set or quantity set
+        :type pset_name: str
+        :param prop_name: Name of the property or quantity
+        :type prop_name: str
+        :param default: Returned if the property is not defined for the entity
+        :param psets_only: Only use property sets
+        :type psets_only: bool
+        :param qtos_only: Only use quantity sets
+        :type qtos_only: bool
+        :return: The value of the property
+        """
+        key = (pset_name, prop_name)
+        column_dicts = self._column_dicts(psets_only, qtos_only)
+        type_id = self._types.get(entity_id)
+        for entity_id in (entity_id, type_id):
+            if entity_id is None:
+                continue
+            for columns in column_dicts:
+                column = columns.get(key)
+                if column is not None and entity_id in column:
+                    return column[entity_id]
+        return default
+
+    def items(self, pset_name, prop_name, psets_only=False, qtos_only=False):
+        """Iterate over the values of a column
+
+        Yields tuples (entity_id, value), including occurrences that
+        get the value from their type.
+
+        :param pset_name: Name of the property set or quantity set
+        :type pset_name: str
+        :param prop_name: Name of the property or quantity
+        :type prop_name: str
+        :param psets_only: Only use property sets
+        :type psets_only: bool
+        :param qtos_only: Only use quantity sets
+        :type qtos_only: bool
+        """
+        key = (pset_name, prop_name)
+        seen = set()
+        column_dicts = [
+            columns[key]
+            for columns in self._column_dicts(psets_only, qtos_only)
+            if key in columns
+        ]
+        for column in column_dicts:
+            for entity_id, value in column.items():
+                if entity_id in seen:
+                    continue
+                seen.add(entity_id)
+                yield entity_id, value
+        for column in column_dicts:
+            for type_id, value in column.items():
+                for occurrence_id in self._occurrences.get(type_id, []):
+                    if occurrence_id in seen:
+                        continue
+                    seen.add(occurrence_id)
+                    yield occurrence_id, value
+
+    def keys(self, psets_only=False, qtos_only=False):
+        """List of all columns as tuples (pset_name, prop_name)
+
+        :param psets_only: Only use property sets
+        :type psets_only: bool
+        :param qtos_only: Only use quantity sets
+        :type qtos_only: bool
+        """
+        keys = {}
+        for columns in self._column_dicts(psets_only, qtos_only):
+            for key in columns:
+                keys[key] = None
+        return list(keys)
+
+    def __len__(self):
+        return len(self.keys())
+
+    def __repr__(self):
+        return f"PropertyTable ({len(self)} columns)"
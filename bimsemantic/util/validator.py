@@ -22,7 +22,6 @@ import json
 import ifctester
 import ifctester.reporter
 import ifcopenshell
-import ifcopenshell.util.element
 
 
 class Validators:
@@ -127,7 +126,7 @@ class Validators:
 
             if validator.id == "integrity":
                 # This is the only one not to be run on the IFC files seperately
-                reporter = validator.validate()
+                reporter = validator.validate(self.ifc_files)
                 self.analyze_results(reporter)
                 self.reporters[validator.id] = reporter
             else:
@@ -314,7 +313,8 @@ class IdsValidator:
         :return: The reporter object of the validation
         :rtype: ifctester.reporter.Bcf
         """
-        self.rules.validate(ifc_file.model)
+        # Validate all instances, also if the file was opened without geometry
+        self.rules.validate(ifc_file.full_model)
         reporter = ifctester.reporter.Bcf(self.rules)
         reporter.report()
         return reporter
@@ -347,9 +347,8 @@ class IntegrityValidator:
     The interface mimics IdsValidator, but the rules are hardcoded.
     """
 
-    def __init__(self, ifc_files, ifc_tabs):
+    def __init__(self, ifc_files=None):
         self.ifc_files = ifc_files
-        self.treemodel = ifc_tabs.locationtab.treemodel
         self.title = "Integrity check"
         self.filename = ""
         self.id = "integrity"
@@ -391,11 +390,22 @@ class IntegrityValidator:
         self.requirements = self.results["specifications"][0]["requirements"]
         self.spec = self.results["specifications"][0]
 
-    def validate(self):
-        """Run the validation on all IFC files"""
+    def validate(self, ifc_files=None):
+        """Run the validation on all IFC files
+
+        The entities with the same GUID are looked up with
+        IfcFiles.guid_index(), i.e. the validation does not depend
+        on the tree views and can run without GUI.
+
+        :param ifc_files: The IFC files, defaults to the files of the validator
+        :type ifc_files: IfcFiles, optional
+        """
+        if ifc_files is not None:
+            self.ifc_files = ifc_files
         self.reset_results()
-        for item in self.treemodel._rootItem.children:
-            self.check_item(item)
+        for guid, filenames in self.ifc_files.guid_index().items():
+            if len(filenames) > 1:
+                self.check_guid(guid, filenames)
         # Init a BCF reporter without IDS, and set the results
         # Undocumented API, see
         # https://github.com/IfcOpenShell/IfcOpenShell/blob/v0.8.0/src/ifctester/ifctester/reporter.py#L35
@@ -403,101 +413,102 @@ class IntegrityValidator:
         reporter.results = self.results
         return reporter
 
-    def check_item(self, item):
-        """Check a tree item and all its childs"""
-        for child in item.children:
-            self.check_item(child)
+    def check_guid(self, guid, filenames):
+        """Check the entities with the same GUID in several files
 
-        if hasattr(item, "filenames") and len(item.filenames) > 1:
-            guid = item.guid
-            left_filename = item.filenames[0]
-            left = self.ifc_files.get_element_by_guid(guid, left_filename)
+        :param guid: The GUID
+        :type guid: str
+        :param filenames: The names of the files containing the GUID
+        :type filenames: list of str
+        """
+        left_filename = filenames[0]
+        left = self.ifc_files.get_element_by_guid(guid, left_filename)
 
-            left_info = left.get_info()
-            left_id = left_info.pop("id")
-            for k, v in left_info.items():
-                if isinstance(v, (ifcopenshell.entity_instance, tuple)):
-                    left_info[k] = str(v)
+        left_info = left.get_info()
+        left_id = left_info.pop("id")
+        for k, v in left_info.items():
+            if isinstance(v, (ifcopenshell.entity_instance, tuple)):
+                left_info[k] = str(v)
 
-            left_psets = ifcopenshell.util.element.get_psets(left)
+        left_psets = self.ifc_files[left_filename].get_psets(left)
 
-            passed_id = True
-            passed_info = True
-            passed_psets = True
+        passed_id = True
+        passed_info = True
+        passed_psets = True
 
-            for filename in item.filenames[1:]:
-                right = self.ifc_files.get_element_by_guid(guid, filename)
-                right_info = right.get_info()
-                right_id = right_info.pop("id")
+        for filename in filenames[1:]:
+            right = self.ifc_files.get_element_by_guid(guid, filename)
+            right_info = right.get_info()
+            right_id = right_info.pop("id")
 
-                for k, v in right_info.items():
-                    if isinstance(v, (ifcopenshell.entity_instance, tuple)):
-                        right_info[k] = str(v)
+            for k, v in right_info.items():
+                if isinstance(v, (ifcopenshell.entity_instance, tuple)):
+                    right_info[k] = str(v)
 
-                right_psets = ifcopenshell.util.element.get_psets(right)
+            right_psets = self.ifc_files[filename].get_psets(right)
 
-                if left_id != right_id:
-                    passed_id = False
+            if left_id != right_id:
+                passed_id = False
 
-                if left_info != right_info:
-                    passed_info = False
+            if left_info != right_info:
+                passed_info = False
 
-                if left_psets != right_psets:
-                    passed_psets = False
+            if left_psets != right_psets:
+                passed_psets = False
 
-            if not passed_id:
-                self.requirements[0]["status"] = False
-                self.requirements[0]["failed_entities"].append(
-                    {
-                        "element": left,
-                        "reason": f"ID mismatch: {left_id} != {right_id}",
-                    }
-                )
-                self.spec["total_checks_fail"] += 1
-                self.spec["status"] = False
-            else:
-                self.requirements[0]["passed_entities"].append(
-                    {
-                        "element": left,
-                    }
-                )
-                self.spec["total_checks_pass"] += 1
-
-            if not passed_info:
-                self.requirements[1]["status"] = False
-                self.requirements[1]["failed_entities"].append(
-                    {
-                        "element": left,
-                        "reason": f"Attribute mismatch: {left_info} != {right_info}",
-                    }
-                )
-                self.spec["total_checks_fail"] += 1
-                self.spec["status"] = False
-            else:
-                self.requirements[1]["passed_entities"].append(
-                    {
-                        "element": left,
-                    }
-                )
-                self.spec["total_checks_pass"] += 1
-
-            if not passed_psets:
-                self.requirements[2]["status"] = False
-                self.requirements[2]["failed_entities"].append(
-                    {
-                        "element": left,
-                        "reason": f"Pset mismatch: {left_psets} != {right_psets}",
-                    }
-                )
-                self.spec["total_checks_fail"] += 1
-                self.spec["status"] = False
-            else:
-                self.requirements[2]["passed_entities"].append(
-                    {
-                        "element": left,
-                    }
-                )
-                self.spec["total_checks_pass"] += 1
+        if not passed_id:
+            self.requirements[0]["status"] = False
+            self.requirements[0]["failed_entities"].append(
+                {
+                    "element": left,
+                    "reason": f"ID mismatch: {left_id} != {right_id}",
+                }
+            )
+            self.spec["total_checks_fail"] += 1
+            self.spec["status"] = False
+        else:
+            self.requirements[0]["passed_entities"].append(
+                {
+                    "element": left,
+                }
+            )
+            self.spec["total_checks_pass"] += 1
+
+        if not passed_info:
+            self.requirements[1]["status"] = False
+            self.requirements[1]["failed_entities"].append(
+                {
+                    "element": left,
+                    "reason": f"Attribute mismatch: {left_info} != {right_info}",
+                }
+            )
+            self.spec["total_checks_fail"] += 1
+            self.spec["status"] = False
+        else:
+            self.requirements[1]["passed_entities"].append(
+                {
+                    "element": left,
+                }
+            )
+            self.spec["total_checks_pass"] += 1
+
+        if not passed_psets:
+            self.requirements[2]["status"] = False
+            self.requirements[2]["failed_entities"].append(
+                {
+                    "element": left,
+                    "reason": f"Pset mismatch: {left_psets} != {right_psets}",
+                }
+            )
+            self.spec["total_checks_fail"] += 1
+            self.spec["status"] = False
+        else:
+            self.requirements[2]["passed_entities"].append(
+                {
+                    "element": left,
+                }
+            )
+            self.spec["total_checks_pass"] += 1
 
     # Helpers to mimic the interface of IdsValidator
     class Spec:
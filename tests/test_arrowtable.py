@@ -0,0 +1,62 @@
+"""
+/***************************************************************************
+                              BIM Semantic Viewer
+                              -------------------
+        begin                : 2024-10-03
+        copyright            : (C) 2025 by Florian Neukirchen
+        email                : mail@riannek.de
+ ***************************************************************************/
+
+/***************************************************************************
+ *                                                                         *
+ *   This program is free software; you can redistribute it and/or modify  *
+ *   it under the terms of the GNU General Public License as published by  *
+ *   the Free Software Foundation; either version 2 of the License, or     *
+ *   (at your option) any later version.                                   *
+ *                                                                         *
+ ***************************************************************************/
+"""
+import pytest
+from bimsemantic.util import (
+    IfcFiles,
+    element_table_columns,
+    property_column_name,
+    write_arrow_table,
+)
+
+# A wall with a property set without a name (Name is optional in IFC)
+UNNAMED_PSET = (
+    "#1=IFCPROJECT('0YvctVUKr0kugbFTf53O9L',$,'Project',$,$,$,$,$,$);\n"
+    "#2=IFCWALL('1YvctVUKr0kugbFTf53O9L',$,'Wall',$,$,$,$,$,$);\n"
+    "#3=IFCPROPERTYSINGLEVALUE('Prop',$,IFCLABEL('value'),$);\n"
+    "#4=IFCPROPERTYSET('2YvctVUKr0kugbFTf53O9L',$,$,$,(#3));\n"
+    "#5=IFCRELDEFINESBYPROPERTIES('3YvctVUKr0kugbFTf53O9L',$,$,$,(#2),#4);\n"
+)
+
+
+def test_property_column_name():
+    assert property_column_name("Pset_WallCommon", "IsExternal") == (
+        "Pset_WallCommon.IsExternal"
+    )
+    assert property_column_name(None, "Prop") == ".Prop"
+    assert property_column_name("Pset", None) == "Pset."
+
+
+def test_element_table_unnamed_pset(write_step):
+    ifc_files = IfcFiles()
+    ifc_files.add_file(write_step("unnamed.ifc", UNNAMED_PSET))
+    columns = dict(element_table_columns(ifc_files))
+    assert columns["GUID"]() == ["1YvctVUKr0kugbFTf53O9L"]
+    assert columns[".Prop"]() == ["value"]
+
+
+def test_write_unnamed_pset(write_step, tmp_path):
+    pyarrow = pytest.importorskip("pyarrow")
+    import pyarrow.parquet
+
+    ifc_files = IfcFiles()
+    ifc_files.add_file(write_step("unnamed.ifc", UNNAMED_PSET))
+    filename = str(tmp_path / "elements.parquet")
+    assert write_arrow_table(filename, element_table_columns(ifc_files))
+    table = pyarrow.parquet.read_table(filename)
+    assert table.column(".Prop").to_pylist() == ["value"]
@@ -0,0 +1,77 @@
+"""
+/***************************************************************************
+                              BIM Semantic Viewer
+                              -------------------
+        begin                : 2024-10-03
+        copyright            : (C) 2025 by Florian Neukirchen
+        email                : mail@riannek.de
+ ***************************************************************************/
+
+/***************************************************************************
+ *                                                                         *
+ *   This program is free software; you can redistribute it and/or modify  *
+ *   it under the terms of the GNU General Public License as published by  *
+ *   the Free Software Foundation; either version 2 of the License, or     *
+ *   (at your option) any later version.                                   *
+ *                                                                         *
+ ***************************************************************************/
+"""
+import csv
+from bimsemantic import cli
+
+PROJECT = "#1=IFCPROJECT('0YvctVUKr0kugbFTf53O9L',$,'Project',$,$,$,$,$,$);\n"
+
+
+def wall(name):
+    return f"#2=IFCWALL('1YvctVUKr0kugbFTf53O9L',$,'{name}',$,$,$,$,$,$);\n"
+
+
+def read_csv(filename):
+    with open(filename, newline="", encoding="utf-8") as f:
+        return list(csv.DictReader(f))
+
+
+def test_failed_file_does_not_stop_batch(write_step, tmp_path, monkeypatch):
+    good = [write_step("a.ifc", PROJECT + wall("A")), write_step("b.ifc", PROJECT)]
+    bad = write_step("bad.ifc", PROJECT + wall("Bad"))
+    element_table = cli.element_table
+
+    def failing_element_table(filename, *args):
+        if filename == bad:
+            raise TypeError("unexpected error")
+        return element_table(filename, *args)
+
+    monkeypatch.setattr(cli, "element_table", failing_element_table)
+    output = str(tmp_path / "elements.csv")
+    exit_code = cli.main([good[0], bad, good[1], "-j", "1", "-o", output])
+    assert exit_code == 1
+    rows = read_csv(output)
+    assert [row["Filename"] for row in rows] == ["a.ifc"]
+
+
+def test_integrity(write_step, tmp_path, capsys):
+    filenames = [
+        write_step("a.ifc", PROJECT + wall("Wall")),
+        write_step("b.ifc", PROJECT + wall("Renamed")),
+    ]
+    output = str(tmp_path / "elements.csv")
+    report_dir = str(tmp_path / "reports")
+    exit_code = cli.main(
+        filenames + ["--integrity", "-r", report_dir, "-j", "1", "-o", output]
+    )
+    assert exit_code == 0
+    # IfcProject passes all three checks, the wall fails the attribute check
+    assert "integrity: 5 passed, 1 failed" in capsys.readouterr().err
+    assert (tmp_path / "reports" / "integrity.bcfzip").exists()
+
+
+def test_integrity_different_projects(write_step, tmp_path):
+    other_project = PROJECT.replace("0YvctVUKr0kugbFTf53O9L", "4YvctVUKr0kugbFTf53O9L")
+    filenames = [
+        write_step("a.ifc", PROJECT + wall("Wall")),
+        write_step("b.ifc", other_project + wall("Wall")),
+    ]
+    output = str(tmp_path / "elements.csv")
+    exit_code = cli.main(filenames + ["--integrity", "-j", "1", "-o", output])
+    assert exit_code == 1
+    assert len(read_csv(output)) == 2
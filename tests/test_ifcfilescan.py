@@ -0,0 +1,46 @@
+"""
+/***************************************************************************
+                              BIM Semantic Viewer
+                              -------------------
+        begin                : 2024-10-03
+        copyright            : (C) 2025 by Florian Neukirchen
+        email                : mail@riannek.de
+ ***************************************************************************/
+
+/***************************************************************************
+ *                                                                         *
+ *   This program is free software; you can redistribute it and/or modify  *
+ *   it under the terms of the GNU General Public License as published by  *
+ *   the Free Software Foundation; either version 2 of the License, or     *
+ *   (at your option) any later version.                                   *
+ *                                                                         *
+ ***************************************************************************/
+"""
+from bimsemantic.util.ifcfile import IfcFileScan
+
+
+def test_scan_without_comments(write_step):
+    filename = write_step(
+        "plain.ifc",
+        "#1=IFCPROJECT('0YvctVUKr0kugbFTf53O9L',$,'Project',$,$,$,$,$,$);\n"
+        "#2=IFCWALL('1YvctVUKr0kugbFTf53O9L',$,'Wall 1',$,$,$,$,$,$);\n",
+    )
+    scan = IfcFileScan(filename)
+    assert scan.schema == "IFC4"
+    assert scan.count("IfcWall") == 1
+    assert scan.project["Name"] == "Project"
+
+
+def test_scan_with_instance_comments(write_step):
+    filename = write_step(
+        "comments.ifc",
+        "/* project */\n"
+        "#1=IFCPROJECT('0YvctVUKr0kugbFTf53O9L',$,'Project',$,$,$,$,$,$);\n"
+        "/* walls */ #2=IFCWALL('1YvctVUKr0kugbFTf53O9L',$,'Wall 1',$,$,$,$,$,$);\n"
+        "#3=IFCWALL('2YvctVUKr0kugbFTf53O9L',$,'Wall 2',$,$,$,$,$,$);\n",
+    )
+    scan = IfcFileScan(filename)
+    assert scan.count("IfcWall") == 2
+    assert scan.count("IfcProject") == 1
+    assert scan.project["GlobalId"] == "0YvctVUKr0kugbFTf53O9L"
+    assert scan.project["Name"] == "Project"